@@ -0,0 +1,247 @@
+"""
+Audit log archive for Queue Management System
+The audit_logs table keeps only the most recent months. Older months are
+moved into gzip-compressed JSON-lines files, each with a small JSON index,
+and audit queries search the table and the archive together.
+
+Archive files are written once and never modified:
+    audit_logs_2026-07.<first id>-<last id>.jsonl.gz
+    audit_logs_2026-07.<first id>-<last id>.index.json
+"""
+import asyncio
+import glob
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from config import settings
+from database import SessionLocal, AuditLog
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["id", "action", "citizen_id", "ticket_id", "counter_id", "details",
+           "ip_address", "timestamp", "is_suspicious"]
+ARCHIVE_BATCH_ROWS = 1000  # rows fetched from audit_logs at a time while archiving
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """First day of the month `months` after value's month (may be negative)"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def row_to_dict(row) -> dict:
+    entry = {column: getattr(row, column) for column in COLUMNS}
+    entry["timestamp"] = entry["timestamp"].isoformat() if entry["timestamp"] else None
+    return entry
+
+
+class AuditQuery:
+    """Filters shared by the table query and the archive scan"""
+
+    def __init__(self, ticket_id: Optional[int] = None, citizen_id: Optional[int] = None,
+                 action: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None):
+        self.ticket_id = ticket_id
+        self.citizen_id = citizen_id
+        self.action = action
+        self.since = since
+        self.until = until
+
+    def apply(self, query):
+        """Add the filters to a SQLAlchemy select on AuditLog"""
+        if self.ticket_id is not None:
+            query = query.where(AuditLog.ticket_id == self.ticket_id)
+        if self.citizen_id is not None:
+            query = query.where(AuditLog.citizen_id == self.citizen_id)
+        if self.action:
+            query = query.where(AuditLog.action == self.action)
+        if self.since:
+            query = query.where(AuditLog.timestamp >= self.since)
+        if self.until:
+            query = query.where(AuditLog.timestamp < self.until)
+        return query
+
+    def may_match(self, index: dict) -> bool:
+        """Rule out an archive file from its index alone"""
+        if self.since and index["max_timestamp"] < self.since.isoformat():
+            return False
+        if self.until and index["min_timestamp"] >= self.until.isoformat():
+            return False
+        if self.action and self.action not in index["actions"]:
+            return False
+        if self.ticket_id is not None and not (
+            index["min_ticket_id"] is not None
+            and index["min_ticket_id"] <= self.ticket_id <= index["max_ticket_id"]
+        ):
+            return False
+        if self.citizen_id is not None and self.citizen_id not in index["citizen_ids"]:
+            return False
+        return True
+
+    def matches(self, entry: dict) -> bool:
+        if self.ticket_id is not None and entry["ticket_id"] != self.ticket_id:
+            return False
+        if self.citizen_id is not None and entry["citizen_id"] != self.citizen_id:
+            return False
+        if self.action and entry["action"] != self.action:
+            return False
+        timestamp = entry["timestamp"] or ""
+        if self.since and timestamp < self.since.isoformat():
+            return False
+        if self.until and timestamp >= self.until.isoformat():
+            return False
+        return True
+
+
+class AuditArchive:
+    """Monthly compressed archive of audit_logs rows"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _indexes(self) -> List[dict]:
+        """All archive indexes, newest rows first"""
+        indexes = []
+        for path in glob.glob(os.path.join(self.directory, "audit_logs_*.index.json")):
+            with open(path) as f:
+                index = json.load(f)
+            index["data_path"] = path[:-len(".index.json")] + ".jsonl.gz"
+            indexes.append(index)
+        indexes.sort(key=lambda index: index["last_id"], reverse=True)
+        return indexes
+
+    def _write(self, month: str, entries: Iterable[dict]) -> Optional[dict]:
+        """
+        Write one archive file and its index; the index is the commit marker
+        Entries are written as they arrive, so a month never has to fit in memory.
+        Returns the index, None if there were no entries
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        partial_path = os.path.join(self.directory, f"audit_logs_{month}.partial.jsonl.gz")
+
+        index = {"month": month, "rows": 0, "first_id": None, "last_id": None,
+                 "min_timestamp": None, "max_timestamp": None,
+                 "min_ticket_id": None, "max_ticket_id": None, "actions": {}}
+        citizen_ids = set()
+        with gzip.open(partial_path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+                index["rows"] += 1
+                if index["first_id"] is None:
+                    index["first_id"] = entry["id"]
+                index["last_id"] = entry["id"]
+                if entry["timestamp"]:
+                    index["min_timestamp"] = min(index["min_timestamp"] or entry["timestamp"], entry["timestamp"])
+                    index["max_timestamp"] = max(index["max_timestamp"] or entry["timestamp"], entry["timestamp"])
+                if entry["ticket_id"] is not None:
+                    index["min_ticket_id"] = min(index["min_ticket_id"] or entry["ticket_id"], entry["ticket_id"])
+                    index["max_ticket_id"] = max(index["max_ticket_id"] or entry["ticket_id"], entry["ticket_id"])
+                index["actions"][entry["action"]] = index["actions"].get(entry["action"], 0) + 1
+                if entry["citizen_id"] is not None:
+                    citizen_ids.add(entry["citizen_id"])
+
+        if not index["rows"]:
+            os.remove(partial_path)
+            return None
+        index["citizen_ids"] = sorted(citizen_ids)
+
+        stem = os.path.join(self.directory, f"audit_logs_{month}.{index['first_id']}-{index['last_id']}")
+        data_path = stem + ".jsonl.gz"
+        index_path = stem + ".index.json"
+        os.replace(partial_path, data_path)
+
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(index_path + ".tmp", index_path)
+        return index
+
+    def archive(self, db, keep_months: int, now: Optional[datetime] = None) -> int:
+        """
+        Move every month older than the newest keep_months out of audit_logs
+        Returns number of rows archived
+        """
+        cutoff = add_months(month_start(now or datetime.utcnow()), -keep_months)
+        archived_up_to = {}  # month -> last id already in a file
+        for index in self._indexes():
+            archived_up_to[index["month"]] = max(archived_up_to.get(index["month"], 0), index["last_id"])
+        total = 0
+
+        while True:
+            oldest = db.query(func.min(AuditLog.timestamp)).filter(AuditLog.timestamp < cutoff).scalar()
+            if oldest is None:
+                break
+            start = month_start(oldest)
+            month = start.strftime("%Y-%m")
+            end = min(add_months(start, 1), cutoff)
+            in_month = [AuditLog.timestamp >= start, AuditLog.timestamp < end]
+
+            # Rows already in a file (archiving stopped before the delete)
+            # must not be written twice
+            rows = db.query(*(getattr(AuditLog, column) for column in COLUMNS)).filter(
+                *in_month, AuditLog.id > archived_up_to.get(month, 0)
+            ).order_by(AuditLog.id).yield_per(ARCHIVE_BATCH_ROWS)
+            index = self._write(month, (row_to_dict(row) for row in rows))
+            written = 0
+            if index:
+                written = index["rows"]
+                archived_up_to[month] = index["last_id"]
+            total += written
+
+            # Only rows that are in a file: any logged while the month was
+            # streamed stay for the next pass
+            db.query(AuditLog).filter(
+                *in_month, AuditLog.id <= archived_up_to.get(month, 0)
+            ).delete(synchronize_session=False)
+            db.commit()
+            logger.info("Archived %d audit rows for %s", written, month)
+
+        return total
+
+    def _read(self, path: str) -> Iterator[dict]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def search(self, query: AuditQuery, limit: int) -> List[dict]:
+        """Matching archived entries, newest first"""
+        results = []
+        for index in self._indexes():
+            if len(results) >= limit:
+                break
+            if not query.may_match(index):
+                continue
+            matches = [entry for entry in self._read(index["data_path"]) if query.matches(entry)]
+            results.extend(reversed(matches))
+        return results[:limit]
+
+    async def run_periodically(self, keep_months: int, interval_seconds: float,
+                               is_leader: Callable[[], bool] = lambda: True):
+        """
+        Background task: archive on startup and then every interval
+        Skipped in all but the leader worker, so only one process writes archive files
+        """
+        while True:
+            def run():
+                with SessionLocal() as db:
+                    return self.archive(db, keep_months)
+            try:
+                if is_leader():
+                    await asyncio.to_thread(run)
+            except Exception:
+                logger.exception("Audit archiving failed")
+            await asyncio.sleep(interval_seconds)
+
+
+audit_archive = AuditArchive(settings.audit_archive_dir)
@@ -0,0 +1,183 @@
+"""
+Audit log writer for Queue Management System
+Routine audit records are buffered and inserted in batches by a
+background task; fraud-relevant ones are written in the caller's
+transaction so they are durable before the response is sent
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import async_engine, AuditLog
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "pending_audit_records"
+
+
+class AuditWriter:
+    """
+    Batched audit sink
+
+    record() is called before the caller commits. Durable records are
+    added to the caller's session; buffered ones are held on the session
+    and handed to the writer only once that session commits, so a rolled
+    back change leaves no audit row behind. The writer flushes when
+    batch_size records are queued or flush_interval seconds have passed.
+    Actions in sync_actions, and every action when durability is "sync",
+    are written durably.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int,
+                 durability: str, sync_actions: List[str]):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self.sync_actions = set(sync_actions)
+
+        self._queue: Deque[dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.written_total = 0
+        self.dropped_total = 0
+        self.batches_total = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_durable(self, action: str) -> bool:
+        return self.durability == "sync" or action in self.sync_actions or not self.running
+
+    def record(self, db: Session, action: str, ticket_id: Optional[int] = None,
+               citizen_id: Optional[int] = None, counter_id: Optional[int] = None,
+               details: Optional[str] = None, is_suspicious: bool = False,
+               ip_address: Optional[str] = None, timestamp: Optional[datetime] = None):
+        """Record an audit entry as part of db's current transaction"""
+        row = {
+            "action": action,
+            "citizen_id": citizen_id,
+            "ticket_id": ticket_id,
+            "counter_id": counter_id,
+            "details": details,
+            "ip_address": ip_address,
+            "timestamp": timestamp or datetime.utcnow(),
+            "is_suspicious": is_suspicious
+        }
+        if self.is_durable(action):
+            db.add(AuditLog(**row))
+        else:
+            # Begin the transaction if no statement has yet, or a rollback
+            # would have nothing to end and the rows would ride the next commit
+            session = getattr(db, "sync_session", db)
+            if not session.in_transaction():
+                session.begin()
+            db.info.setdefault(PENDING_KEY, []).append(row)
+
+    def enqueue(self, rows: List[dict]):
+        """Queue committed records for the next batch"""
+        self._queue.extend(rows)
+        overflow = len(self._queue) - self.max_pending
+        if overflow > 0:
+            # Database unreachable for a long time; keep the newest records
+            for _ in range(overflow):
+                self._queue.popleft()
+            self.dropped_total += overflow
+            logger.error("Audit queue full, dropped %d records", overflow)
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Insert everything queued so far; returns number of rows written"""
+        written = 0
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            started = time.perf_counter()
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(AuditLog.__table__.insert(), batch)
+            except Exception:
+                logger.exception("Audit flush of %d records failed, will retry", len(batch))
+                self._queue.extendleft(reversed(batch))
+                break
+            elapsed = time.perf_counter() - started
+            self.batches_total += 1
+            self.written_total += len(batch)
+            self.flush_seconds_total += elapsed
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            written += len(batch)
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "durability": self.durability,
+            "queue_depth": len(self._queue),
+            "written_total": self.written_total,
+            "dropped_total": self.dropped_total,
+            "batches_total": self.batches_total,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self.flush_seconds_total / self.batches_total * 1000, 2) if self.batches_total else 0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2)
+        }
+
+
+audit_writer = AuditWriter(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    max_pending=settings.audit_max_pending,
+    durability=settings.audit_durability,
+    sync_actions=settings.audit_sync_actions
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        audit_writer.enqueue(rows)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,225 @@
+"""
+Peak-hour load generator
+Simulates a service hall against the whole API:
+  - kiosks issue tickets as Poisson arrivals, one stream per service type
+  - counters cycle call-next -> verify -> complete, taking an exponentially
+    distributed time with each citizen
+  - displays poll the queue status and waiting list, sending If-None-Match
+and reports throughput and p50 / p95 / p99 latency per endpoint.
+
+Arrivals are open-loop: a slow server does not slow the kiosks down, so
+queues and latencies grow the way they would in a real hall.
+
+Usage:
+    python benchmarks/load_test.py                                  # in-process app, temporary SQLite file
+    python benchmarks/load_test.py --url http://localhost:8000      # running server
+    python benchmarks/load_test.py --rate 600 --mix immigration=3,tax_service=1 --counters 12 --duration 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from worker_scaling import percentile
+
+DEFAULT_MIX = "immigration=3,tax_service=2,passport_renewal=2,birth_certificate=1"
+
+
+def parse_mix(value):
+    """'immigration=3,tax_service=1' -> {'immigration': 3.0, 'tax_service': 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        service_type, _, weight = part.partition("=")
+        mix[service_type.strip()] = float(weight or 1)
+    return mix
+
+
+class LoadTest:
+
+    def __init__(self, args, client: httpx.AsyncClient):
+        self.args = args
+        self.client = client
+        self.rng = random.Random(args.seed)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejections = defaultdict(int)
+        self.id_numbers = {}  # ticket number -> ID number the kiosk was given
+        self.counts = defaultdict(int)
+        self.in_flight = set()
+
+    async def request(self, endpoint, method, url, **kwargs):
+        """
+        Send one request and record its latency under endpoint
+        Returns None on transport errors and 5xx; 4xx are counted as rejections
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 500:
+            self.errors[endpoint] += 1
+            return None
+        if response.status_code >= 400:
+            self.rejections[endpoint] += 1
+        return response
+
+    async def issue(self, service_type):
+        id_number = f"LOAD{uuid.uuid4().hex[:10]}"
+        response = await self.request("POST /api/tickets", "POST", "/api/tickets", json={
+            "id_number": id_number,
+            "full_name": "Load Test Citizen",
+            "service_type": service_type
+        })
+        if response is not None and response.status_code == 201:
+            self.id_numbers[response.json()["ticket_number"]] = id_number
+            self.counts["issued"] += 1
+        else:
+            self.counts["rejected"] += 1
+
+    async def arrivals(self, service_type, per_second, deadline):
+        """Poisson arrivals of one service type; each issuance runs on its own"""
+        while True:
+            await asyncio.sleep(self.rng.expovariate(per_second))
+            if time.monotonic() >= deadline:
+                return
+            task = asyncio.create_task(self.issue(service_type))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def counter(self, counter_id, deadline):
+        while time.monotonic() < deadline:
+            response = await self.request(
+                "POST /api/counters/{id}/call-next", "POST", f"/api/counters/{counter_id}/call-next"
+            )
+            ticket_number = response.json().get("ticket_number") if response is not None else None
+            if not ticket_number:
+                await asyncio.sleep(self.args.idle_poll)
+                continue
+            self.counts["called"] += 1
+
+            await self.request("POST /api/counters/{id}/verify", "POST", f"/api/counters/{counter_id}/verify", json={
+                "ticket_number": ticket_number,
+                "id_number": self.id_numbers.get(ticket_number, "UNKNOWN")
+            })
+            if self.args.service_seconds > 0:
+                await asyncio.sleep(self.rng.expovariate(1 / self.args.service_seconds))
+            response = await self.request(
+                "POST /api/counters/{id}/complete", "POST", f"/api/counters/{counter_id}/complete",
+                params={"ticket_number": ticket_number}
+            )
+            if response is not None and response.status_code == 200:
+                self.counts["completed"] += 1
+
+    async def display(self, deadline):
+        etags = {}
+        # Displays are switched on at different moments, not in lockstep
+        await asyncio.sleep(self.rng.uniform(0, self.args.display_interval))
+        while time.monotonic() < deadline:
+            for url in ("/api/display/queue-status", "/api/display/waiting-tickets"):
+                headers = {"If-None-Match": etags[url]} if url in etags else {}
+                response = await self.request(f"GET {url}", "GET", url, headers=headers)
+                if response is not None and "etag" in response.headers:
+                    etags[url] = response.headers["etag"]
+            await asyncio.sleep(self.args.display_interval)
+
+    async def ensure_counters(self, service_types):
+        """Create the load-test counters; existing counter numbers are reused"""
+        response = await self.client.get("/api/counters")
+        existing = {c["counter_number"]: c["id"] for c in response.json()}
+        ids = []
+        for number in range(700, 700 + self.args.counters):
+            if number not in existing:
+                created = await self.client.post("/api/counters", json={
+                    "counter_number": number,
+                    "counter_name": f"Load {number}",
+                    "service_types": service_types
+                })
+                created.raise_for_status()
+                existing[number] = created.json()["id"]
+            ids.append(existing[number])
+        return ids
+
+    async def run(self):
+        mix = parse_mix(self.args.mix)
+        counter_ids = await self.ensure_counters(list(mix))
+        total_weight = sum(mix.values())
+
+        start = time.monotonic()
+        deadline = start + self.args.duration
+        tasks = [
+            self.arrivals(service_type, self.args.rate / 60 * weight / total_weight, deadline)
+            for service_type, weight in mix.items()
+        ]
+        tasks += [self.counter(counter_id, deadline) for counter_id in counter_ids]
+        tasks += [self.display(deadline) for _ in range(self.args.displays)]
+        await asyncio.gather(*tasks)
+        if self.in_flight:
+            await asyncio.gather(*self.in_flight)
+        return time.monotonic() - start
+
+    def report(self, elapsed):
+        print(f"{elapsed:.1f} s, arrivals {self.args.rate:g}/min, {self.args.counters} counters, "
+              f"{self.args.displays} displays")
+        print(f"tickets: {self.counts['issued']} issued, {self.counts['rejected']} rejected, "
+              f"{self.counts['called']} called, {self.counts['completed']} completed")
+        print(f"{'endpoint':<40} {'requests':>9} {'4xx':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for endpoint in sorted(self.latencies.keys() | self.errors.keys()):
+            samples = self.latencies[endpoint]
+            print(f"{endpoint:<40} {len(samples):>9} {self.rejections[endpoint]:>6} {self.errors[endpoint]:>7} {len(samples) / elapsed:>8.1f} "
+                  f"{percentile(samples, 50):>8.1f} {percentile(samples, 95):>8.1f} {percentile(samples, 99):>8.1f}")
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.max_connections)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+            load_test = LoadTest(args, client)
+            load_test.report(await load_test.run())
+        return
+
+    # In-process: the app runs on this event loop, no network in between.
+    # Imported late so DATABASE_URL is picked up by config.settings
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+            load_test = LoadTest(args, client)
+            load_test.report(await load_test.run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Server to load (default: the app in-process)")
+    parser.add_argument("--database-url", default=None,
+                        help="Database for the in-process app (default: a fresh temporary SQLite file)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals")
+    parser.add_argument("--rate", type=float, default=240.0, help="Ticket arrivals per minute, all services")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Arrival weights per service type (default: {DEFAULT_MIX})")
+    parser.add_argument("--counters", type=int, default=8)
+    parser.add_argument("--service-seconds", type=float, default=1.0,
+                        help="Mean time a counter spends with each citizen")
+    parser.add_argument("--idle-poll", type=float, default=0.5, help="Seconds an idle counter waits before calling again")
+    parser.add_argument("--displays", type=int, default=10)
+    parser.add_argument("--display-interval", type=float, default=2.0, help="Seconds between display polls")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if not args.url:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/load_test.db"
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+    asyncio.run(run(args))
@@ -0,0 +1,292 @@
+"""
+Microbenchmark suite
+Times the utility functions, then the hot endpoint handlers and the fraud
+detector in-process against a temporary SQLite database seeded with 1k,
+100k and 1M tickets of history. Results are compared with a baseline
+file; the run fails when a tracked benchmark is slower than its baseline
+by more than the threshold.
+
+Each database size runs in its own process, since the app binds to its
+database when it is imported.
+
+Usage:
+    python benchmarks/micro.py --save                    # record baselines
+    python benchmarks/micro.py                           # compare, exit 1 on a regression
+    python benchmarks/micro.py --sizes 1000,100000 --threshold 0.5
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines.json")
+SEED_SERVICE_TYPES = ["IMMIGRATION", "TAX_SERVICE", "PASSPORT_RENEWAL", "BIRTH_CERTIFICATE", "OTHER"]
+WAITING_TICKETS = 1000
+ADMIN = {"Authorization": "Bearer admin-token"}
+COUNTER = {"Authorization": "Bearer counter-token"}
+
+
+def size_label(size: int) -> str:
+    for divisor, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if size >= divisor and size % divisor == 0:
+            return f"{size // divisor}{suffix}"
+    return str(size)
+
+
+def measure(fn, repeat: int, number: int = 0) -> float:
+    """
+    Microseconds per call: the fastest of repeat rounds, which is the
+    figure least disturbed by other load on the machine. Without number,
+    each round makes enough calls to last at least 0.2 s (like timeit)
+    """
+    timer = timeit.Timer(fn)
+    if not number:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+async def ameasure(fn, number: int, repeat: int) -> float:
+    """measure() for coroutine functions, with a fixed number of calls per round"""
+    await fn()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return min(rounds)
+
+
+def bench_utils(repeat: int) -> dict:
+    """Pure functions: no database"""
+    sys.path.insert(0, ROOT)
+    from utils import format_ticket_for_printing, generate_qr_code, generate_ticket_number, hash_id_number
+
+    now = datetime.utcnow()
+    ticket = {
+        "ticket_number": "IM-042", "full_name": "Benchmark Citizen", "service_type": "immigration",
+        "created_at": now, "expires_at": now + timedelta(hours=2),
+        "queue_position": 7, "estimated_wait_minutes": 35
+    }
+
+    return {
+        "utils.hash_id_number": measure(lambda: hash_id_number("ETH1234567890"), repeat),
+        "utils.generate_ticket_number": measure(lambda: generate_ticket_number("immigration", 42), repeat),
+        "utils.format_ticket_for_printing": measure(lambda: format_ticket_for_printing(ticket), repeat),
+        "utils.generate_qr_code": measure(lambda: generate_qr_code(ticket), repeat),
+    }
+
+
+def seed(connection, size: int):
+    """
+    Fill an empty, migrated database: size tickets in total, of which
+    WAITING_TICKETS (at most half) wait today and the rest are spread over
+    the last 90 days; two tickets per citizen and an audit row per ticket
+    """
+    from utils import hash_id_number
+
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    waiting = min(WAITING_TICKETS, size // 2)
+    citizens = max(size // 2, waiting)
+
+    connection.executemany(
+        "INSERT INTO citizens (id, id_number_hash, full_name, created_at, is_blacklisted) VALUES (?, ?, ?, ?, 0)",
+        ((i, hash_id_number(f"SEED{i:08d}"), "Seeded Citizen", now - timedelta(days=120))
+         for i in range(1, citizens + 1))
+    )
+
+    def tickets():
+        for i in range(1, size + 1):
+            service_type = SEED_SERVICE_TYPES[i % len(SEED_SERVICE_TYPES)]
+            if i <= waiting:
+                # Citizens 1..waiting hold today's waiting tickets
+                created = now - timedelta(minutes=rng.uniform(0, 60))
+                yield (i, f"S{i}", created.date(), i, hash_id_number(f"SEED{i:08d}"), "Seeded Citizen",
+                       service_type, "WAITING", None, None, None, None, created, created + timedelta(hours=2))
+                continue
+            citizen_id = rng.randint(waiting + 1, citizens) if citizens > waiting else 1
+            created = now - timedelta(days=rng.uniform(1, 90))
+            roll = rng.random()
+            status = "COMPLETED" if roll < 0.85 else "EXPIRED" if roll < 0.95 else "CANCELLED"
+            called = created + timedelta(minutes=rng.uniform(1, 40)) if status == "COMPLETED" else None
+            served = called + timedelta(minutes=1) if called else None
+            completed = served + timedelta(minutes=rng.uniform(2, 15)) if served else created + timedelta(hours=2)
+            yield (i, f"H{i}", created.date(), citizen_id, hash_id_number(f"SEED{citizen_id:08d}"), "Seeded Citizen",
+                   service_type, status, 1 if called else None, called, served, completed, created,
+                   created + timedelta(hours=2))
+
+    connection.executemany(
+        "INSERT INTO tickets (id, ticket_number, business_day, citizen_id, id_number_hash, full_name, "
+        "service_type, status, counter_number, called_at, served_at, completed_at, created_at, expires_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        tickets()
+    )
+    connection.execute(
+        "INSERT INTO audit_logs (action, citizen_id, ticket_id, details, timestamp, is_suspicious) "
+        "SELECT 'TICKET_CREATED', citizen_id, id, 'Ticket ' || ticket_number || ' created', created_at, 0 "
+        "FROM tickets"
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    return waiting
+
+
+async def bench_handlers(size: int, repeat: int) -> dict:
+    """Endpoint handlers through the in-process app (run in a child process)"""
+    import httpx
+    from database import SessionLocal, engine, init_db
+    from fraud import fraud_detector
+    import main
+
+    init_db()
+    raw = engine.raw_connection()
+    try:
+        waiting = seed(raw, size)
+    finally:
+        raw.close()
+
+    results = {}
+    label = size_label(size)
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            counter = (await client.post("/api/counters", json={
+                "counter_number": 1, "counter_name": "Bench",
+                "service_types": [service_type.lower() for service_type in SEED_SERVICE_TYPES]
+            })).json()
+
+            async def get(url, **kwargs):
+                response = await client.get(url, **kwargs)
+                assert response.status_code == 200, (url, response.status_code, response.text)
+
+            async def issue():
+                response = await client.post("/api/tickets", json={
+                    "id_number": f"MICRO{uuid.uuid4().hex[:10]}", "full_name": "Bench Citizen",
+                    "service_type": "tax_service"
+                })
+                assert response.status_code == 201, response.text
+
+            async def call_next():
+                response = await client.post(f"/api/counters/{counter['id']}/call-next")
+                assert "ticket_number" in response.json(), response.text
+
+            calls = max(1, min(50, waiting // (repeat + 1) - 1))
+            handlers = {
+                "POST /api/tickets": (issue, 50),
+                "GET /api/tickets/{number}": (lambda: get("/api/tickets/S1", headers=COUNTER), 100),
+                "GET /api/tickets/active/{id}": (lambda: get(f"/api/tickets/active/SEED{2:08d}"), 100),
+                "POST /api/counters/{id}/call-next": (call_next, calls),
+                "GET /api/display/queue-status": (lambda: get("/api/display/queue-status"), 200),
+                "GET /api/statistics": (lambda: get("/api/statistics"), 200),
+                "GET /api/admin/audit?ticket_id": (lambda: get("/api/admin/audit", headers=ADMIN,
+                                                               params={"ticket_id": size // 2}), 100),
+            }
+            for name, (fn, number) in handlers.items():
+                results[f"{label}:{name}"] = await ameasure(fn, number, repeat)
+
+    # Fraud detector: a miss reads the citizen's recent tickets, a hit does not
+    citizen_ids = itertools.cycle(range(1, max(size // 2, waiting) + 1))
+    with SessionLocal() as db:
+        def check_miss():
+            fraud_detector.check(db, next(citizen_ids))
+            fraud_detector._citizens.clear()
+        results[f"{label}:fraud_detector.check miss"] = measure(check_miss, repeat, number=100)
+        results[f"{label}:fraud_detector.check hit"] = measure(lambda: fraud_detector.check(db, waiting + 1), repeat)
+    return results
+
+
+def run_size(size: int, repeat: int) -> dict:
+    """Benchmark one database size in a child process"""
+    workdir = tempfile.mkdtemp(prefix=f"micro-{size_label(size)}-")
+    output = os.path.join(workdir, "results.json")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'micro.db')}",
+        AUDIT_ARCHIVE_DIR=os.path.join(workdir, "audit_archive"),
+        CLUSTER_LOCK_FILE=os.path.join(workdir, "leader.lock"),
+    )
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(size), "--repeat", str(repeat),
+             "--output", output],
+            cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL
+        )
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print results next to the baseline; returns the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':<52} {'us/op':>11} {'baseline':>11} {'change':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<52} {value:>11.1f} {'-':>11} {'new':>8}")
+            continue
+        change = value / base - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<52} {value:>11.1f} {base:>11.1f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main(args):
+    results = bench_utils(args.repeat)
+    for size in args.sizes:
+        started = time.perf_counter()
+        results.update(run_size(size, args.repeat))
+        print(f"seeded and ran {size_label(size)} tickets in {time.perf_counter() - started:.0f} s", file=sys.stderr)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({name: round(value, 3) for name, value in results.items()}, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        sys.exit(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: "
+                 + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(n) for n in value.split(",")],
+                        default=[1_000, 100_000, 1_000_000], help="Seeded tickets per run (default: 1000,100000,1000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark; the fastest is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline before failing (default: 0.25)")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+        with open(args.output, "w") as f:
+            json.dump(asyncio.run(bench_handlers(args.child, args.repeat)), f)
+    else:
+        main(args)
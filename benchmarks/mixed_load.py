@@ -0,0 +1,118 @@
+"""
+Mixed kiosk / counter / display latency benchmark
+Runs concurrent clients against a running server and reports
+p50 / p95 / p99 latency per client type
+
+Usage:
+    python benchmarks/mixed_load.py --url http://localhost:8000 --duration 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+SERVICE_TYPES = ["immigration", "tax_service", "passport_renewal", "birth_certificate"]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def timed(client, results, kind, method, url, **kwargs):
+    """
+    Send one request and record its latency in milliseconds
+    Transport errors and 5xx responses are counted separately
+    """
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        results["errors"][kind] += 1
+        return None
+    results[kind].append((time.perf_counter() - start) * 1000)
+    if response.status_code >= 500:
+        results["errors"][kind] += 1
+        return None
+    return response
+
+
+async def kiosk(client, results, deadline):
+    while time.monotonic() < deadline:
+        await timed(client, results, "kiosk", "POST", "/api/tickets", json={
+            "id_number": f"BENCH{uuid.uuid4().hex[:10]}",
+            "full_name": "Benchmark Citizen",
+            "service_type": SERVICE_TYPES[len(results["kiosk"]) % len(SERVICE_TYPES)]
+        })
+
+
+async def counter(client, results, deadline, counter_id):
+    while time.monotonic() < deadline:
+        response = await timed(client, results, "counter", "POST", f"/api/counters/{counter_id}/call-next")
+        ticket_number = response.json().get("ticket_number") if response else None
+        if ticket_number:
+            await timed(client, results, "counter", "POST", f"/api/counters/{counter_id}/complete",
+                        params={"ticket_number": ticket_number})
+        else:
+            await asyncio.sleep(0.05)
+
+
+async def display(client, results, deadline):
+    while time.monotonic() < deadline:
+        await timed(client, results, "display", "GET", "/api/display/queue-status")
+        await timed(client, results, "display", "GET", "/api/statistics")
+
+
+async def ensure_counters(client, count):
+    """Create benchmark counters; existing counter numbers are left alone"""
+    response = await client.get("/api/counters")
+    existing = {c["counter_number"]: c["id"] for c in response.json()}
+    ids = []
+    for number in range(900, 900 + count):
+        if number not in existing:
+            created = await client.post("/api/counters", json={
+                "counter_number": number,
+                "counter_name": f"Bench {number}",
+                "service_types": SERVICE_TYPES
+            })
+            existing[number] = created.json()["id"]
+        ids.append(existing[number])
+    return ids
+
+
+async def run(args):
+    kinds = ("kiosk", "counter", "display")
+    results = {kind: [] for kind in kinds}
+    results["errors"] = {kind: 0 for kind in kinds}
+    limits = httpx.Limits(max_connections=args.kiosks + args.counters + args.displays + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limits) as client:
+        counter_ids = await ensure_counters(client, args.counters)
+        deadline = time.monotonic() + args.duration
+        tasks = [kiosk(client, results, deadline) for _ in range(args.kiosks)]
+        tasks += [counter(client, results, deadline, cid) for cid in counter_ids]
+        tasks += [display(client, results, deadline) for _ in range(args.displays)]
+        await asyncio.gather(*tasks)
+
+    print(f"{'client':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for kind in kinds:
+        samples = results[kind]
+        print(f"{kind:<10} {len(samples):>9} {results['errors'][kind]:>7} {len(samples) / args.duration:>8.1f} "
+              f"{statistics.median(samples) if samples else 0:>8.1f} "
+              f"{percentile(samples, 95):>8.1f} {percentile(samples, 99):>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--kiosks", type=int, default=8)
+    parser.add_argument("--counters", type=int, default=4)
+    parser.add_argument("--displays", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
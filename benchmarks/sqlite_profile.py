@@ -0,0 +1,124 @@
+"""
+SQLite profile benchmark
+Runs the production server against a fresh SQLite file with the SQLite
+profile (WAL, synchronous=NORMAL, busy_timeout, ...) off and then on.
+Kiosks issue tickets for a while, then counters call them all, and the
+throughput and failures ("database is locked" and the like) of both
+phases are compared
+
+Usage:
+    python benchmarks/sqlite_profile.py
+    python benchmarks/sqlite_profile.py --workers 4 --kiosks 32 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from worker_scaling import SERVICE_TYPES, free_port, percentile, start_server, wait_until_healthy
+
+
+async def issue_for(client, deadline, results):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post("/api/tickets", json={
+                "id_number": f"PROFILE{uuid.uuid4().hex[:10]}",
+                "full_name": "Benchmark Citizen",
+                "service_type": SERVICE_TYPES[len(results["latencies"]) % len(SERVICE_TYPES)]
+            })
+            ok = response.status_code == 201
+        except httpx.HTTPError:
+            ok = False
+        results["latencies"].append((time.perf_counter() - start) * 1000)
+        results["ok" if ok else "errors"] += 1
+
+
+async def call_until_empty(client, counter_id, results):
+    misses = 0
+    while misses < 3:
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"/api/counters/{counter_id}/call-next")
+            ok = response.status_code == 200
+            called = ok and "ticket_number" in response.json()
+        except httpx.HTTPError:
+            ok = called = False
+        results["latencies"].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            results["errors"] += 1
+        elif called:
+            results["ok"] += 1
+            misses = 0
+        else:
+            # Another worker may still be relaying the last tickets
+            misses += 1
+            await asyncio.sleep(0.3)
+
+
+def summary(results, elapsed):
+    return {
+        "ok": results["ok"],
+        "errors": results["errors"],
+        "rate": results["ok"] / elapsed,
+        "p95": percentile(results["latencies"], 95)
+    }
+
+
+async def measure(args, tuning: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"sqlite-{'on' if tuning else 'off'}-")
+    port = free_port()
+    process = start_server(args.workers, port, workdir, None, sqlite_tuning=tuning)
+    try:
+        limits = httpx.Limits(max_connections=args.kiosks + args.counters + 4, max_keepalive_connections=0)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            await wait_until_healthy(client, process)
+            counter_ids = []
+            for number in range(args.counters):
+                created = await client.post("/api/counters", json={
+                    "counter_number": 800 + number,
+                    "counter_name": f"Profile {800 + number}",
+                    "service_types": SERVICE_TYPES
+                })
+                counter_ids.append(created.json()["id"])
+
+            issued = {"ok": 0, "errors": 0, "latencies": []}
+            start = time.monotonic()
+            await asyncio.gather(*(issue_for(client, start + args.duration, issued) for _ in range(args.kiosks)))
+            issuance = summary(issued, time.monotonic() - start)
+
+            called = {"ok": 0, "errors": 0, "latencies": []}
+            start = time.monotonic()
+            await asyncio.gather(*(call_until_empty(client, counter_id, called) for counter_id in counter_ids))
+            call_next = summary(called, time.monotonic() - start)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"profile": "on" if tuning else "off", "issuance": issuance, "call_next": call_next}
+
+
+async def run(args):
+    rows = [await measure(args, tuning=False), await measure(args, tuning=True)]
+
+    print(f"SQLite, {args.workers} worker(s), {args.kiosks} kiosks, {args.counters} counters")
+    print(f"{'profile':>7} {'phase':>9} {'ok':>6} {'errors':>7} {'per sec':>8} {'p95 ms':>8}")
+    for row in rows:
+        for phase in ("issuance", "call_next"):
+            result = row[phase]
+            print(f"{row['profile']:>7} {phase:>9} {result['ok']:>6} {result['errors']:>7} "
+                  f"{result['rate']:>8.1f} {result['p95']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of ticket issuance")
+    parser.add_argument("--kiosks", type=int, default=16)
+    parser.add_argument("--counters", type=int, default=8)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,171 @@
+"""
+Citizen lookup cache for Queue Management System
+Maps id_number_hash to the citizen's id, blacklist state and current
+active ticket, with a Bloom filter of every known hash so first-time
+citizens are recognised without touching the database
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+from database import Citizen
+from events import TICKET_CREATED, TICKET_COMPLETED, TICKET_CANCELLED, TICKET_EXPIRED
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` keys at `error_rate` false positives"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class CitizenEntry:
+    """What create_ticket needs to know about a citizen"""
+    __slots__ = ("citizen_id", "is_blacklisted", "blacklist_reason",
+                 "active_ticket_id", "active_ticket_number", "cached_at")
+
+    def __init__(self, citizen_id: int, is_blacklisted: bool, blacklist_reason: Optional[str],
+                 active_ticket_id: Optional[int] = None, active_ticket_number: Optional[str] = None):
+        self.citizen_id = citizen_id
+        self.is_blacklisted = is_blacklisted
+        self.blacklist_reason = blacklist_reason
+        self.active_ticket_id = active_ticket_id
+        self.active_ticket_number = active_ticket_number
+        self.cached_at = time.monotonic()
+
+
+class CitizenCache:
+    """
+    Bounded LRU of CitizenEntry by id_number_hash
+
+    Active tickets are kept current from ticket events. Entries expire
+    after ttl_seconds so changes made outside the API (e.g. blacklisting
+    a citizen directly in the database) are picked up.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, bloom_capacity: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.known = BloomFilter(bloom_capacity)
+        self._entries: "OrderedDict[str, CitizenEntry]" = OrderedDict()
+        self._hash_of = {}  # citizen_id -> id_number_hash, for event updates
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bloom_negatives = 0
+
+    def load(self, db) -> int:
+        """Fill the Bloom filter with every citizen hash in the database"""
+        with self._lock:
+            self.known.clear()
+            self._entries.clear()
+            self._hash_of.clear()
+            for (id_hash,) in db.query(Citizen.id_number_hash).yield_per(10000):
+                self.known.add(id_hash)
+            return self.known.count
+
+    def is_new(self, id_hash: str) -> bool:
+        """True when the hash has certainly never been seen, so no citizen row exists"""
+        if id_hash in self.known:
+            return False
+        self.bloom_negatives += 1
+        return True
+
+    def get(self, id_hash: str) -> Optional[CitizenEntry]:
+        with self._lock:
+            entry = self._entries.get(id_hash)
+            if entry is not None and time.monotonic() - entry.cached_at > self.ttl_seconds:
+                self._remove(id_hash)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(id_hash)
+            self.hits += 1
+            return entry
+
+    def store(self, id_hash: str, entry: CitizenEntry):
+        with self._lock:
+            if id_hash not in self.known:
+                self.known.add(id_hash)
+            self._entries[id_hash] = entry
+            self._entries.move_to_end(id_hash)
+            self._hash_of[entry.citizen_id] = id_hash
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._hash_of.pop(evicted.citizen_id, None)
+
+    def _remove(self, id_hash: str):
+        entry = self._entries.pop(id_hash, None)
+        if entry is not None:
+            self._hash_of.pop(entry.citizen_id, None)
+
+    def has_no_active_ticket(self, id_hash: str) -> bool:
+        """True when the cache alone shows the citizen has no active ticket"""
+        if self.is_new(id_hash):
+            return True
+        entry = self.get(id_hash)
+        return entry is not None and entry.active_ticket_id is None
+
+    def apply(self, event: dict):
+        """Event bus listener: keep cached active tickets current"""
+        context = event.get("context", {})
+        with self._lock:
+            # Citizens registered by another server worker
+            new_hash = context.get("id_number_hash")
+            if event["type"] == TICKET_CREATED and new_hash and new_hash not in self.known:
+                self.known.add(new_hash)
+            id_hash = self._hash_of.get(context.get("citizen_id"))
+            entry = self._entries.get(id_hash) if id_hash else None
+            if entry is None:
+                return
+            if event["type"] == TICKET_CREATED:
+                entry.active_ticket_id = context["ticket_id"]
+                entry.active_ticket_number = event["data"]["ticket_number"]
+            elif event["type"] in (TICKET_COMPLETED, TICKET_CANCELLED, TICKET_EXPIRED):
+                if entry.active_ticket_id == context["ticket_id"]:
+                    entry.active_ticket_id = None
+                    entry.active_ticket_number = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "bloom_keys": self.known.count,
+            "bloom_negatives": self.bloom_negatives
+        }
+
+
+citizen_cache = CitizenCache(
+    max_entries=settings.citizen_cache_size,
+    ttl_seconds=settings.citizen_cache_ttl_minutes * 60,
+    bloom_capacity=settings.citizen_bloom_capacity
+)
@@ -0,0 +1,257 @@
+"""
+Multi-worker coordination for Queue Management System
+Each server worker keeps its own dispatch queue, statistics and caches,
+all driven by the event bus. When gunicorn runs several workers, every
+worker also appends its ticket events to the cluster_events table and
+tails that table for the other workers' events, republishing them on its
+own bus so all workers converge on the same state. A lock file elects
+one worker on the host to run singleton jobs such as audit archiving.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, or_, select
+
+from config import settings
+from database import AsyncSessionLocal, async_engine, ClusterEvent
+from dispatch import dispatch_queue
+from events import event_bus
+from queue_stats import queue_stats
+from wait_estimator import wait_estimator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn, so there is only ever one worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Ids are allocated at INSERT but become visible at COMMIT, so on
+# PostgreSQL a higher id can be read before a lower one. A missing id is
+# looked for again until it has been missing this long.
+GAP_TIMEOUT_SECONDS = 5.0
+MAX_GAPS = 1000
+PRUNE_INTERVAL_SECONDS = 60
+
+
+class LeaderLock:
+    """
+    Exclusive, non-blocking lock on a file, held until the process exits
+    Acquire only after forking: a lock taken in the gunicorn master would
+    be inherited by every worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+
+class ClusterRelay:
+    """
+    Relays ticket events between server workers through cluster_events
+
+    capture() queues this worker's events; the background task writes
+    them in batches and reads the other workers' rows every poll_interval
+    seconds. Events are relayed after their change has committed, so
+    events of a worker that dies in between never reach the others; every
+    worker therefore also reloads its dispatch queue, statistics and wait
+    estimates from the database every resync_interval seconds.
+
+    Disabled (every worker is its own leader) unless gunicorn_conf.py
+    turns it on for a multi-worker server.
+    """
+
+    def __init__(self, poll_interval: float, retention_seconds: float, resync_interval: float,
+                 lock_path: str):
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.resync_interval = resync_interval
+        self.leader = LeaderLock(lock_path)
+        self.enabled = False
+        self.origin: Optional[str] = None
+
+        self._outbox: List[dict] = []
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}  # unread ids below _last_id -> when first missed
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.sent_total = 0
+        self.received_total = 0
+        self.resyncs_total = 0
+
+    def is_leader(self) -> bool:
+        """True in the one worker that runs singleton background jobs"""
+        if not self.enabled or fcntl is None:
+            return True
+        return self.leader.acquire()
+
+    def capture(self, event: dict):
+        """Event bus listener: queue this worker's events for the other workers"""
+        if not self.enabled or "origin" in event["context"]:
+            return
+        self._outbox.append({
+            "origin": self.origin,
+            "event_type": event["type"],
+            "payload": json.dumps({
+                "timestamp": event["timestamp"],
+                "data": event["data"],
+                "context": event["context"]
+            }),
+            "created_at": datetime.utcnow()
+        })
+
+    async def _flush(self):
+        if not self._outbox:
+            return
+        batch, self._outbox = self._outbox, []
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(ClusterEvent.__table__.insert(), batch)
+        except Exception:
+            self._outbox[:0] = batch
+            raise
+        self.sent_total += len(batch)
+
+    async def _poll(self):
+        """Republish the other workers' events written since the last poll"""
+        table = ClusterEvent.__table__
+        newer = table.c.id > self._last_id
+        if self._gaps:
+            newer = or_(newer, table.c.id.in_(list(self._gaps)))
+        async with async_engine.connect() as conn:
+            rows = (await conn.execute(
+                select(table.c.id, table.c.origin, table.c.event_type, table.c.payload)
+                .where(newer).order_by(table.c.id)
+            )).all()
+
+        now = time.monotonic()
+        for row_id, origin, event_type, payload in rows:
+            if row_id > self._last_id:
+                if row_id - self._last_id <= MAX_GAPS:
+                    for missing in range(self._last_id + 1, row_id):
+                        self._gaps[missing] = now
+                self._last_id = row_id
+            else:
+                self._gaps.pop(row_id, None)
+            if origin == self.origin:
+                continue
+            payload = json.loads(payload)
+            event_bus.relay(event_type, payload["timestamp"], payload["data"],
+                            dict(payload["context"], origin=origin))
+            self.received_total += 1
+
+        for missing, since in list(self._gaps.items()):
+            if now - since > GAP_TIMEOUT_SECONDS:
+                del self._gaps[missing]
+        while len(self._gaps) > MAX_GAPS:
+            del self._gaps[min(self._gaps)]
+
+    async def _prune(self):
+        table = ClusterEvent.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        async with async_engine.begin() as conn:
+            await conn.execute(delete(table).where(table.c.created_at < cutoff))
+
+    async def resync(self):
+        """Reload the event-driven in-memory state from the database"""
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(dispatch_queue.refresh)
+            await db.run_sync(queue_stats.load)
+            await db.run_sync(wait_estimator.load)
+        self.resyncs_total += 1
+
+    async def _run(self):
+        last_resync = last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._flush()
+                await self._poll()
+                now = time.monotonic()
+                if now - last_resync >= self.resync_interval:
+                    last_resync = now
+                    await self.resync()
+                if now - last_prune >= PRUNE_INTERVAL_SECONDS and self.is_leader():
+                    last_prune = now
+                    await self._prune()
+            except Exception:
+                logger.exception("Cluster relay failed")
+
+    async def mark(self):
+        """Remember where cluster_events ends; call before loading the in-memory state"""
+        if not self.enabled:
+            return
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        async with AsyncSessionLocal() as db:
+            self._last_id = await db.scalar(select(func.max(ClusterEvent.id))) or 0
+        self._gaps.clear()
+
+    def start(self):
+        """
+        Start relaying on the running event loop, from where mark() left off
+        Events committed while the state was loaded are delivered again;
+        the dispatch queue, statistics and citizen cache all tolerate
+        seeing an event twice
+        """
+        if not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the relay task and send whatever is still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self._flush()
+        except Exception:
+            logger.exception("Dropped %d cluster events on shutdown", len(self._outbox))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "origin": self.origin,
+            "leader": self.leader.held or not self.enabled,
+            "outbox_depth": len(self._outbox),
+            "last_event_id": self._last_id,
+            "pending_gaps": len(self._gaps),
+            "sent_total": self.sent_total,
+            "received_total": self.received_total,
+            "resyncs_total": self.resyncs_total
+        }
+
+
+cluster_relay = ClusterRelay(
+    poll_interval=settings.cluster_poll_interval_seconds,
+    retention_seconds=settings.cluster_event_retention_minutes * 60,
+    resync_interval=settings.cluster_resync_interval_minutes * 60,
+    lock_path=settings.cluster_lock_file
+)
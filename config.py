@@ -25,10 +25,89 @@ class Settings(BaseSettings):
     ticket_expiry_hours: int = 2
     max_queue_size: int = 500
 
+    # Wait estimates (wait_estimator.py)
+    default_service_minutes: float = 5.0
+    service_time_ewma_alpha: float = 0.1
+    service_time_max_minutes: float = 60
+    service_time_history_days: int = 7
+
+    # Fraud detection: sliding windows per citizen
+    fraud_issued_window_minutes: int = 60
+    fraud_issued_threshold: int = 5
+    fraud_failed_window_days: int = 30
+    fraud_failed_threshold: int = 10
+    fraud_cache_size: int = 100000
+    fraud_cache_ttl_minutes: int = 60
+
+    # Citizen lookup cache and Bloom filter of known ID hashes
+    citizen_cache_size: int = 100000
+    citizen_cache_ttl_minutes: int = 10
+    citizen_bloom_capacity: int = 2000000
+
+    # Expiry sweeper: timing wheel tick and bucket count
+    expiry_sweep_interval_seconds: float = 1.0
+    expiry_wheel_slots: int = 512
+
+    # QR codes (rendered on first fetch, off the issuance path)
+    qr_render_workers: int = 2
+    qr_cache_size: int = 512
+
+    # Audit log writer, "buffered" or "sync" (audit_writer.py)
+    audit_durability: str = "buffered"
+    audit_sync_actions: list[str] = ["VERIFICATION_FAILED", "SUSPICIOUS_TICKET_REQUEST"]
+    audit_batch_size: int = 200
+    audit_flush_interval_seconds: float = 0.5
+    audit_max_pending: int = 50000
+
+    # Audit archive of months older than audit_hot_months (audit_archive.py)
+    audit_archive_dir: str = "audit_archive"
+    audit_hot_months: int = 3
+    audit_archive_interval_hours: float = 24
+
+    # Connection pool of each engine, per server worker (db_pool.py)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 128
+
+    # SQLite profile (database.sqlite_pragmas)
+    sqlite_tuning: bool = True
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 15000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size_bytes: int = 268435456
+    sqlite_temp_store: str = "memory"
+    sqlite_optimize_interval_hours: float = 6
+
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
 
+    # Production server (gunicorn_conf.py)
+    workers: int = 1
+    keepalive_seconds: int = 5
+    worker_timeout_seconds: int = 30
+
+    # Multi-worker event relay through the cluster_events table (cluster.py)
+    cluster_poll_interval_seconds: float = 0.2
+    cluster_event_retention_minutes: int = 10
+    cluster_resync_interval_minutes: int = 5
+    cluster_lock_file: str = "queue_management.leader.lock"
+
+    # SQL profiler (sql_profiler.py), for diagnosis rather than production
+    sql_profiling: bool = False
+    sql_slow_query_ms: float = 100
+    sql_repeat_threshold: int = 3
+    sql_slow_log_file: str = "slow_queries.log"
+    sql_slow_log_max_bytes: int = 5242880
+    sql_slow_log_backups: int = 3
+
+    # Prometheus multiprocess directory, used when gunicorn runs several workers
+    prometheus_multiproc_dir: str = "prometheus_multiproc"
+
     # Application
     app_name: str = "SAN - Queue Management System"
     version: str = "1.0.0"
@@ -1,23 +1,130 @@
 """
 Database configuration and models
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Enum as SQLEnum
+from sqlalchemy import (
+    create_engine, event, inspect, text, Column, Integer, String, Date, DateTime, Boolean, Index, UniqueConstraint,
+    Enum as SQLEnum
+)
+from fastapi import Request
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from typing import Callable, List
+import asyncio
 import enum
+import logging
+import os
 from config import settings
+from db_pool import engine_options
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Database setup
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_async_database_url(database_url: str) -> str:
+    """
+    Map a sync database URL onto its async driver
+    sqlite -> aiosqlite, postgresql -> asyncpg
+    """
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if database_url.startswith("postgres://"):
+        return database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("postgresql://") or database_url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    return database_url
+
+
+# Async database setup (used by the API endpoints)
+ASYNC_DATABASE_URL = get_async_database_url(settings.database_url)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+# Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# Sessions of requests that write; on SQLite their transactions BEGIN IMMEDIATE
+AsyncWriteSessionLocal = async_sessionmaker(
+    async_engine.execution_options(sqlite_begin_immediate=True), autoflush=False, expire_on_commit=False
+)
+
+
+def sqlite_pragmas() -> List[str]:
+    """
+    PRAGMA statements of the SQLite profile in config.settings, applied to
+    every new connection; with sqlite_tuning off SQLite keeps its defaults
+    (rollback journal, full sync and a 2 MiB page cache)
+    """
+    if not settings.sqlite_tuning:
+        return []
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",  # negative: KiB rather than pages
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Engine connect event: tune each new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def take_over_sqlite_transactions(dbapi_connection, connection_record):
+    """Engine connect event: stop the driver from issuing its own BEGIN"""
+    dbapi_connection.isolation_level = None
+
+
+def begin_sqlite_transaction(conn):
+    """
+    Engine begin event: a deferred transaction that reads and then writes
+    fails at once with SQLITE_BUSY when another worker wrote in between,
+    as busy_timeout cannot help it; write sessions therefore BEGIN IMMEDIATE,
+    taking the write lock up front where busy_timeout does wait for it
+    """
+    conn.exec_driver_sql(
+        "BEGIN IMMEDIATE" if conn.get_execution_options().get("sqlite_begin_immediate") else "BEGIN"
+    )
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", take_over_sqlite_transactions)
+    event.listen(async_engine.sync_engine, "begin", begin_sqlite_transaction)
+
+
+async def optimize_periodically(interval_seconds: float, is_leader: Callable[[], bool] = lambda: True):
+    """
+    Background task: run PRAGMA optimize so the query planner's statistics
+    keep up with the tables. Only on SQLite with the profile on, and only
+    in the leader worker
+    """
+    if engine.dialect.name != "sqlite" or not settings.sqlite_tuning:
+        return
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            if is_leader():
+                async with async_engine.begin() as conn:
+                    await conn.execute(text("PRAGMA optimize"))
+        except Exception:
+            logger.exception("PRAGMA optimize failed")
+
+
 # Enums
 class TicketStatus(str, enum.Enum):
     WAITING = "waiting"
@@ -94,11 +201,23 @@ class Citizen(Base):
 class Ticket(Base):
     """Ticket information"""
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Ticket numbers restart every business day
+        UniqueConstraint("ticket_number", "business_day", name="uq_tickets_ticket_number_business_day"),
+        # Hot query access paths (see migrations/versions/0003_ticket_query_indexes.py)
+        Index("ix_tickets_status_service_type_id", "status", "service_type", "id"),
+        Index("ix_tickets_status_created_at", "status", "created_at"),
+        Index("ix_tickets_status_completed_at", "status", "completed_at"),
+        Index("ix_tickets_created_at", "created_at"),
+        Index("ix_tickets_citizen_id_status", "citizen_id", "status"),
+        Index("ix_tickets_id_number_hash_status", "id_number_hash", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    ticket_number = Column(String, unique=True, index=True, nullable=False)
+    ticket_number = Column(String, index=True, nullable=False)
+    business_day = Column(Date, nullable=False)
     citizen_id = Column(Integer, nullable=False)
-    id_number_hash = Column(String, index=True, nullable=False)
+    id_number_hash = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     service_type = Column(SQLEnum(ServiceType), nullable=False)
     status = Column(SQLEnum(TicketStatus), default=TicketStatus.WAITING)
@@ -113,6 +232,15 @@ class Ticket(Base):
     qr_code = Column(String, nullable=True)
 
 
+class TicketSequence(Base):
+    """Last ticket number issued per service prefix and business day"""
+    __tablename__ = "ticket_sequences"
+
+    prefix = Column(String, primary_key=True)
+    business_day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
 class Counter(Base):
     """Service counter information"""
     __tablename__ = "counters"
@@ -127,8 +255,15 @@ class Counter(Base):
 
 
 class AuditLog(Base):
-    """Audit trail for security and fraud detection"""
+    """Audit trail for security and fraud detection (closed months are moved to audit_archive.py files)"""
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # See migrations/versions/0004_audit_log_indexes.py
+        Index("ix_audit_logs_timestamp", "timestamp"),
+        Index("ix_audit_logs_ticket_id", "ticket_id"),
+        Index("ix_audit_logs_citizen_id_timestamp", "citizen_id", "timestamp"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     action = Column(String, nullable=False)
@@ -141,10 +276,40 @@ class AuditLog(Base):
     is_suspicious = Column(Boolean, default=False)
 
 
+class ClusterEvent(Base):
+    """Ticket event relayed between server workers (see cluster.py); rows are pruned after a few minutes"""
+    __tablename__ = "cluster_events"
+    # Ids are never reused, so workers can tail the table by id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)
+    payload = Column(String, nullable=False)  # JSON: timestamp, data and context
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 # Database initialization
+def get_alembic_config():
+    """Alembic configuration bound to the configured database"""
+    from alembic.config import Config
+
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
+    return config
+
+
 def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    """Initialize database tables by migrating to the latest schema"""
+    from alembic import command
+
+    config = get_alembic_config()
+    inspector = inspect(engine)
+    if inspector.has_table("tickets") and not inspector.has_table("alembic_version"):
+        # Database was created with create_all before migrations existed
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
 
 
 def get_db():
@@ -155,3 +320,10 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db(request: Request):
+    """Async database session dependency; requests other than GET and HEAD may write"""
+    session_factory = AsyncSessionLocal if request.method in ("GET", "HEAD") else AsyncWriteSessionLocal
+    async with session_factory() as db:
+        yield db
+
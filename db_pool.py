@@ -0,0 +1,115 @@
+"""
+Database connection pooling for Queue Management System
+Builds the pool and driver options of the sync and async engines from
+config.settings, and times every connection checkout so pool exhaustion
+shows up in /api/admin/pool before it shows up as request timeouts.
+Each server worker has its own pools: pool_size connections kept open,
+up to max_overflow more under load, and pool_timeout to wait for one
+before failing. Connections older than pool_recycle are replaced (-1:
+never) and pre-ping tests each one before use. The statement cache is
+per connection (SQLite cached_statements, asyncpg prepared statements).
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import settings
+
+
+class PoolMetrics:
+    """Checkout counters of one pool"""
+
+    def __init__(self):
+        self.checkouts_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float):
+        self.checkouts_total += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class _MeteredPool:
+    """
+    Times each checkout: waiting for a free connection, opening a new one
+    and the pre-ping. Metrics start over when the pool is recreated
+    (engine.dispose(), e.g. after a gunicorn fork)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts_total += 1
+            raise
+        finally:
+            self.metrics.record(time.perf_counter() - start)
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(database_url: str) -> dict:
+    """create_engine / create_async_engine keyword arguments for a database URL"""
+    url = make_url(database_url)
+    driver = url.get_driver_name()
+    options = {}
+
+    # Statements prepared once per connection and reused by later requests
+    if driver == "pysqlite":
+        options["connect_args"] = {"check_same_thread": False, "cached_statements": settings.db_statement_cache_size}
+    elif driver == "aiosqlite":
+        options["connect_args"] = {"cached_statements": settings.db_statement_cache_size}
+    elif driver == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; keep SQLAlchemy's pool for them
+        return options
+
+    options.update(
+        poolclass=MeteredAsyncQueuePool if url.get_dialect().is_async else MeteredQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping
+    )
+    return options
+
+
+def pool_stats(engine) -> dict:
+    """Current state and checkout counters of an engine's pool"""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            timeout_seconds=pool.timeout()
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            checkouts_total=metrics.checkouts_total,
+            timeouts_total=metrics.timeouts_total,
+            wait_ms_avg=round(metrics.wait_seconds_total * 1000 / max(metrics.checkouts_total, 1), 3),
+            wait_ms_max=round(metrics.wait_seconds_max * 1000, 3)
+        )
+    return stats
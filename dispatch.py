@@ -0,0 +1,199 @@
+"""
+In-memory dispatch queue for Queue Management System
+Keeps one heap of waiting tickets per service type so counters can
+pick the oldest eligible ticket without scanning the tickets table
+"""
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from database import Ticket, TicketStatus, ServiceType
+from events import TICKET_CREATED
+from queue_positions import QueuePositionIndex
+from timing_wheel import TimingWheel
+from config import settings
+
+
+class DispatchQueue:
+    """
+    Per-service min-heaps of waiting tickets ordered by creation time
+
+    Heap entries are (created_at, ticket_id). Removals are lazy: the
+    ticket is dropped from the live index and its heap entry is skipped
+    the next time it reaches the top of its heap.
+
+    A QueuePositionIndex over the same live set answers queue positions,
+    and a TimingWheel over their expires_at tells the expiry sweeper which
+    tickets are due.
+
+    The queue also follows the event bus, which is how tickets issued or
+    called by other server workers reach it. It can therefore hold
+    tickets another worker has just claimed; callers must claim a popped
+    ticket with a conditional UPDATE rather than trust it is waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heaps: Dict[ServiceType, List[Tuple[datetime, int]]] = {st: [] for st in ServiceType}
+        self._live: Dict[int, Tuple[ServiceType, datetime]] = {}  # ticket_id -> (service_type, expires_at)
+        self._positions = QueuePositionIndex()
+        self._expiry = TimingWheel(settings.expiry_sweep_interval_seconds, settings.expiry_wheel_slots)
+
+    def load(self, db) -> int:
+        """
+        Rebuild all heaps from the waiting tickets in the database
+        Returns number of tickets loaded
+        """
+        rows = db.query(
+            Ticket.id, Ticket.service_type, Ticket.created_at, Ticket.expires_at
+        ).filter(
+            Ticket.status == TicketStatus.WAITING
+        ).order_by(Ticket.id).all()
+
+        with self._lock:
+            self._heaps = {st: [] for st in ServiceType}
+            self._live = {}
+            self._positions.clear()
+            self._expiry.clear()
+            for ticket_id, service_type, created_at, expires_at in rows:
+                self._heaps[service_type].append((created_at, ticket_id))
+                self._live[ticket_id] = (service_type, expires_at)
+                self._positions.add(ticket_id, service_type)
+                self._expiry.add(ticket_id, expires_at)
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+
+        return len(rows)
+
+    def refresh(self, db) -> int:
+        """
+        Reconcile with the database while requests keep using the queue
+        Adds waiting tickets that are missing and drops ones that are no
+        longer waiting; tickets issued during the query are left alone.
+        Returns number of tickets changed
+        """
+        horizon = db.query(func.max(Ticket.id)).scalar() or 0
+        rows = db.query(
+            Ticket.id, Ticket.service_type, Ticket.created_at, Ticket.expires_at
+        ).filter(
+            Ticket.status == TicketStatus.WAITING,
+            Ticket.id <= horizon
+        ).all()
+
+        waiting = {row[0] for row in rows}
+        with self._lock:
+            stale = [ticket_id for ticket_id in self._live if ticket_id <= horizon and ticket_id not in waiting]
+            missing = [row for row in rows if row[0] not in self._live]
+        for ticket_id in stale:
+            self.discard(ticket_id)
+        for row in missing:
+            self._add(*row)
+        return len(stale) + len(missing)
+
+    def push(self, ticket: Ticket):
+        """Add a waiting ticket to its service heap"""
+        self._add(ticket.id, ticket.service_type, ticket.created_at, ticket.expires_at)
+
+    def _add(self, ticket_id: int, service_type: ServiceType, created_at: datetime, expires_at: datetime):
+        with self._lock:
+            if ticket_id in self._live:
+                return
+            heapq.heappush(self._heaps[service_type], (created_at, ticket_id))
+            self._live[ticket_id] = (service_type, expires_at)
+            self._positions.add(ticket_id, service_type)
+            self._expiry.add(ticket_id, expires_at)
+
+    def discard(self, ticket_id: int):
+        """Remove a ticket that is no longer waiting"""
+        with self._lock:
+            self._live.pop(ticket_id, None)
+            self._positions.remove(ticket_id)
+            self._expiry.remove(ticket_id)
+
+    def apply(self, event: dict):
+        """Event bus listener: add new tickets and drop ones that left the waiting state"""
+        context = event.get("context", {})
+        ticket_id = context.get("ticket_id")
+        if ticket_id is None:
+            return
+        if event["type"] == TICKET_CREATED:
+            self._add(
+                ticket_id,
+                ServiceType(event["data"]["service_type"]),
+                datetime.fromisoformat(event["data"]["created_at"]),
+                datetime.fromisoformat(context["expires_at"])
+            )
+        else:
+            self.discard(ticket_id)
+
+    def _top(self, service_type: ServiceType, now: datetime) -> Optional[Tuple[datetime, int]]:
+        """Return the oldest live, unexpired entry of a heap (lock must be held)"""
+        heap = self._heaps[service_type]
+        while heap:
+            created_at, ticket_id = heap[0]
+            entry = self._live.get(ticket_id)
+            if entry is not None and entry[1] > now:
+                return heap[0]
+            heapq.heappop(heap)
+            if entry is not None:
+                # Expired but not swept yet; it stays in the expiry wheel
+                # so the sweeper still marks the row EXPIRED
+                del self._live[ticket_id]
+                self._positions.remove(ticket_id)
+        return None
+
+    def pop_next(self, service_types: Iterable[ServiceType], now: Optional[datetime] = None) -> Optional[int]:
+        """
+        Remove and return the oldest waiting ticket id across the given services
+        Returns None when nothing eligible is waiting
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            best = None
+            best_service = None
+            for service_type in set(service_types):
+                top = self._top(service_type, now)
+                if top is not None and (best is None or top < best):
+                    best = top
+                    best_service = service_type
+
+            if best is None:
+                return None
+
+            heapq.heappop(self._heaps[best_service])
+            del self._live[best[1]]
+            self._positions.remove(best[1])
+            self._expiry.remove(best[1])
+            return best[1]
+
+    def pop_expired(self, now: Optional[datetime] = None) -> List[int]:
+        """Remove and return the ids of every waiting ticket past its expires_at"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            due = self._expiry.advance(now)
+            for ticket_id in due:
+                self._live.pop(ticket_id, None)
+                self._positions.remove(ticket_id)
+            return due
+
+    def position(self, ticket_id: int) -> Optional[int]:
+        """1-based queue position within the ticket's service, None if not waiting"""
+        with self._lock:
+            return self._positions.position(ticket_id)
+
+    def waiting_count(self, service_type: ServiceType) -> int:
+        """Number of waiting tickets for a service"""
+        with self._lock:
+            return self._positions.waiting_count(service_type)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, ticket_id: int) -> bool:
+        return ticket_id in self._live
+
+
+dispatch_queue = DispatchQueue()
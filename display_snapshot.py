@@ -0,0 +1,86 @@
+"""
+Shared display snapshots for Queue Management System
+Display payloads are built once per queue change and served to every
+screen from memory, with strong ETags so unchanged polls get a 304
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+# A builder returns the payload and the time after which it goes stale
+# on its own (e.g. the next waiting ticket expiry), or None
+SnapshotBuilder = Callable[[], Awaitable[Tuple[object, Optional[datetime]]]]
+
+
+class Snapshot:
+    """One built payload: serialized body plus its strong ETag"""
+
+    def __init__(self, version: int, body: bytes, valid_until: Optional[datetime]):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.valid_until = valid_until
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True when an If-None-Match header already names this snapshot"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class VersionedSnapshot:
+    """
+    Payload cache invalidated by a version counter
+
+    invalidate() bumps the version (it is registered as an event bus
+    listener). get() rebuilds only when the cached snapshot is older than
+    the current version or past its valid_until; callers arriving while a
+    build is running wait for that build instead of starting another.
+    """
+
+    def __init__(self, build: SnapshotBuilder):
+        self._build = build
+        self._version = 0
+        self._snapshot: Optional[Snapshot] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.builds = 0
+
+    def invalidate(self, event: Optional[dict] = None):
+        self._version += 1
+
+    def _fresh(self) -> Optional[Snapshot]:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            return None
+        if snapshot.valid_until is not None and datetime.utcnow() >= snapshot.valid_until:
+            return None
+        return snapshot
+
+    async def get(self) -> Snapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            # Another caller may have rebuilt while we waited
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+
+            version = self._version
+            payload, valid_until = await self._build()
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+            # Tagged with the version seen before the build; an event that
+            # arrived meanwhile makes the next get() rebuild again
+            self._snapshot = Snapshot(version, body, valid_until)
+            self.builds += 1
+            return self._snapshot
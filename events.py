@@ -0,0 +1,154 @@
+"""
+Internal event bus for Queue Management System
+Ticket transitions are published here and fanned out to in-process
+listeners and to Server-Sent Events subscribers (display and counter screens)
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, Deque, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Event types
+TICKET_CREATED = "ticket.created"
+TICKET_CALLED = "ticket.called"
+TICKET_ASSIGNED = "ticket.assigned"
+TICKET_VERIFIED = "ticket.verified"
+TICKET_COMPLETED = "ticket.completed"
+TICKET_CANCELLED = "ticket.cancelled"
+TICKET_EXPIRED = "ticket.expired"
+COUNTER_CREATED = "counter.created"
+
+# Sent to a subscriber that fell behind or reconnected past the replay
+# history; it should refetch full state
+RESYNC = "resync"
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for ticket transitions
+
+    publish() must be called from the event loop thread. Each subscriber
+    gets a bounded queue; one that overflows is reset to a single
+    resync event instead of blocking publishers.
+
+    SSE ids are "<stream_id>:<event id>". stream_id is new in every
+    process, so a client reconnecting to a restarted server or to another
+    worker is sent a resync instead of a replay of unrelated events.
+    """
+
+    def __init__(self, history_size: int = 256, subscriber_queue_size: int = 256):
+        self._history: Deque[dict] = deque(maxlen=history_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._queue_size = subscriber_queue_size
+        self._next_id = 1
+        self.stream_id = uuid.uuid4().hex[:8]
+        if hasattr(os, "register_at_fork"):
+            # Workers forked from a preloaded app must not share a stream id
+            os.register_at_fork(after_in_child=self._new_stream)
+
+    def _new_stream(self):
+        self.stream_id = uuid.uuid4().hex[:8]
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Register a synchronous in-process listener called for every event"""
+        self._listeners.append(callback)
+
+    def publish(self, event_type: str, context: Optional[dict] = None, **data) -> dict:
+        """
+        Publish an event to all listeners and subscribers
+        context carries internal ids for in-process listeners; only data is sent to subscribers
+        """
+        return self._dispatch(event_type, datetime.utcnow().isoformat(), data, context or {})
+
+    def relay(self, event_type: str, timestamp: str, data: dict, context: dict) -> dict:
+        """Publish an event that was first published by another server worker"""
+        return self._dispatch(event_type, timestamp, data, context)
+
+    def _dispatch(self, event_type: str, timestamp: str, data: dict, context: dict) -> dict:
+        event = {
+            "id": self._next_id,
+            "type": event_type,
+            "timestamp": timestamp,
+            "data": data,
+            "context": context
+        }
+        self._next_id += 1
+        self._history.append(event)
+
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Event listener failed for %s", event_type)
+
+        for queue in self._subscribers:
+            self._offer(queue, event)
+
+        return event
+
+    def _offer(self, queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop its backlog and ask it to refetch
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self._resync_event())
+
+    def _resync_event(self) -> dict:
+        return {
+            "id": self._next_id - 1,
+            "type": RESYNC,
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": {},
+            "context": {}
+        }
+
+    @asynccontextmanager
+    async def subscribe(self, last_event_id: Optional[str] = None):
+        """
+        Subscribe to events as an asyncio.Queue
+        With last_event_id, missed events are replayed from history when
+        still available, otherwise a resync event is queued first
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        if last_event_id:
+            stream_id, _, last_id = last_event_id.partition(":")
+            if stream_id != self.stream_id or not last_id.isdigit():
+                # Issued by another worker or an earlier server process
+                self._offer(queue, self._resync_event())
+            else:
+                last_id = int(last_id)
+                missed = [event for event in self._history if event["id"] > last_id]
+                oldest = self._history[0]["id"] if self._history else self._next_id
+                if last_id + 1 < oldest:
+                    self._offer(queue, self._resync_event())
+                for event in missed:
+                    self._offer(queue, event)
+
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event in text/event-stream format"""
+    event_id = f"{event_bus.stream_id}:{event['id']}"
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+event_bus = EventBus()
@@ -0,0 +1,79 @@
+"""
+Background ticket expiry for Queue Management System
+Every tick the dispatch queue's timing wheel yields the waiting tickets
+that are now due; they are marked EXPIRED with one set-based UPDATE and
+audited and published like any other transition
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import update
+
+from audit_writer import audit_writer
+from database import AsyncWriteSessionLocal, Ticket, TicketStatus
+from dispatch import dispatch_queue
+
+logger = logging.getLogger(__name__)
+
+# Ids per UPDATE statement, well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+class ExpirySweeper:
+    """Marks due waiting tickets EXPIRED; on_expired is called for each after commit"""
+
+    def __init__(self, on_expired: Callable[[Ticket], None]):
+        self._on_expired = on_expired
+        self._retry: List[int] = []  # due ids from a sweep that failed
+        self.expired_total = 0
+
+    async def expire(self, ticket_ids: List[int], now: datetime = None) -> List[Ticket]:
+        """Expire the given tickets if they are still waiting"""
+        now = now or datetime.utcnow()
+        expired = []
+        async with AsyncWriteSessionLocal() as db:
+            for start in range(0, len(ticket_ids), CHUNK_SIZE):
+                chunk = ticket_ids[start:start + CHUNK_SIZE]
+                tickets = (await db.scalars(
+                    update(Ticket)
+                    .where(Ticket.id.in_(chunk), Ticket.status == TicketStatus.WAITING)
+                    .values(status=TicketStatus.EXPIRED, completed_at=now)
+                    .returning(Ticket)
+                    .execution_options(synchronize_session=False)
+                )).all()
+                for ticket in tickets:
+                    audit_writer.record(
+                        db, "TICKET_EXPIRED",
+                        ticket_id=ticket.id,
+                        citizen_id=ticket.citizen_id,
+                        details=f"Ticket {ticket.ticket_number} expired while waiting",
+                        timestamp=now
+                    )
+                expired.extend(tickets)
+            await db.commit()
+
+        self.expired_total += len(expired)
+        for ticket in expired:
+            self._on_expired(ticket)
+        return expired
+
+    async def sweep(self) -> int:
+        """Expire everything the timing wheel says is due; returns number expired"""
+        due = self._retry + dispatch_queue.pop_expired()
+        if not due:
+            return 0
+        self._retry = due
+        expired = await self.expire(due)
+        self._retry = []
+        return len(expired)
+
+    async def run(self, interval_seconds: float):
+        """Background task: sweep once per wheel tick"""
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Expiry sweep failed")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,203 @@
+"""
+In-memory fraud detector for Queue Management System
+Keeps per-citizen sliding windows of ticket activity, fed by ticket
+events and seeded from the database the first time a citizen is checked
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from config import settings
+from database import Ticket, TicketStatus
+from events import TICKET_CREATED, TICKET_CANCELLED, TICKET_EXPIRED
+
+
+class FraudRule:
+    """Suspicious when `threshold` or more matching events fall inside `window`"""
+
+    def __init__(self, name: str, event_types: FrozenSet[str], window: timedelta, threshold: int,
+                 statuses: Optional[FrozenSet[TicketStatus]] = None, timestamp_column: str = "created_at"):
+        self.name = name
+        self.event_types = event_types
+        self.window = window
+        self.threshold = threshold
+        # How to recognise a matching ticket row when seeding from the database
+        self.statuses = statuses
+        self.timestamp_column = timestamp_column
+
+    def seed_timestamp(self, ticket) -> Optional[datetime]:
+        """Timestamp this rule would have recorded for a ticket row, None if it does not match"""
+        if self.statuses is not None and ticket.status not in self.statuses:
+            return None
+        return getattr(ticket, self.timestamp_column) or ticket.created_at
+
+
+def default_rules() -> List[FraudRule]:
+    return [
+        # Issuing and cancelling tickets over and over
+        FraudRule(
+            "issued",
+            frozenset([TICKET_CREATED]),
+            timedelta(minutes=settings.fraud_issued_window_minutes),
+            settings.fraud_issued_threshold
+        ),
+        # Tickets repeatedly left to expire or cancelled
+        FraudRule(
+            "failed",
+            frozenset([TICKET_CANCELLED, TICKET_EXPIRED]),
+            timedelta(days=settings.fraud_failed_window_days),
+            settings.fraud_failed_threshold,
+            statuses=frozenset([TicketStatus.CANCELLED, TicketStatus.EXPIRED]),
+            timestamp_column="completed_at"
+        ),
+    ]
+
+
+class _Window:
+    """
+    (timestamp, ticket id) entries of one rule, kept in timestamp order
+
+    A ticket counts once per rule: the cluster relay delivers events at
+    least once and possibly out of order, so repeats are ignored and late
+    events are inserted in place rather than appended.
+    """
+
+    __slots__ = ("entries", "ticket_ids")
+
+    def __init__(self):
+        self.entries: List[Tuple[datetime, int]] = []
+        self.ticket_ids: Set[int] = set()
+
+    def add(self, stamp: datetime, ticket_id: int):
+        if ticket_id in self.ticket_ids:
+            return
+        self.ticket_ids.add(ticket_id)
+        insort(self.entries, (stamp, ticket_id))
+
+    def prune(self, cutoff: datetime):
+        """Drop entries older than cutoff"""
+        stale = bisect_left(self.entries, (cutoff,))
+        for _, ticket_id in self.entries[:stale]:
+            self.ticket_ids.discard(ticket_id)
+        del self.entries[:stale]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class _CitizenWindows:
+    __slots__ = ("windows", "loaded_at")
+
+    def __init__(self, rules: List[FraudRule]):
+        self.windows: Dict[str, _Window] = {rule.name: _Window() for rule in rules}
+        self.loaded_at = time.monotonic()
+
+
+class FraudDetector:
+    """
+    Sliding-window counters per citizen, bounded by an LRU of max_citizens
+
+    A citizen's windows are loaded from the tickets table on first check
+    and dropped after ttl_seconds, when the next check reloads them.
+    Events for citizens not in memory are ignored since a later load
+    will see them in the database.
+    """
+
+    def __init__(self, rules: List[FraudRule], max_citizens: int, ttl_seconds: float):
+        self.rules = rules
+        self.max_citizens = max_citizens
+        self.ttl_seconds = ttl_seconds
+        self._lookback = max(rule.window for rule in rules)
+        self._citizens: "OrderedDict[int, _CitizenWindows]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, db, citizen_id: int) -> _CitizenWindows:
+        """Seed one citizen's windows from their recent tickets"""
+        # Failed tickets are timestamped at completion, which can trail
+        # creation by up to the ticket lifetime
+        since = datetime.utcnow() - self._lookback - timedelta(hours=settings.ticket_expiry_hours)
+        tickets = db.query(Ticket.id, Ticket.status, Ticket.created_at, Ticket.completed_at).filter(
+            Ticket.citizen_id == citizen_id,
+            Ticket.created_at >= since
+        ).all()
+
+        entry = _CitizenWindows(self.rules)
+        for rule in self.rules:
+            for ticket in tickets:
+                stamp = rule.seed_timestamp(ticket)
+                if stamp is not None:
+                    entry.windows[rule.name].add(stamp, ticket.id)
+        return entry
+
+    def _get(self, citizen_id: int) -> Optional[_CitizenWindows]:
+        """Cached windows for a citizen, None when absent or past the TTL (lock must be held)"""
+        entry = self._citizens.get(citizen_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            del self._citizens[citizen_id]
+            return None
+        self._citizens.move_to_end(citizen_id)
+        return entry
+
+    def _store(self, citizen_id: int, entry: _CitizenWindows):
+        with self._lock:
+            self._citizens[citizen_id] = entry
+            self._citizens.move_to_end(citizen_id)
+            while len(self._citizens) > self.max_citizens:
+                self._citizens.popitem(last=False)
+
+    def check(self, db, citizen_id: int, now: Optional[datetime] = None) -> List[str]:
+        """
+        Names of the rules a citizen currently trips (empty if none)
+        db is a sync session, used only on a cache miss
+        """
+        with self._lock:
+            entry = self._get(citizen_id)
+        if entry is None:
+            self.misses += 1
+            entry = self._load(db, citizen_id)
+            self._store(citizen_id, entry)
+        else:
+            self.hits += 1
+
+        now = now or datetime.utcnow()
+        tripped = []
+        with self._lock:
+            for rule in self.rules:
+                window = entry.windows[rule.name]
+                window.prune(now - rule.window)
+                if len(window) >= rule.threshold:
+                    tripped.append(rule.name)
+        return tripped
+
+    def apply(self, event: dict):
+        """Event bus listener: record ticket activity of citizens held in memory (idempotent)"""
+        context = event.get("context", {})
+        citizen_id = context.get("citizen_id")
+        ticket_id = context.get("ticket_id")
+        if citizen_id is None or ticket_id is None:
+            return
+        with self._lock:
+            entry = self._citizens.get(citizen_id)
+            if entry is None:
+                return
+            stamp = datetime.fromisoformat(event["timestamp"])
+            for rule in self.rules:
+                if event["type"] in rule.event_types:
+                    entry.windows[rule.name].add(stamp, ticket_id)
+
+    def stats(self) -> dict:
+        return {"citizens_cached": len(self._citizens), "hits": self.hits, "misses": self.misses}
+
+
+fraud_detector = FraudDetector(
+    default_rules(),
+    max_citizens=settings.fraud_cache_size,
+    ttl_seconds=settings.fraud_cache_ttl_minutes * 60
+)
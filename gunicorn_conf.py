@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for production deployments
+
+    WORKERS=4 gunicorn -c gunicorn_conf.py main:app
+    python run_server.py --workers 4            # same thing
+
+The app is imported once in the master (preload_app) and forked into
+uvicorn workers. The database is migrated in the master before forking,
+and with more than one worker each worker relays its ticket events to
+the others through cluster.py.
+"""
+import os
+import shutil
+
+from config import settings
+
+if settings.workers > 1:
+    # Must be set before the app (and prometheus_client) is imported
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.abspath(settings.prometheus_multiproc_dir))
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+bind = f"{settings.host}:{os.environ.get('PORT', settings.port)}"
+workers = settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Kiosks and displays poll over a handful of long-lived connections;
+# keep them open across polls instead of reconnecting each time
+keepalive = settings.keepalive_seconds
+timeout = settings.worker_timeout_seconds
+graceful_timeout = settings.worker_timeout_seconds
+backlog = 2048
+
+accesslog = None
+errorlog = "-"
+loglevel = "info"
+
+
+def on_starting(server):
+    """Migrate once, before any worker starts"""
+    from database import init_db, engine
+
+    init_db()
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    """Give each worker fresh database connections and turn on event relaying"""
+    from database import engine, async_engine
+    from cluster import cluster_relay
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    cluster_relay.enabled = server.cfg.workers > 1
+
+
+def child_exit(server, worker):
+    """Let prometheus_client clean up after a worker that exited"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -2,34 +2,155 @@
 Main FastAPI application for Queue Management System
 Ethiopia - Queue Management Standard
 """
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, insert, select, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 
-from database import get_db, init_db, Ticket, Citizen, Counter, AuditLog, TicketStatus, ServiceType
+from database import (
+    engine, async_engine, AsyncSessionLocal, get_async_db, init_db, optimize_periodically,
+    Ticket, Citizen, Counter, AuditLog, TicketStatus, ServiceType
+)
 from models import (
     TicketCreateRequest, TicketResponse, TicketVerifyRequest,
+    TicketBatchRequest, TicketBatchItemResult, TicketBatchResponse,
     TicketAssignRequest,
     CounterCreateRequest, CounterResponse, CounterUpdateRequest,
     QueueStatusResponse, StatisticsResponse
 )
 from utils import (
-    hash_id_number, generate_ticket_number, generate_qr_code,
-    calculate_expiry_time, is_ticket_expired, estimate_wait_time,
-    format_ticket_for_printing, detect_suspicious_activity
+    hash_id_number,
+    calculate_expiry_time,
+    format_ticket_for_printing
 )
 from config import settings
 from auth import require_role
+from dispatch import dispatch_queue
+from qr_render import qr_renderer
+from events import (
+    event_bus, format_sse, TICKET_CREATED, TICKET_CALLED, TICKET_ASSIGNED, TICKET_VERIFIED,
+    TICKET_COMPLETED, TICKET_CANCELLED, TICKET_EXPIRED, COUNTER_CREATED
+)
+from queue_stats import queue_stats
+from wait_estimator import wait_estimator
+from audit_writer import audit_writer
+from audit_archive import audit_archive, row_to_dict, AuditQuery
+from display_snapshot import VersionedSnapshot
+from expiry import ExpirySweeper
+from fraud import fraud_detector
+from citizen_cache import citizen_cache, CitizenEntry
+from ticket_numbers import allocate_ticket_number, allocate_ticket_numbers, current_business_day
+from cluster import cluster_relay
+from db_pool import pool_stats
+import metrics
+from sql_profiler import SQLProfiler
 import os
 from fastapi.staticfiles import StaticFiles
+
+counter_access = require_role(["admin", "counter"])
+admin_access = require_role(["admin"])
+
+event_bus.add_listener(dispatch_queue.apply)
+event_bus.add_listener(queue_stats.apply)
+event_bus.add_listener(wait_estimator.apply)
+event_bus.add_listener(fraud_detector.apply)
+event_bus.add_listener(citizen_cache.apply)
+event_bus.add_listener(cluster_relay.capture)
+event_bus.add_listener(metrics.apply)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
+
+def ticket_by_number(ticket_number: str):
+    """Select the newest ticket with this number (numbers restart every business day)"""
+    return select(Ticket).where(Ticket.ticket_number == ticket_number).order_by(Ticket.id.desc()).limit(1)
+
+
+def isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def publish_ticket_event(event_type: str, ticket: Ticket):
+    """Publish a ticket transition to the event bus"""
+    event_bus.publish(
+        event_type,
+        context={
+            "ticket_id": ticket.id,
+            "citizen_id": ticket.citizen_id,
+            "id_number_hash": ticket.id_number_hash,
+            "expires_at": isoformat(ticket.expires_at)
+        },
+        ticket_number=ticket.ticket_number,
+        service_type=ticket.service_type.value,
+        status=ticket.status.value,
+        counter_number=ticket.counter_number,
+        waiting_count=len(dispatch_queue),
+        created_at=isoformat(ticket.created_at),
+        served_at=isoformat(ticket.served_at),
+        completed_at=isoformat(ticket.completed_at)
+    )
+
+
+expiry_sweeper = ExpirySweeper(on_expired=lambda ticket: publish_ticket_event(TICKET_EXPIRED, ticket))
+
+
+def qr_code_url(ticket: Ticket) -> str:
+    """
+    Relative URL of a ticket's QR code image
+    Ticket numbers restart every business day, so the URL also names the
+    ticket id and a cached image is never reused for another day's ticket
+    """
+    return f"/api/tickets/{ticket.ticket_number}/qr.png?ticket_id={ticket.id}"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables, load the in-memory dispatch queue and start the background tasks"""
+    init_db()
+    await cluster_relay.mark()
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(dispatch_queue.load)
+        await db.run_sync(queue_stats.load)
+        await db.run_sync(wait_estimator.load)
+        await db.run_sync(citizen_cache.load)
+    cluster_relay.start()
+    audit_writer.start()
+    sweeper = asyncio.create_task(expiry_sweeper.run(settings.expiry_sweep_interval_seconds))
+    archiver = asyncio.create_task(audit_archive.run_periodically(
+        settings.audit_hot_months, settings.audit_archive_interval_hours * 3600,
+        is_leader=cluster_relay.is_leader
+    ))
+    optimizer = asyncio.create_task(optimize_periodically(
+        settings.sqlite_optimize_interval_hours * 3600, is_leader=cluster_relay.is_leader
+    ))
+    yield
+    optimizer.cancel()
+    archiver.cancel()
+    sweeper.cancel()
+    await cluster_relay.stop()
+    await audit_writer.stop()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
-    description="Personalized Queue Management System"
+    description="Personalized Queue Management System",
+    lifespan=lifespan
 )
+app.add_middleware(metrics.MetricsMiddleware)
+if settings.sql_profiling:
+    SQLProfiler(settings.sql_slow_query_ms / 1000, settings.sql_repeat_threshold).install(
+        app, [engine, async_engine.sync_engine],
+        settings.sql_slow_log_file, settings.sql_slow_log_max_bytes, settings.sql_slow_log_backups
+    )
 # ================= STATIC FILES =================
 # Serve the entire web_portals folder at /web
 app.mount("/web", StaticFiles(directory="web_portals"), name="web")
@@ -52,139 +173,329 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(db: AsyncSession = Depends(get_async_db)):
+    """Prometheus scrape endpoint"""
+    in_service = {TicketStatus.CALLED.value: 0, TicketStatus.SERVING.value: 0}
+    rows = await db.execute(
+        select(Ticket.status, func.count())
+        .where(Ticket.status.in_([TicketStatus.CALLED, TicketStatus.SERVING]))
+        .group_by(Ticket.status)
+    )
+    for ticket_status, count in rows:
+        in_service[ticket_status.value] = count
+    return Response(metrics.render(in_service), media_type=metrics.CONTENT_TYPE)
+
+
 # ==================== KIOSK ENDPOINTS ====================
 
-@app.post("/api/tickets", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
-async def create_ticket(
-    request: TicketCreateRequest,
-    db: Session = Depends(get_db)
-):
-    """
-    Create a new ticket at kiosk
-    Enforces: One active ticket per citizen
-    """
-    # Hash ID for privacy
-    id_hash = hash_id_number(request.id_number)
+ACTIVE_STATUSES = [TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING]
 
-    # Check for existing active ticket
-    existing_ticket = db.query(Ticket).filter(
-        Ticket.id_number_hash == id_hash,
-        Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
-    ).first()
 
-    if existing_ticket:
+async def known_citizens(db: AsyncSession, id_hashes: List[str]) -> dict:
+    """
+    Citizen record and any active ticket for each ID hash that has one
+    Hashes the Bloom filter has never seen are skipped, cached ones cost
+    nothing, the rest are fetched in one round trip
+    """
+    found = {}
+    missing = []
+    for id_hash in id_hashes:
+        if citizen_cache.is_new(id_hash):
+            continue
+        entry = citizen_cache.get(id_hash)
+        if entry is None:
+            missing.append(id_hash)
+        else:
+            found[id_hash] = entry
+
+    if missing:
+        rows = (await db.execute(
+            select(Citizen.id_number_hash, Citizen.id, Citizen.is_blacklisted, Citizen.blacklist_reason,
+                   Ticket.id, Ticket.ticket_number)
+            .outerjoin(Ticket, and_(
+                Ticket.citizen_id == Citizen.id,
+                Ticket.status.in_(ACTIVE_STATUSES)
+            ))
+            .where(Citizen.id_number_hash.in_(missing))
+        )).all()
+        for id_hash, *fields in rows:
+            if id_hash not in found:
+                found[id_hash] = CitizenEntry(*fields)
+                citizen_cache.store(id_hash, found[id_hash])
+
+    return found
+
+
+async def check_known_citizen(db: AsyncSession, known: CitizenEntry, full_name: str):
+    """Raise if a registered citizen may not take a ticket right now"""
+    if known.active_ticket_number:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"You already have an active ticket: {existing_ticket.ticket_number}. Please wait to be served."
-        )
-
-    # Get or create citizen record
-    citizen = db.query(Citizen).filter(Citizen.id_number_hash == id_hash).first()
-
-    if not citizen:
-        citizen = Citizen(
-            id_number_hash=id_hash,
-            full_name=request.full_name,
-            phone_number=request.phone_number
+            detail=f"You already have an active ticket: {known.active_ticket_number}. Please wait to be served."
         )
-        db.add(citizen)
-        db.commit()
-        db.refresh(citizen)
 
     # Check if citizen is blacklisted
-    if citizen.is_blacklisted:
+    if known.is_blacklisted:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Access denied. Reason: {citizen.blacklist_reason}"
+            detail=f"Access denied. Reason: {known.blacklist_reason}"
         )
 
-    # Detect suspicious activity
-    if detect_suspicious_activity(citizen.id, db):
+    # Detect suspicious activity (first-time citizens have no history to check)
+    tripped_rules = await db.run_sync(lambda session: fraud_detector.check(session, known.citizen_id))
+    if tripped_rules:
         # Log suspicious activity
-        audit = AuditLog(
-            action="SUSPICIOUS_TICKET_REQUEST",
-            citizen_id=citizen.id,
-            details=f"Multiple ticket requests detected for {request.full_name}",
+        audit_writer.record(
+            db, "SUSPICIOUS_TICKET_REQUEST",
+            citizen_id=known.citizen_id,
+            details=f"Suspicious ticket requests ({', '.join(tripped_rules)}) detected for {full_name}",
             is_suspicious=True
         )
-        db.add(audit)
-        db.commit()
+        await db.commit()
 
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many ticket requests. Please contact administration."
         )
 
-    # Generate ticket number
-    last_ticket = db.query(Ticket).order_by(Ticket.id.desc()).first()
-    sequence = (last_ticket.id + 1) if last_ticket else 1
-    ticket_number = generate_ticket_number(request.service_type.value, sequence)
 
-    # Calculate queue position
-    queue_position = db.query(Ticket).filter(
-        Ticket.service_type == request.service_type,
-        Ticket.status == TicketStatus.WAITING
-    ).count() + 1
+async def issuance_conflict(db: AsyncSession, new_id_hashes: List[str]) -> HTTPException:
+    """Roll back an issuance that hit a unique constraint and build its 409"""
+    await db.rollback()
+    # A citizen may have been registered concurrently; look them up on retry
+    for id_hash in new_id_hashes:
+        citizen_cache.known.add(id_hash)
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Ticket request conflicted with another request. Please try again."
+    )
+
+
+def ticket_response(ticket: Ticket) -> TicketResponse:
+    """Response for a freshly issued ticket"""
+    queue_position = dispatch_queue.position(ticket.id)
+    return TicketResponse(
+        id=ticket.id,
+        ticket_number=ticket.ticket_number,
+        full_name=ticket.full_name,
+        service_type=ticket.service_type,
+        status=ticket.status,
+        counter_number=ticket.counter_number,
+        created_at=ticket.created_at,
+        expires_at=ticket.expires_at,
+        estimated_wait_minutes=wait_estimator.estimate(ticket.service_type, queue_position),
+        queue_position=queue_position,
+        qr_code_url=qr_code_url(ticket)
+    )
 
-    # Create ticket
+
+@app.post("/api/tickets", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
+async def create_ticket(
+    request: TicketCreateRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create a new ticket at kiosk
+    Enforces: One active ticket per citizen
+    """
+    # Hash ID for privacy
+    id_hash = hash_id_number(request.id_number)
+
+    known = (await known_citizens(db, [id_hash])).get(id_hash)
+
+    if known:
+        await check_known_citizen(db, known, request.full_name)
+        citizen_id = known.citizen_id
+    else:
+        citizen = Citizen(
+            id_number_hash=id_hash,
+            full_name=request.full_name,
+            phone_number=request.phone_number
+        )
+        db.add(citizen)
+        try:
+            await db.flush()
+        except IntegrityError:
+            raise await issuance_conflict(db, [id_hash])
+        citizen_id = citizen.id
+
+    # Generate ticket number (locks the day's counter row until commit, so do it last)
+    business_day = current_business_day()
+    ticket_number = await allocate_ticket_number(db, request.service_type, business_day)
+
+    # Ticket and audit row are committed together with any new citizen
+    now = datetime.utcnow()
     new_ticket = Ticket(
         ticket_number=ticket_number,
-        citizen_id=citizen.id,
+        business_day=business_day,
+        citizen_id=citizen_id,
         id_number_hash=id_hash,
         full_name=request.full_name,
         service_type=request.service_type,
         status=TicketStatus.WAITING,
+        created_at=now,
         expires_at=calculate_expiry_time()
     )
-
-    # Generate QR code
-    ticket_data = {
-        "ticket_number": ticket_number,
-        "full_name": request.full_name,
-        "service_type": request.service_type.value,
-        "created_at": str(datetime.utcnow())
-    }
-    new_ticket.qr_code = generate_qr_code(ticket_data)
-
     db.add(new_ticket)
-    db.commit()
-    db.refresh(new_ticket)
+    await db.flush()
 
     # Log action
-    audit = AuditLog(
-        action="TICKET_CREATED",
-        citizen_id=citizen.id,
+    audit_writer.record(
+        db, "TICKET_CREATED",
+        citizen_id=citizen_id,
         ticket_id=new_ticket.id,
-        details=f"Ticket {ticket_number} created for {request.service_type.value}"
-    )
-    db.add(audit)
-    db.commit()
-
-    # Prepare response
-    response = TicketResponse(
-        id=new_ticket.id,
-        ticket_number=new_ticket.ticket_number,
-        full_name=new_ticket.full_name,
-        service_type=new_ticket.service_type,
-        status=new_ticket.status,
-        counter_number=new_ticket.counter_number,
-        created_at=new_ticket.created_at,
-        expires_at=new_ticket.expires_at,
-        estimated_wait_minutes=estimate_wait_time(queue_position),
-        queue_position=queue_position,
-        qr_code=new_ticket.qr_code
+        details=f"Ticket {ticket_number} created for {request.service_type.value}",
+        timestamp=now
     )
 
-    return response
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise await issuance_conflict(db, [] if known else [id_hash])
+    if not known:
+        citizen_cache.store(id_hash, CitizenEntry(citizen_id, False, None))
+    dispatch_queue.push(new_ticket)
+    publish_ticket_event(TICKET_CREATED, new_ticket)
+
+    return ticket_response(new_ticket)
+
+
+@app.post("/api/tickets/batch", response_model=TicketBatchResponse)
+async def create_tickets_batch(
+    request: TicketBatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Issue several tickets at once (group registration, kiosk offline sync)
+    Each request is validated like POST /api/tickets, a malformed one getting
+    a 422 result of its own; the accepted ones are inserted with bulk
+    statements in one transaction. Results are per item, in request order.
+    """
+    results = {}
+
+    def reject(index: int, status_code: int, detail: str):
+        results[index] = TicketBatchItemResult(index=index, status_code=status_code, detail=detail)
+
+    items = {}
+    for index, raw in enumerate(request.tickets):
+        try:
+            items[index] = TicketCreateRequest.model_validate(raw)
+        except ValidationError as error:
+            reject(index, status.HTTP_422_UNPROCESSABLE_ENTITY, "; ".join(
+                f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+            ))
+    id_hashes = {index: hash_id_number(item.id_number) for index, item in items.items()}
+
+    known = await known_citizens(db, list(set(id_hashes.values())))
+
+    accepted = []  # request indexes that will get a ticket
+    seen = set()
+    for index, item in items.items():
+        id_hash = id_hashes[index]
+        if id_hash in seen:
+            reject(index, status.HTTP_400_BAD_REQUEST, "Duplicate ID number in batch")
+            continue
+        seen.add(id_hash)
+        if id_hash in known:
+            try:
+                await check_known_citizen(db, known[id_hash], item.full_name)
+            except HTTPException as error:
+                reject(index, error.status_code, error.detail)
+                continue
+        accepted.append(index)
+
+    if accepted:
+        new_citizens = [index for index in accepted if id_hashes[index] not in known]
+        citizen_ids = {
+            id_hashes[index]: known[id_hashes[index]].citizen_id
+            for index in accepted if id_hashes[index] in known
+        }
+        try:
+            # New citizens in one multi-row INSERT (RETURNING order is not
+            # guaranteed, so rows are matched back by hash and ticket number)
+            if new_citizens:
+                rows = (await db.execute(
+                    insert(Citizen).returning(Citizen.id_number_hash, Citizen.id),
+                    [
+                        {
+                            "id_number_hash": id_hashes[index],
+                            "full_name": items[index].full_name,
+                            "phone_number": items[index].phone_number
+                        }
+                        for index in new_citizens
+                    ]
+                )).all()
+                citizen_ids.update(dict(rows))
+
+            # One counter bump per service for the whole batch
+            business_day = current_business_day()
+            by_service = {}
+            for index in accepted:
+                by_service.setdefault(items[index].service_type, []).append(index)
+            ticket_numbers = {}
+            for service_type, indexes in by_service.items():
+                numbers = await allocate_ticket_numbers(db, service_type, business_day, len(indexes))
+                ticket_numbers.update(zip(indexes, numbers))
+
+            now = datetime.utcnow()
+            expires_at = calculate_expiry_time()
+            issued = (await db.scalars(
+                insert(Ticket).returning(Ticket),
+                [
+                    {
+                        "ticket_number": ticket_numbers[index],
+                        "business_day": business_day,
+                        "citizen_id": citizen_ids[id_hashes[index]],
+                        "id_number_hash": id_hashes[index],
+                        "full_name": items[index].full_name,
+                        "service_type": items[index].service_type,
+                        "status": TicketStatus.WAITING,
+                        "created_at": now,
+                        "expires_at": expires_at
+                    }
+                    for index in accepted
+                ]
+            )).all()
+
+            tickets = {ticket.ticket_number: ticket for ticket in issued}
+            for ticket in issued:
+                audit_writer.record(
+                    db, "TICKET_CREATED",
+                    citizen_id=ticket.citizen_id,
+                    ticket_id=ticket.id,
+                    details=f"Ticket {ticket.ticket_number} created for {ticket.service_type.value} (batch)",
+                    timestamp=now
+                )
+
+            await db.commit()
+        except IntegrityError:
+            raise await issuance_conflict(db, [id_hashes[index] for index in new_citizens])
+
+        for index in accepted:
+            ticket = tickets[ticket_numbers[index]]
+            if id_hashes[index] not in known:
+                citizen_cache.store(id_hashes[index], CitizenEntry(ticket.citizen_id, False, None))
+            dispatch_queue.push(ticket)
+            publish_ticket_event(TICKET_CREATED, ticket)
+            results[index] = TicketBatchItemResult(
+                index=index, status_code=status.HTTP_201_CREATED, ticket=ticket_response(ticket)
+            )
+
+    return TicketBatchResponse(
+        issued=len(accepted),
+        failed=len(request.tickets) - len(accepted),
+        results=[results[index] for index in range(len(request.tickets))]
+    )
 
 
 @app.get("/api/tickets/{ticket_number}", response_model=TicketResponse, dependencies=[Depends(counter_access)])
 async def get_ticket_status(
     ticket_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get ticket status"""
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -192,19 +503,17 @@ async def get_ticket_status(
             detail="Ticket not found"
         )
 
-    # Check if expired
-    if is_ticket_expired(ticket.expires_at) and ticket.status == TicketStatus.WAITING:
-        ticket.status = TicketStatus.EXPIRED
-        db.commit()
-
     # Calculate queue position
     queue_position = None
     if ticket.status == TicketStatus.WAITING:
-        queue_position = db.query(Ticket).filter(
-            Ticket.service_type == ticket.service_type,
-            Ticket.status == TicketStatus.WAITING,
-            Ticket.id < ticket.id
-        ).count() + 1
+        queue_position = dispatch_queue.position(ticket.id)
+        if queue_position is None:
+            # Not in this process's dispatch queue (e.g. written by a maintenance script)
+            queue_position = await db.scalar(select(func.count(Ticket.id)).where(
+                Ticket.service_type == ticket.service_type,
+                Ticket.status == TicketStatus.WAITING,
+                Ticket.id < ticket.id
+            )) + 1
 
     return TicketResponse(
         id=ticket.id,
@@ -215,10 +524,57 @@ async def get_ticket_status(
         counter_number=ticket.counter_number,
         created_at=ticket.created_at,
         expires_at=ticket.expires_at,
-        estimated_wait_minutes=estimate_wait_time(queue_position) if queue_position else None,
+        estimated_wait_minutes=wait_estimator.estimate(ticket.service_type, queue_position) if queue_position else None,
         queue_position=queue_position,
-        qr_code=ticket.qr_code
+        qr_code_url=qr_code_url(ticket)
+    )
+
+
+@app.get("/api/tickets/{ticket_number}/qr.png")
+async def get_ticket_qr_code(
+    ticket_number: str,
+    request: Request,
+    ticket_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get ticket QR code as a PNG image
+    Public so kiosk pages can embed it: served only while the ticket is active
+    and without the citizen's name. Rendered on first fetch and cached.
+    Without ticket_id the number means today's ticket, so caches must revalidate
+    """
+    query = select(
+        Ticket.id, Ticket.ticket_number, Ticket.service_type,
+        Ticket.created_at, Ticket.expires_at
+    ).where(
+        Ticket.ticket_number == ticket_number,
+        Ticket.status.in_(ACTIVE_STATUSES)
     )
+    if ticket_id is not None:
+        query = query.where(Ticket.id == ticket_id)
+    ticket = (await db.execute(query.order_by(Ticket.id.desc()).limit(1))).first()
+
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found"
+        )
+
+    max_age = max(0, int((ticket.expires_at - datetime.utcnow()).total_seconds()))
+    headers = {
+        "ETag": f'"qr-{ticket.id}"',
+        "Cache-Control": f"public, max-age={max_age}, immutable" if ticket_id is not None else "no-cache"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    png = await qr_renderer.get_png({
+        "id": ticket.id,
+        "ticket_number": ticket.ticket_number,
+        "service_type": ticket.service_type.value,
+        "created_at": str(ticket.created_at)
+    })
+    return Response(content=png, media_type="image/png", headers=headers)
 
 
 # ==================== COUNTER ENDPOINTS ====================
@@ -226,11 +582,11 @@ async def get_ticket_status(
 @app.post("/api/counters", response_model=CounterResponse)
 async def create_counter(
     request: CounterCreateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new service counter"""
     # Check if counter number exists
-    existing = db.query(Counter).filter(Counter.counter_number == request.counter_number).first()
+    existing = await db.scalar(select(Counter).where(Counter.counter_number == request.counter_number))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -247,26 +603,65 @@ async def create_counter(
     )
 
     db.add(counter)
-    db.commit()
-    db.refresh(counter)
+    await db.commit()
+    await db.refresh(counter)
+    event_bus.publish(COUNTER_CREATED, counter_number=counter.counter_number, is_active=counter.is_active,
+                      service_types=counter.service_types)
 
     return counter
 
 
 @app.get("/api/counters", response_model=List[CounterResponse])
-async def get_counters(db: Session = Depends(get_db)):
+async def get_counters(db: AsyncSession = Depends(get_async_db)):
     """Get all counters"""
-    counters = db.query(Counter).all()
+    counters = (await db.scalars(select(Counter))).all()
     return counters
 
 
+async def claim_waiting_ticket(db: AsyncSession, counter_number: int, *criteria) -> Optional[Ticket]:
+    """
+    Mark the waiting ticket matching criteria CALLED to a counter
+    Checking and claiming is one UPDATE ... WHERE status = 'waiting'
+    RETURNING, so when two requests (or two server workers) go for the
+    same ticket only one of them gets it back. On PostgreSQL the row is
+    locked with FOR UPDATE SKIP LOCKED, so the loser moves on at once
+    instead of waiting for the winner to commit
+    """
+    waiting = and_(Ticket.status == TicketStatus.WAITING, *criteria)
+    if db.bind.dialect.name == "postgresql":
+        waiting = and_(waiting, Ticket.id == (
+            select(Ticket.id).where(waiting).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+        ))
+    return await db.scalar(
+        update(Ticket)
+        .where(waiting)
+        .values(status=TicketStatus.CALLED, counter_number=counter_number, called_at=datetime.utcnow())
+        .returning(Ticket)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def requeue_unclaimed(db: AsyncSession, ticket_id: Optional[int]):
+    """
+    Put a ticket popped from the dispatch queue back when its claim did
+    not commit (e.g. SQLite "database is locked"); the row rolled back to
+    WAITING and would otherwise only be called again after a resync
+    """
+    if ticket_id is None:
+        return
+    await db.rollback()
+    ticket = await db.get(Ticket, ticket_id)
+    if ticket is not None and ticket.status == TicketStatus.WAITING:
+        dispatch_queue.push(ticket)
+
+
 @app.post("/api/counters/{counter_id}/call-next")
 async def call_next_ticket(
     counter_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Call next ticket in queue for this counter"""
-    counter = db.query(Counter).filter(Counter.id == counter_id).first()
+    counter = await db.get(Counter, counter_id)
 
     if not counter:
         raise HTTPException(
@@ -281,40 +676,41 @@ async def call_next_ticket(
         )
 
     # Get service types for this counter
-    service_types = counter.service_types.split(",")
-
-    # Find next waiting ticket
-    next_ticket = db.query(Ticket).filter(
-        Ticket.service_type.in_([ServiceType(st) for st in service_types]),
-        Ticket.status == TicketStatus.WAITING,
-        Ticket.expires_at > datetime.utcnow()
-    ).order_by(Ticket.created_at).first()
-
-    if not next_ticket:
-        return {
-            "message": "No tickets waiting",
-            "counter_number": counter.counter_number
-        }
+    service_types = [ServiceType(st) for st in counter.service_types.split(",")]
+
+    # Take the oldest waiting ticket from the dispatch queue, skipping
+    # any entry whose row has already left the waiting state
+    next_ticket = None
+    ticket_id = None
+    try:
+        while next_ticket is None:
+            ticket_id = dispatch_queue.pop_next(service_types)
+            if ticket_id is None:
+                break
+            next_ticket = await claim_waiting_ticket(db, counter.counter_number, Ticket.id == ticket_id)
+
+        if not next_ticket:
+            return {
+                "message": "No tickets waiting",
+                "counter_number": counter.counter_number
+            }
+
+        # Update counter
+        counter.current_ticket_id = next_ticket.id
 
-    # Update ticket status
-    next_ticket.status = TicketStatus.CALLED
-    next_ticket.counter_number = counter.counter_number
-    next_ticket.called_at = datetime.utcnow()
-
-    # Update counter
-    counter.current_ticket_id = next_ticket.id
-
-    db.commit()
+        # Log action
+        audit_writer.record(
+            db, "TICKET_CALLED",
+            ticket_id=next_ticket.id,
+            counter_id=counter.id,
+            details=f"Ticket {next_ticket.ticket_number} called to counter {counter.counter_number}"
+        )
 
-    # Log action
-    audit = AuditLog(
-        action="TICKET_CALLED",
-        ticket_id=next_ticket.id,
-        counter_id=counter.id,
-        details=f"Ticket {next_ticket.ticket_number} called to counter {counter.counter_number}"
-    )
-    db.add(audit)
-    db.commit()
+        await db.commit()
+    except Exception:
+        await requeue_unclaimed(db, ticket_id)
+        raise
+    publish_ticket_event(TICKET_CALLED, next_ticket)
 
     return {
         "message": "Ticket called",
@@ -328,10 +724,10 @@ async def call_next_ticket(
 async def verify_ticket_at_counter(
     counter_id: int,
     request: TicketVerifyRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify citizen ID matches ticket at counter"""
-    counter = db.query(Counter).filter(Counter.id == counter_id).first()
+    counter = await db.get(Counter, counter_id)
 
     if not counter:
         raise HTTPException(
@@ -340,7 +736,7 @@ async def verify_ticket_at_counter(
         )
 
     # Get ticket
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == request.ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(request.ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -353,15 +749,14 @@ async def verify_ticket_at_counter(
 
     if ticket.id_number_hash != id_hash:
         # Log mismatch
-        audit = AuditLog(
-            action="VERIFICATION_FAILED",
+        audit_writer.record(
+            db, "VERIFICATION_FAILED",
             ticket_id=ticket.id,
             counter_id=counter.id,
             details=f"ID mismatch for ticket {ticket.ticket_number}",
             is_suspicious=True
         )
-        db.add(audit)
-        db.commit()
+        await db.commit()
 
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -372,17 +767,16 @@ async def verify_ticket_at_counter(
     ticket.status = TicketStatus.SERVING
     ticket.served_at = datetime.utcnow()
 
-    db.commit()
-
     # Log success
-    audit = AuditLog(
-        action="VERIFICATION_SUCCESS",
+    audit_writer.record(
+        db, "VERIFICATION_SUCCESS",
         ticket_id=ticket.id,
         counter_id=counter.id,
         details=f"Ticket {ticket.ticket_number} verified successfully"
     )
-    db.add(audit)
-    db.commit()
+
+    await db.commit()
+    publish_ticket_event(TICKET_VERIFIED, ticket)
 
     return {
         "message": "Verification successful",
@@ -395,10 +789,10 @@ async def verify_ticket_at_counter(
 async def complete_service(
     counter_id: int,
     ticket_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark service as completed"""
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -406,15 +800,18 @@ async def complete_service(
             detail="Ticket not found"
         )
 
+    already_completed = ticket.status == TicketStatus.COMPLETED
     ticket.status = TicketStatus.COMPLETED
     ticket.completed_at = datetime.utcnow()
 
     # Clear counter's current ticket
-    counter = db.query(Counter).filter(Counter.id == counter_id).first()
+    counter = await db.get(Counter, counter_id)
     if counter:
         counter.current_ticket_id = None
 
-    db.commit()
+    await db.commit()
+    if not already_completed:
+        publish_ticket_event(TICKET_COMPLETED, ticket)
 
     return {
         "message": "Service completed",
@@ -426,10 +823,10 @@ async def complete_service(
 async def assign_ticket_to_counter(
     counter_id: int,
     request: TicketAssignRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Assign a waiting ticket to this counter"""
-    counter = db.query(Counter).filter(Counter.id == counter_id).first()
+    counter = await db.get(Counter, counter_id)
 
     if not counter:
         raise HTTPException(
@@ -443,7 +840,7 @@ async def assign_ticket_to_counter(
             detail="Counter is not active"
         )
 
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == request.ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(request.ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -451,27 +848,23 @@ async def assign_ticket_to_counter(
             detail="Ticket not found"
         )
 
-    if ticket.status != TicketStatus.WAITING:
+    if await claim_waiting_ticket(db, counter.counter_number, Ticket.id == ticket.id) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ticket is not waiting and cannot be assigned"
         )
-
-    ticket.status = TicketStatus.CALLED
-    ticket.counter_number = counter.counter_number
-    ticket.called_at = datetime.utcnow()
     counter.current_ticket_id = ticket.id
 
-    db.commit()
-
-    audit = AuditLog(
-        action="TICKET_ASSIGNED",
+    audit_writer.record(
+        db, "TICKET_ASSIGNED",
         ticket_id=ticket.id,
         counter_id=counter.id,
         details=f"Ticket {ticket.ticket_number} manually assigned to counter {counter.counter_number}"
     )
-    db.add(audit)
-    db.commit()
+
+    await db.commit()
+    dispatch_queue.discard(ticket.id)
+    publish_ticket_event(TICKET_ASSIGNED, ticket)
 
     return {
         "message": "Ticket assigned",
@@ -482,74 +875,82 @@ async def assign_ticket_to_counter(
 
 @app.post("/api/counters/assign-next")
 async def assign_next_waiting_ticket(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Assign the next waiting ticket to the next idle active counter"""
-    counters = db.query(Counter).filter(Counter.is_active == True).order_by(Counter.counter_number).all()
+    counters = (await db.scalars(
+        select(Counter).where(Counter.is_active == True).order_by(Counter.counter_number)
+    )).all()
     if not counters:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No counters configured"
         )
 
-    waiting_ticket = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.WAITING,
-        Ticket.expires_at > datetime.utcnow()
-    ).order_by(Ticket.created_at).first()
-
-    if not waiting_ticket:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No waiting tickets to assign"
-        )
-
     busy_counter_numbers = {
-        row[0] for row in db.query(Ticket.counter_number)
-            .filter(
+        counter_number for counter_number in await db.scalars(
+            select(Ticket.counter_number).where(
                 Ticket.counter_number.isnot(None),
                 Ticket.status.in_([TicketStatus.CALLED, TicketStatus.SERVING])
-            )
-            .distinct()
-            .all()
+            ).distinct()
+        )
     }
+    counter = next((c for c in counters if c.counter_number not in busy_counter_numbers), None)
 
-    for counter in counters:
-        if counter.counter_number in busy_counter_numbers:
-            continue
+    if counter is None:
+        if not len(dispatch_queue):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No waiting tickets to assign"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All counters are currently busy"
+        )
 
-        waiting_ticket.status = TicketStatus.CALLED
-        waiting_ticket.counter_number = counter.counter_number
-        waiting_ticket.called_at = datetime.utcnow()
-        counter.current_ticket_id = waiting_ticket.id
-        db.commit()
+    # Same as call-next: claim the oldest queued ticket that is still waiting
+    waiting_ticket = None
+    ticket_id = None
+    try:
+        while waiting_ticket is None:
+            ticket_id = dispatch_queue.pop_next(ServiceType)
+            if ticket_id is None:
+                break
+            waiting_ticket = await claim_waiting_ticket(db, counter.counter_number, Ticket.id == ticket_id)
+
+        if not waiting_ticket:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No waiting tickets to assign"
+            )
 
-        audit = AuditLog(
-            action="TICKET_ASSIGNED",
+        counter.current_ticket_id = waiting_ticket.id
+        audit_writer.record(
+            db, "TICKET_ASSIGNED",
             ticket_id=waiting_ticket.id,
             counter_id=counter.id,
             details=f"Ticket {waiting_ticket.ticket_number} auto-assigned to counter {counter.counter_number}"
         )
-        db.add(audit)
-        db.commit()
 
-        return {
-            "message": "Ticket assigned",
-            "ticket_number": waiting_ticket.ticket_number,
-            "counter_number": counter.counter_number
-        }
+        await db.commit()
+    except Exception:
+        await requeue_unclaimed(db, ticket_id)
+        raise
+    publish_ticket_event(TICKET_ASSIGNED, waiting_ticket)
 
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="All counters are currently busy"
-    )
+    return {
+        "message": "Ticket assigned",
+        "ticket_number": waiting_ticket.ticket_number,
+        "counter_number": counter.counter_number
+    }
 
 
 @app.post("/api/tickets/{ticket_number}/assign-next")
 async def assign_ticket_to_next_available_counter(
     ticket_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -563,7 +964,9 @@ async def assign_ticket_to_next_available_counter(
             detail="Ticket is not waiting and cannot be reassigned"
         )
 
-    counters = db.query(Counter).filter(Counter.is_active == True).order_by(Counter.counter_number).all()
+    counters = (await db.scalars(
+        select(Counter).where(Counter.is_active == True).order_by(Counter.counter_number)
+    )).all()
 
     if not counters:
         raise HTTPException(
@@ -572,33 +975,34 @@ async def assign_ticket_to_next_available_counter(
         )
 
     busy_counter_numbers = {
-        row[0] for row in db.query(Ticket.counter_number)
-            .filter(
+        counter_number for counter_number in await db.scalars(
+            select(Ticket.counter_number).where(
                 Ticket.counter_number.isnot(None),
                 Ticket.status.in_([TicketStatus.CALLED, TicketStatus.SERVING])
-            )
-            .distinct()
-            .all()
+            ).distinct()
+        )
     }
 
     for counter in counters:
         if counter.counter_number in busy_counter_numbers:
             continue
 
-        ticket.status = TicketStatus.CALLED
-        ticket.counter_number = counter.counter_number
-        ticket.called_at = datetime.utcnow()
+        if await claim_waiting_ticket(db, counter.counter_number, Ticket.id == ticket.id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ticket is not waiting and cannot be reassigned"
+            )
         counter.current_ticket_id = ticket.id
-        db.commit()
-
-        audit = AuditLog(
-            action="TICKET_ASSIGNED",
+        audit_writer.record(
+            db, "TICKET_ASSIGNED",
             ticket_id=ticket.id,
             counter_id=counter.id,
             details=f"Ticket {ticket.ticket_number} auto-assigned to counter {counter.counter_number}"
         )
-        db.add(audit)
-        db.commit()
+
+        await db.commit()
+        dispatch_queue.discard(ticket.id)
+        publish_ticket_event(TICKET_ASSIGNED, ticket)
 
         return {
             "message": "Ticket assigned",
@@ -618,14 +1022,14 @@ async def assign_ticket_to_next_available_counter(
 async def cancel_ticket(
     ticket_number: str,
     id_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cancel an active ticket
     Requires ID verification to prevent unauthorized cancellation
     """
     # Get ticket
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -652,17 +1056,17 @@ async def cancel_ticket(
     ticket.status = TicketStatus.CANCELLED
     ticket.completed_at = datetime.utcnow()
 
-    db.commit()
-
     # Log action
-    audit = AuditLog(
-        action="TICKET_CANCELLED",
+    audit_writer.record(
+        db, "TICKET_CANCELLED",
         ticket_id=ticket.id,
         citizen_id=ticket.citizen_id,
         details=f"Ticket {ticket_number} cancelled by user"
     )
-    db.add(audit)
-    db.commit()
+
+    await db.commit()
+    dispatch_queue.discard(ticket.id)
+    publish_ticket_event(TICKET_CANCELLED, ticket)
 
     return {
         "message": "Ticket cancelled successfully",
@@ -674,7 +1078,7 @@ async def cancel_ticket(
 @app.delete("/api/tickets/cancel-by-id")
 async def cancel_ticket_by_id(
     id_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cancel all active tickets for a given ID
@@ -684,10 +1088,12 @@ async def cancel_ticket_by_id(
     id_hash = hash_id_number(id_number)
 
     # Find all active tickets for this ID
-    active_tickets = db.query(Ticket).filter(
-        Ticket.id_number_hash == id_hash,
-        Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
-    ).all()
+    active_tickets = []
+    if not citizen_cache.has_no_active_ticket(id_hash):
+        active_tickets = (await db.scalars(select(Ticket).where(
+            Ticket.id_number_hash == id_hash,
+            Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
+        ))).all()
 
     if not active_tickets:
         raise HTTPException(
@@ -702,15 +1108,17 @@ async def cancel_ticket_by_id(
         cancelled_tickets.append(ticket.ticket_number)
 
         # Log action
-        audit = AuditLog(
-            action="TICKET_CANCELLED_BY_ID",
+        audit_writer.record(
+            db, "TICKET_CANCELLED_BY_ID",
             ticket_id=ticket.id,
             citizen_id=ticket.citizen_id,
             details=f"Ticket {ticket.ticket_number} cancelled via ID lookup"
         )
-        db.add(audit)
 
-    db.commit()
+    await db.commit()
+    for ticket in active_tickets:
+        dispatch_queue.discard(ticket.id)
+        publish_ticket_event(TICKET_CANCELLED, ticket)
 
     return {
         "message": f"Cancelled {len(cancelled_tickets)} ticket(s)",
@@ -721,13 +1129,13 @@ async def cancel_ticket_by_id(
 @app.post("/api/tickets/{ticket_number}/expire")
 async def force_expire_ticket(
     ticket_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Force expire a ticket (admin function)
     Useful for stuck tickets or testing
     """
-    ticket = db.query(Ticket).filter(Ticket.ticket_number == ticket_number).first()
+    ticket = await db.scalar(ticket_by_number(ticket_number))
 
     if not ticket:
         raise HTTPException(
@@ -744,16 +1152,16 @@ async def force_expire_ticket(
     ticket.status = TicketStatus.EXPIRED
     ticket.completed_at = datetime.utcnow()
 
-    db.commit()
-
     # Log action
-    audit = AuditLog(
-        action="TICKET_FORCE_EXPIRED",
+    audit_writer.record(
+        db, "TICKET_FORCE_EXPIRED",
         ticket_id=ticket.id,
         details=f"Ticket {ticket_number} force expired by admin"
     )
-    db.add(audit)
-    db.commit()
+
+    await db.commit()
+    dispatch_queue.discard(ticket.id)
+    publish_ticket_event(TICKET_EXPIRED, ticket)
 
     return {
         "message": "Ticket expired successfully",
@@ -765,7 +1173,7 @@ async def force_expire_ticket(
 @app.get("/api/tickets/active/{id_number}")
 async def get_active_tickets_by_id(
     id_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all active tickets for a given ID
@@ -773,10 +1181,12 @@ async def get_active_tickets_by_id(
     """
     id_hash = hash_id_number(id_number)
 
-    active_tickets = db.query(Ticket).filter(
-        Ticket.id_number_hash == id_hash,
-        Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
-    ).all()
+    active_tickets = []
+    if not citizen_cache.has_no_active_ticket(id_hash):
+        active_tickets = (await db.scalars(select(Ticket).where(
+            Ticket.id_number_hash == id_hash,
+            Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
+        ))).all()
 
     if not active_tickets:
         return {
@@ -803,14 +1213,66 @@ async def get_active_tickets_by_id(
 
 # ==================== DISPLAY ENDPOINTS ====================
 
-@app.get("/api/display/queue-status", response_model=QueueStatusResponse)
-async def get_queue_status(db: Session = Depends(get_db)):
-    """Get current queue status for display screen"""
-
-    # Get currently serving tickets
-    serving_tickets = db.query(Ticket).filter(
-        Ticket.status.in_([TicketStatus.CALLED, TicketStatus.SERVING])
-    ).all()
+# Display names for the dashboard
+SERVICE_TYPE_NAMES = {
+    # Civil Registration & Identification
+    ServiceType.KEBELE_ID: "Obtaining Kebele ID",
+    ServiceType.BIRTH_CERTIFICATE: "Birth Registration Certificate",
+    ServiceType.FAYDA_ID: "National ID (Fayda)",
+    ServiceType.NATIONAL_ID: "National ID (Fayda)",
+
+    # Land & Property
+    ServiceType.LAND_CONSTRUCTION_PERMIT: "Construction Permits (Land)",
+    ServiceType.LAND_MAPS: "Land Maps & Associated Matters",
+    ServiceType.LAND_REGISTRATION: "Land Registration",
+
+    # Travel & Immigration
+    ServiceType.PASSPORT_RENEWAL: "Passport Services",
+    ServiceType.VISA_SERVICES: "Visa Services",
+    ServiceType.YELLOW_CARD: "Yellow Card",
+    ServiceType.TRAVEL_DOCUMENTS: "Travel Documents",
+
+    # Business & Commercial
+    ServiceType.BUSINESS_LICENSE: "Business License (Trade License)",
+    ServiceType.BUSINESS_REGISTRATION: "Business Registration",
+    ServiceType.IMPORT_EXPORT: "Import/Export Services",
+
+    # Driving Services
+    ServiceType.DRIVER_LICENSE_RENEWAL: "Driver License Renewal",
+    ServiceType.DRIVER_LICENSE_NEW: "New Driver License",
+    ServiceType.VEHICLE_REGISTRATION: "Vehicle Registration",
+
+    # Telecommunications
+    ServiceType.ETHIO_TELECOM: "Ethio Telecom Services",
+    ServiceType.SIM_REGISTRATION: "SIM Card Registration",
+
+    # Banking & Financial
+    ServiceType.COMMERCIAL_BANK: "Commercial Bank Services",
+    ServiceType.FINANCIAL_SERVICES: "Other Financial Services",
+
+    # Postal Services
+    ServiceType.ETHIO_POST: "Ethio Post Services",
+    ServiceType.MAIL_SERVICES: "Mail & Package Services",
+
+    # Other Services
+    ServiceType.DOCUMENT_LEGALIZATION: "Document Legalization",
+    ServiceType.TAX_SERVICE: "Tax Services",
+    ServiceType.EDUCATION_SERVICES: "Education Services",
+    ServiceType.HEALTH_SERVICES: "Health Services",
+    ServiceType.IMMIGRATION: "Immigration Services",
+    ServiceType.OTHER: "Other Government Services",
+}
+
+
+async def build_queue_status():
+    """Build the display screen payload; stale at the next UTC midnight"""
+    async with AsyncSessionLocal() as db:
+        # Get currently serving tickets
+        serving_tickets = (await db.execute(
+            select(Ticket.ticket_number, Ticket.counter_number, Ticket.status).where(
+                Ticket.status.in_([TicketStatus.CALLED, TicketStatus.SERVING])
+            )
+        )).all()
 
     now_serving = [
         {
@@ -821,157 +1283,163 @@ async def get_queue_status(db: Session = Depends(get_db)):
         for t in serving_tickets
     ]
 
-    # Waiting count
-    waiting_count = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.WAITING
-    ).count()
-
-    # Total served today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    total_served_today = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.COMPLETED,
-        Ticket.completed_at >= today_start
-    ).count()
-
-    return QueueStatusResponse(
+    payload = QueueStatusResponse(
         now_serving=now_serving,
-        waiting_count=waiting_count,
-        total_served_today=total_served_today,
-        average_wait_minutes=15  # Placeholder
+        waiting_count=len(dispatch_queue),
+        total_served_today=queue_stats.snapshot()["total_served_today"],
+        average_wait_minutes=wait_estimator.average_wait(
+            {service_type: dispatch_queue.waiting_count(service_type) for service_type in ServiceType}
+        )
     )
+    next_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return payload, next_day
 
 
-@app.get("/api/display/waiting-tickets")
-async def get_waiting_tickets(db: Session = Depends(get_db)):
-    """Get all waiting tickets with details for dashboard display"""
-
-    waiting_tickets = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.WAITING,
-        Ticket.expires_at > datetime.utcnow()
-    ).order_by(Ticket.created_at).all()
-
-    service_type_map = {
-        # Civil Registration & Identification
-        ServiceType.KEBELE_ID: "Obtaining Kebele ID",
-        ServiceType.BIRTH_CERTIFICATE: "Birth Registration Certificate",
-        ServiceType.FAYDA_ID: "National ID (Fayda)",
-        ServiceType.NATIONAL_ID: "National ID (Fayda)",
-
-        # Land & Property
-        ServiceType.LAND_CONSTRUCTION_PERMIT: "Construction Permits (Land)",
-        ServiceType.LAND_MAPS: "Land Maps & Associated Matters",
-        ServiceType.LAND_REGISTRATION: "Land Registration",
-
-        # Travel & Immigration
-        ServiceType.PASSPORT_RENEWAL: "Passport Services",
-        ServiceType.VISA_SERVICES: "Visa Services",
-        ServiceType.YELLOW_CARD: "Yellow Card",
-        ServiceType.TRAVEL_DOCUMENTS: "Travel Documents",
-
-        # Business & Commercial
-        ServiceType.BUSINESS_LICENSE: "Business License (Trade License)",
-        ServiceType.BUSINESS_REGISTRATION: "Business Registration",
-        ServiceType.IMPORT_EXPORT: "Import/Export Services",
-
-        # Driving Services
-        ServiceType.DRIVER_LICENSE_RENEWAL: "Driver License Renewal",
-        ServiceType.DRIVER_LICENSE_NEW: "New Driver License",
-        ServiceType.VEHICLE_REGISTRATION: "Vehicle Registration",
-
-        # Telecommunications
-        ServiceType.ETHIO_TELECOM: "Ethio Telecom Services",
-        ServiceType.SIM_REGISTRATION: "SIM Card Registration",
-
-        # Banking & Financial
-        ServiceType.COMMERCIAL_BANK: "Commercial Bank Services",
-        ServiceType.FINANCIAL_SERVICES: "Other Financial Services",
-
-        # Postal Services
-        ServiceType.ETHIO_POST: "Ethio Post Services",
-        ServiceType.MAIL_SERVICES: "Mail & Package Services",
-
-        # Other Services
-        ServiceType.DOCUMENT_LEGALIZATION: "Document Legalization",
-        ServiceType.TAX_SERVICE: "Tax Services",
-        ServiceType.EDUCATION_SERVICES: "Education Services",
-        ServiceType.HEALTH_SERVICES: "Health Services",
-        ServiceType.IMMIGRATION: "Immigration Services",
-        ServiceType.OTHER: "Other Government Services",
-    }
+async def build_waiting_tickets():
+    """Build the dashboard waiting list (expired tickets are swept out of WAITING)"""
+    async with AsyncSessionLocal() as db:
+        waiting_tickets = (await db.scalars(select(Ticket).where(
+            Ticket.status == TicketStatus.WAITING
+        ).order_by(Ticket.created_at))).all()
 
     tickets = []
     for idx, ticket in enumerate(waiting_tickets, 1):
         tickets.append({
             "ticket_number": ticket.ticket_number,
             "full_name": ticket.full_name,
-            "service_type": service_type_map.get(ticket.service_type, ticket.service_type.value),
+            "service_type": SERVICE_TYPE_NAMES.get(ticket.service_type, ticket.service_type.value),
             "status": ticket.status.value,
             "created_at": ticket.created_at.isoformat(),
             "position": idx,
             "id_number_display": ticket.id_number_hash[:8] + "***"  # Partial display for privacy
         })
 
-    return {
+    payload = {
         "total_waiting": len(tickets),
         "tickets": tickets
     }
+    return payload, None
+
+
+queue_status_snapshot = VersionedSnapshot(build_queue_status)
+waiting_tickets_snapshot = VersionedSnapshot(build_waiting_tickets)
+event_bus.add_listener(queue_status_snapshot.invalidate)
+event_bus.add_listener(waiting_tickets_snapshot.invalidate)
+
+
+async def snapshot_response(snapshot: VersionedSnapshot, request: Request) -> Response:
+    """Serve a shared snapshot, or 304 when the client already has it"""
+    current = await snapshot.get()
+    headers = {"ETag": current.etag, "Cache-Control": "no-cache"}
+    if current.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=current.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/display/queue-status", response_model=QueueStatusResponse)
+async def get_queue_status(request: Request):
+    """Get current queue status for display screen (shared snapshot, rebuilt on queue changes)"""
+    return await snapshot_response(queue_status_snapshot, request)
+
+
+@app.get("/api/display/waiting-tickets")
+async def get_waiting_tickets(request: Request):
+    """Get all waiting tickets with details for dashboard display (shared snapshot)"""
+    return await snapshot_response(waiting_tickets_snapshot, request)
+
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """
+    Live ticket transitions as Server-Sent Events
+    Reconnecting clients send Last-Event-ID to replay what they missed
+    """
+    last_event_id = request.headers.get("last-event-id")
+
+    async def event_stream():
+        async with event_bus.subscribe(last_event_id) as queue:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ==================== STATISTICS ENDPOINTS ====================
 
 @app.get("/api/statistics", response_model=StatisticsResponse)
-async def get_statistics(db: Session = Depends(get_db)):
-    """Get system statistics"""
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-
-    total_tickets_today = db.query(Ticket).filter(
-        Ticket.created_at >= today_start
-    ).count()
-
-    total_served_today = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.COMPLETED,
-        Ticket.completed_at >= today_start
-    ).count()
-
-    total_waiting = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.WAITING
-    ).count()
-
-    total_expired = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.EXPIRED,
-        Ticket.created_at >= today_start
-    ).count()
-
-    active_counters = db.query(Counter).filter(
-        Counter.is_active == True
-    ).count()
-
-    # Calculate average service time
-    completed_tickets = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.COMPLETED,
-        Ticket.completed_at >= today_start,
-        Ticket.served_at.isnot(None)
-    ).all()
-
-    if completed_tickets:
-        service_times = [
-            (t.completed_at - t.served_at).total_seconds() / 60
-            for t in completed_tickets
-            if t.completed_at and t.served_at
-        ]
-        avg_service_time = sum(service_times) / len(service_times) if service_times else 0
-    else:
-        avg_service_time = 0
-
-    return StatisticsResponse(
-        total_tickets_today=total_tickets_today,
-        total_served_today=total_served_today,
-        total_waiting=total_waiting,
-        total_expired=total_expired,
-        active_counters=active_counters,
-        average_service_time_minutes=round(avg_service_time, 2),
-        peak_hour=None  # Can be calculated with more data
-    )
+async def get_statistics():
+    """Get system statistics (maintained incrementally from ticket events)"""
+    return StatisticsResponse(total_waiting=len(dispatch_queue), **queue_stats.snapshot())
+
+
+# ==================== ADMIN ENDPOINTS ====================
+
+@app.get("/api/admin/audit", dependencies=[Depends(admin_access)])
+async def search_audit_log(
+    ticket_id: Optional[int] = None,
+    citizen_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search the audit log, newest first
+    Recent months come from the database, older ones from the compressed archive
+    """
+    query = AuditQuery(ticket_id=ticket_id, citizen_id=citizen_id, action=action, since=since, until=until)
+
+    rows = (await db.scalars(
+        query.apply(select(AuditLog)).order_by(AuditLog.id.desc()).limit(limit)
+    )).all()
+    entries = [row_to_dict(row) for row in rows]
+
+    if len(entries) < limit:
+        entries += await asyncio.to_thread(audit_archive.search, query, limit - len(entries))
+
+    return {"count": len(entries), "entries": entries}
+
+
+@app.get("/api/admin/cache", dependencies=[Depends(admin_access)])
+async def get_cache_metrics():
+    """Hit rates of the citizen lookup cache and the fraud detector"""
+    return {
+        "citizens": citizen_cache.stats(),
+        "fraud": fraud_detector.stats()
+    }
+
+
+@app.get("/api/admin/audit-writer", dependencies=[Depends(admin_access)])
+async def get_audit_writer_metrics():
+    """Audit writer queue depth and flush latency"""
+    return audit_writer.stats()
+
+
+@app.get("/api/admin/cluster", dependencies=[Depends(admin_access)])
+async def get_cluster_status():
+    """Event relay between server workers: this worker's identity, leadership and counters"""
+    return cluster_relay.stats()
+
+
+@app.get("/api/admin/pool", dependencies=[Depends(admin_access)])
+async def get_pool_metrics():
+    """Database connection pools of this worker: connections in use, overflow and checkout wait times"""
+    return {
+        "async": pool_stats(async_engine),
+        "sync": pool_stats(engine)
+    }
 
 
 if __name__ == "__main__":
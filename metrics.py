@@ -0,0 +1,172 @@
+"""
+Prometheus metrics for Queue Management System
+Request latency per route, SQL statements and time per request (from
+SQLAlchemy engine events), ticket transitions (from the event bus) and
+queue gauges read from the in-memory dispatch queue and statistics.
+
+Under gunicorn with several workers, PROMETHEUS_MULTIPROC_DIR is set by
+gunicorn_conf.py and counters and histograms are summed over all workers;
+the queue gauges come from whichever worker serves the scrape, whose
+in-memory state follows the other workers through cluster.py.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from database import ServiceType
+from dispatch import dispatch_queue
+from queue_stats import queue_stats
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per request, by route template",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request, by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds", "Time to execute one SQL statement, including background tasks",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+TICKET_TRANSITIONS = Counter(
+    "queue_ticket_transitions_total", "Ticket state transitions",
+    ["event", "service_type"]
+)
+
+
+class RequestSQL:
+    """SQL statements executed on behalf of one request"""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware; contextvars follow the request into SQLAlchemy's
+# greenlets and into asyncio.to_thread
+current_request_sql: ContextVar[Optional[RequestSQL]] = ContextVar("current_request_sql", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["metrics_start"].pop()
+    operation = statement.lstrip()[:6].upper()
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        operation = "OTHER"
+    DB_STATEMENT_SECONDS.labels(operation).observe(seconds)
+    request_sql = current_request_sql.get()
+    if request_sql is not None:
+        request_sql.statements += 1
+        request_sql.seconds += seconds
+
+
+def instrument_engine(engine):
+    """Time every statement an engine executes (pass async_engine.sync_engine for async engines)"""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: latency and SQL per request, labelled with the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["streaming"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        request_sql = RequestSQL()
+        token = current_request_sql.set(request_sql)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_sql.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            # An event stream lasts as long as the client stays connected
+            if not response["streaming"]:
+                REQUEST_SECONDS.labels(method, route, str(response["status"])).observe(elapsed)
+            REQUEST_DB_STATEMENTS.labels(method, route).observe(request_sql.statements)
+            REQUEST_DB_SECONDS.labels(method, route).observe(request_sql.seconds)
+
+
+def apply(event: dict):
+    """Event bus listener: count ticket transitions published by this worker"""
+    if not event["type"].startswith("ticket.") or "origin" in event["context"]:
+        # Relayed events were counted by the worker that published them
+        return
+    TICKET_TRANSITIONS.labels(event["type"].split(".", 1)[1], event["data"].get("service_type", "")).inc()
+
+
+class _QueueCollector:
+    """Queue gauges as of this scrape"""
+
+    def __init__(self, in_service: Dict[str, int]):
+        self.in_service = in_service
+
+    def collect(self):
+        waiting = GaugeMetricFamily("queue_waiting_tickets", "Tickets waiting, by service type",
+                                    labels=["service_type"])
+        for service_type in ServiceType:
+            waiting.add_metric([service_type.value], dispatch_queue.waiting_count(service_type))
+        yield waiting
+
+        yield GaugeMetricFamily("queue_active_counters", "Active service counters",
+                                value=queue_stats.snapshot()["active_counters"])
+
+        in_service = GaugeMetricFamily("queue_tickets_in_service", "Tickets called to or being served at a counter",
+                                       labels=["status"])
+        for status, count in self.in_service.items():
+            in_service.add_metric([status], count)
+        yield in_service
+
+
+def render(in_service: Dict[str, int]) -> bytes:
+    """Prometheus text exposition of all metrics; in_service maps CALLED/SERVING to ticket counts"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    queue_registry = CollectorRegistry()
+    queue_registry.register(_QueueCollector(in_service))
+    return generate_latest(registry) + generate_latest(queue_registry)
@@ -0,0 +1,102 @@
+"""Initial schema (tables as created by create_all before migrations)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SERVICE_TYPES = (
+    "KEBELE_ID", "BIRTH_CERTIFICATE", "FAYDA_ID", "NATIONAL_ID",
+    "LAND_CONSTRUCTION_PERMIT", "LAND_MAPS", "LAND_REGISTRATION",
+    "PASSPORT_RENEWAL", "VISA_SERVICES", "YELLOW_CARD", "TRAVEL_DOCUMENTS",
+    "BUSINESS_LICENSE", "BUSINESS_REGISTRATION", "IMPORT_EXPORT",
+    "DRIVER_LICENSE_RENEWAL", "DRIVER_LICENSE_NEW", "VEHICLE_REGISTRATION",
+    "ETHIO_TELECOM", "SIM_REGISTRATION",
+    "COMMERCIAL_BANK", "FINANCIAL_SERVICES",
+    "ETHIO_POST", "MAIL_SERVICES",
+    "DOCUMENT_LEGALIZATION", "TAX_SERVICE", "EDUCATION_SERVICES", "HEALTH_SERVICES", "IMMIGRATION", "OTHER",
+)
+TICKET_STATUSES = ("WAITING", "CALLED", "SERVING", "COMPLETED", "EXPIRED", "CANCELLED")
+
+
+def upgrade():
+    op.create_table(
+        "citizens",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_number_hash", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("is_blacklisted", sa.Boolean(), nullable=True),
+        sa.Column("blacklist_reason", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_citizens_id", "citizens", ["id"])
+    op.create_index("ix_citizens_id_number_hash", "citizens", ["id_number_hash"], unique=True)
+
+    op.create_table(
+        "tickets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("ticket_number", sa.String(), nullable=False),
+        sa.Column("citizen_id", sa.Integer(), nullable=False),
+        sa.Column("id_number_hash", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("service_type", sa.Enum(*SERVICE_TYPES, name="servicetype"), nullable=False),
+        sa.Column("status", sa.Enum(*TICKET_STATUSES, name="ticketstatus"), nullable=True),
+        sa.Column("counter_number", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("called_at", sa.DateTime(), nullable=True),
+        sa.Column("served_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("qr_code", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tickets_id", "tickets", ["id"])
+    op.create_index("ix_tickets_ticket_number", "tickets", ["ticket_number"], unique=True)
+    op.create_index("ix_tickets_id_number_hash", "tickets", ["id_number_hash"])
+
+    op.create_table(
+        "counters",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("counter_number", sa.Integer(), nullable=False),
+        sa.Column("counter_name", sa.String(), nullable=False),
+        sa.Column("service_types", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("current_ticket_id", sa.Integer(), nullable=True),
+        sa.Column("staff_name", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("counter_number"),
+    )
+    op.create_index("ix_counters_id", "counters", ["id"])
+
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("citizen_id", sa.Integer(), nullable=True),
+        sa.Column("ticket_id", sa.Integer(), nullable=True),
+        sa.Column("counter_id", sa.Integer(), nullable=True),
+        sa.Column("details", sa.String(), nullable=True),
+        sa.Column("ip_address", sa.String(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+        sa.Column("is_suspicious", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_audit_logs_id", "audit_logs", ["id"])
+
+
+def downgrade():
+    op.drop_table("audit_logs")
+    op.drop_table("counters")
+    op.drop_table("tickets")
+    op.drop_table("citizens")
+    sa.Enum(name="servicetype").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="ticketstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,74 @@
+"""Daily per-service ticket numbers
+
+Adds the ticket_sequences counter table and tickets.business_day, and
+makes ticket numbers unique per business day instead of forever.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ticket_sequences",
+        sa.Column("prefix", sa.String(), nullable=False),
+        sa.Column("business_day", sa.Date(), nullable=False),
+        sa.Column("last_value", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("prefix", "business_day"),
+    )
+
+    op.add_column("tickets", sa.Column("business_day", sa.Date(), nullable=True))
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        op.execute("UPDATE tickets SET business_day = DATE(created_at)")
+    else:
+        op.execute("UPDATE tickets SET business_day = CAST(created_at AS DATE)")
+
+    # Continue today's legacy numbers instead of reissuing them
+    tickets = sa.table(
+        "tickets",
+        sa.column("ticket_number", sa.String()),
+        sa.column("business_day", sa.Date()),
+    )
+    last_values = {}
+    for ticket_number, business_day in bind.execute(
+        sa.select(tickets.c.ticket_number, tickets.c.business_day).where(tickets.c.business_day.isnot(None))
+    ):
+        prefix, _, sequence = ticket_number.rpartition("-")
+        if prefix and sequence.isdigit():
+            key = (prefix, business_day)
+            last_values[key] = max(last_values.get(key, 0), int(sequence))
+    if last_values:
+        sequences = sa.table(
+            "ticket_sequences",
+            sa.column("prefix", sa.String()),
+            sa.column("business_day", sa.Date()),
+            sa.column("last_value", sa.Integer()),
+        )
+        op.bulk_insert(sequences, [
+            {"prefix": prefix, "business_day": day, "last_value": value}
+            for (prefix, day), value in last_values.items()
+        ])
+
+    with op.batch_alter_table("tickets") as batch:
+        batch.alter_column("business_day", existing_type=sa.Date(), nullable=False)
+        batch.drop_index("ix_tickets_ticket_number")
+        batch.create_index("ix_tickets_ticket_number", ["ticket_number"])
+        batch.create_unique_constraint("uq_tickets_ticket_number_business_day", ["ticket_number", "business_day"])
+
+
+def downgrade():
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_constraint("uq_tickets_ticket_number_business_day", type_="unique")
+        batch.drop_index("ix_tickets_ticket_number")
+        batch.create_index("ix_tickets_ticket_number", ["ticket_number"], unique=True)
+        batch.drop_column("business_day")
+    op.drop_table("ticket_sequences")
@@ -0,0 +1,44 @@
+"""Composite indexes for the ticket hot queries
+
+- (status, service_type, id): per-service waiting counts and queue position
+- (status, created_at): waiting list order, dispatch load, expired today
+- (status, completed_at): served today and average service time
+- (created_at): tickets issued today
+- (citizen_id, status): active-ticket check and fraud counts per citizen
+- (id_number_hash, status): active tickets by ID (replaces the plain hash index)
+
+Partial indexes (WHERE status = 'WAITING') were considered, but SQLite
+only uses a partial index when the query repeats the predicate as a
+literal, and every query here binds status as a parameter.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_tickets_status_service_type_id": ["status", "service_type", "id"],
+    "ix_tickets_status_created_at": ["status", "created_at"],
+    "ix_tickets_status_completed_at": ["status", "completed_at"],
+    "ix_tickets_created_at": ["created_at"],
+    "ix_tickets_citizen_id_status": ["citizen_id", "status"],
+    "ix_tickets_id_number_hash_status": ["id_number_hash", "status"],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "tickets", columns)
+    op.drop_index("ix_tickets_id_number_hash", table_name="tickets")
+
+
+def downgrade():
+    op.create_index("ix_tickets_id_number_hash", "tickets", ["id_number_hash"])
+    for name in INDEXES:
+        op.drop_index(name, table_name="tickets")
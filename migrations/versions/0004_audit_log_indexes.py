@@ -0,0 +1,34 @@
+"""Indexes for audit log queries and archiving
+
+- (timestamp): monthly archiving and time-range queries
+- (ticket_id): audit trail of one ticket
+- (citizen_id, timestamp): audit trail of one citizen
+- (action, timestamp): e.g. recent VERIFICATION_FAILED entries
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_audit_logs_timestamp": ["timestamp"],
+    "ix_audit_logs_ticket_id": ["ticket_id"],
+    "ix_audit_logs_citizen_id_timestamp": ["citizen_id", "timestamp"],
+    "ix_audit_logs_action_timestamp": ["action", "timestamp"],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "audit_logs", columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="audit_logs")
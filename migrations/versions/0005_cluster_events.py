@@ -0,0 +1,35 @@
+"""Cluster event relay table
+
+Adds cluster_events, through which server workers share ticket events
+when running with several workers (see cluster.py).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cluster_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("origin", sa.String(), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("payload", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_cluster_events_created_at", "cluster_events", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_cluster_events_created_at", table_name="cluster_events")
+    op.drop_table("cluster_events")
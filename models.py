@@ -3,7 +3,7 @@ Pydantic models for API requests and responses
 """
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 from database import ServiceType, TicketStatus
 
 
@@ -16,6 +16,15 @@ class TicketCreateRequest(BaseModel):
     phone_number: Optional[str] = None
 
 
+class TicketBatchRequest(BaseModel):
+    """
+    Several ticket requests issued together (group registration, kiosk offline sync)
+    Items are validated one by one as TicketCreateRequest, so a malformed
+    item fails on its own instead of rejecting the whole batch
+    """
+    tickets: List[Dict[str, Any]] = Field(..., min_length=1, max_length=100)
+
+
 class TicketVerifyRequest(BaseModel):
     """Request to verify ticket at counter"""
     ticket_number: str
@@ -54,12 +63,27 @@ class TicketResponse(BaseModel):
     expires_at: datetime
     estimated_wait_minutes: Optional[int] = None
     queue_position: Optional[int] = None
-    qr_code: Optional[str] = None
+    qr_code_url: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class TicketBatchItemResult(BaseModel):
+    """Outcome of one request in a batch, in request order"""
+    index: int
+    status_code: int
+    ticket: Optional[TicketResponse] = None
+    detail: Optional[str] = None
+
+
+class TicketBatchResponse(BaseModel):
+    """Batch issuance response"""
+    issued: int
+    failed: int
+    results: List[TicketBatchItemResult]
+
+
 class CounterResponse(BaseModel):
     """Counter response"""
     id: int
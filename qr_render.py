@@ -0,0 +1,49 @@
+"""
+QR code rendering service for Queue Management System
+Renders ticket QR codes in a bounded worker pool on first fetch
+and keeps the PNG bytes in a small LRU cache
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from config import settings
+from utils import render_qr_png
+
+
+class QRRenderer:
+    """Bounded-pool QR renderer with an in-memory PNG cache"""
+
+    def __init__(self, max_workers: int, cache_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qr-render")
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()  # ticket id -> PNG
+        self._lock = threading.Lock()
+
+    def _cached(self, ticket_id: int) -> Optional[bytes]:
+        with self._lock:
+            png = self._cache.get(ticket_id)
+            if png is not None:
+                self._cache.move_to_end(ticket_id)
+            return png
+
+    def _store(self, ticket_id: int, png: bytes):
+        with self._lock:
+            self._cache[ticket_id] = png
+            self._cache.move_to_end(ticket_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    async def get_png(self, ticket_data: dict) -> bytes:
+        """Return PNG bytes for a ticket, rendering off the event loop on a miss"""
+        png = self._cached(ticket_data["id"])
+        if png is None:
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(self._executor, render_qr_png, ticket_data)
+            self._store(ticket_data["id"], png)
+        return png
+
+
+qr_renderer = QRRenderer(settings.qr_render_workers, settings.qr_cache_size)
@@ -0,0 +1,125 @@
+"""
+Queue position index for Queue Management System
+Answers "how many waiting tickets of this service are at or ahead of
+ticket X" in O(log n) with one Fenwick tree per service type
+"""
+from typing import Dict, Optional, Set
+
+from database import ServiceType
+
+
+class FenwickTree:
+    """Binary indexed tree over slots 0..size-1 holding 0/1 counts"""
+
+    def __init__(self, size: int):
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_slots(cls, size: int, slots) -> "FenwickTree":
+        """Build in O(size) from the occupied slots"""
+        tree = cls(size)
+        data = tree._tree
+        for slot in slots:
+            data[slot + 1] += 1
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                data[parent] += data[i]
+        return tree
+
+    @property
+    def size(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, slot: int, delta: int):
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, slot: int) -> int:
+        """Sum of slots 0..slot inclusive"""
+        total = 0
+        i = slot + 1
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+
+class _ServiceRanks:
+    """
+    Waiting ticket ids of one service mapped onto Fenwick slots (id - base)
+
+    The tree is rebuilt with base = oldest waiting id whenever a new id
+    falls outside it, so its size tracks the span of ids currently
+    waiting rather than every id ever issued.
+    """
+
+    MIN_SIZE = 64
+
+    def __init__(self):
+        self.ids: Set[int] = set()
+        self._base = 0
+        self._tree = FenwickTree(0)
+
+    def _rebuild(self):
+        if not self.ids:
+            self._base, self._tree = 0, FenwickTree(0)
+            return
+        self._base = min(self.ids)
+        span = max(self.ids) - self._base + 1
+        size = max(self.MIN_SIZE, 2 * span)
+        self._tree = FenwickTree.from_slots(size, (ticket_id - self._base for ticket_id in self.ids))
+
+    def add(self, ticket_id: int):
+        if ticket_id in self.ids:
+            return
+        self.ids.add(ticket_id)
+        slot = ticket_id - self._base
+        if slot < 0 or slot >= self._tree.size:
+            self._rebuild()
+        else:
+            self._tree.add(slot, 1)
+
+    def remove(self, ticket_id: int):
+        if ticket_id not in self.ids:
+            return
+        self.ids.discard(ticket_id)
+        self._tree.add(ticket_id - self._base, -1)
+
+    def rank(self, ticket_id: int) -> int:
+        return self._tree.prefix_sum(ticket_id - self._base)
+
+
+class QueuePositionIndex:
+    """
+    Per-service order statistics over waiting ticket ids
+    Not thread-safe on its own; DispatchQueue calls it under its lock
+    """
+
+    def __init__(self):
+        self._services: Dict[ServiceType, _ServiceRanks] = {st: _ServiceRanks() for st in ServiceType}
+        self._service_of: Dict[int, ServiceType] = {}
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, ticket_id: int, service_type: ServiceType):
+        self._services[service_type].add(ticket_id)
+        self._service_of[ticket_id] = service_type
+
+    def remove(self, ticket_id: int):
+        service_type = self._service_of.pop(ticket_id, None)
+        if service_type is not None:
+            self._services[service_type].remove(ticket_id)
+
+    def position(self, ticket_id: int) -> Optional[int]:
+        """1-based position among waiting tickets of the same service, None if not waiting"""
+        service_type = self._service_of.get(ticket_id)
+        if service_type is None:
+            return None
+        return self._services[service_type].rank(ticket_id)
+
+    def waiting_count(self, service_type: ServiceType) -> int:
+        return len(self._services[service_type].ids)
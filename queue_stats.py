@@ -0,0 +1,140 @@
+"""
+Incrementally maintained daily statistics for Queue Management System
+Seeded from the database at startup and updated from ticket events,
+so /api/statistics is answered without querying the tickets table
+"""
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional, Set
+
+from database import Ticket, Counter, TicketStatus
+from events import TICKET_CREATED, TICKET_COMPLETED, TICKET_EXPIRED, COUNTER_CREATED
+
+
+def _parse(timestamp: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(timestamp) if timestamp else None
+
+
+class QueueStatistics:
+    """
+    Today's counters, service times and hourly issuance histogram (UTC day)
+
+    Tickets are tracked by id, so applying an event twice (as the cluster
+    relay may around a reload) or reloading while events are applied
+    never counts a ticket twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(datetime.utcnow().date())
+        self._active_counters: Set[int] = set()  # counter numbers
+
+    def _reset(self, day: date):
+        self.day = day
+        self._created: Set[int] = set()
+        self._served: Set[int] = set()
+        self._expired: Set[int] = set()
+        self.service_seconds_total = 0.0
+        self.service_time_count = 0
+        self.tickets_by_hour: Dict[int, int] = {}
+
+    def _add_created(self, ticket_id: int, created_at: datetime):
+        """Count a ticket issued today, once (lock must be held)"""
+        if ticket_id not in self._created:
+            self._created.add(ticket_id)
+            self.tickets_by_hour[created_at.hour] = self.tickets_by_hour.get(created_at.hour, 0) + 1
+
+    def _add_served(self, ticket_id: int, served_at: Optional[datetime], completed_at: Optional[datetime]):
+        """Count a ticket completed today, once (lock must be held)"""
+        if ticket_id not in self._served:
+            self._served.add(ticket_id)
+            if served_at and completed_at:
+                self.service_seconds_total += (completed_at - served_at).total_seconds()
+                self.service_time_count += 1
+
+    def _roll_over(self, now: datetime):
+        """Start a fresh day once the UTC date changes (lock must be held)"""
+        if now.date() != self.day:
+            self._reset(now.date())
+
+    def load(self, db):
+        """
+        Seed all counters from the database
+        Tickets already counted are kept, so this can run while events are being applied
+        """
+        now = datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        created = db.query(Ticket.id, Ticket.created_at).filter(Ticket.created_at >= today_start).all()
+
+        served = db.query(Ticket.id, Ticket.served_at, Ticket.completed_at).filter(
+            Ticket.status == TicketStatus.COMPLETED,
+            Ticket.completed_at >= today_start
+        ).all()
+
+        expired = db.query(Ticket.id).filter(
+            Ticket.status == TicketStatus.EXPIRED,
+            Ticket.created_at >= today_start
+        ).all()
+
+        active_counters = db.query(Counter.counter_number).filter(Counter.is_active == True).all()
+
+        with self._lock:
+            self._roll_over(now)
+            for ticket_id, created_at in created:
+                self._add_created(ticket_id, created_at)
+            for ticket_id, served_at, completed_at in served:
+                self._add_served(ticket_id, served_at, completed_at)
+            self._expired.update(ticket_id for (ticket_id,) in expired)
+            self._active_counters = {counter_number for (counter_number,) in active_counters}
+
+    def apply(self, event: dict):
+        """Event bus listener: fold one transition into the counters"""
+        event_type = event["type"]
+        data = event["data"]
+        ticket_id = event.get("context", {}).get("ticket_id")
+        now = datetime.utcnow()
+
+        with self._lock:
+            self._roll_over(now)
+
+            if event_type == TICKET_CREATED:
+                created_at = _parse(data["created_at"])
+                if created_at.date() == self.day:
+                    self._add_created(ticket_id, created_at)
+
+            elif event_type == TICKET_COMPLETED:
+                self._add_served(ticket_id, _parse(data.get("served_at")), _parse(data.get("completed_at")))
+
+            elif event_type == TICKET_EXPIRED:
+                created_at = _parse(data["created_at"])
+                if created_at.date() == self.day:
+                    self._expired.add(ticket_id)
+
+            elif event_type == COUNTER_CREATED:
+                if data.get("is_active"):
+                    self._active_counters.add(data["counter_number"])
+
+    def snapshot(self) -> dict:
+        """Current statistics (StatisticsResponse fields except total_waiting)"""
+        with self._lock:
+            self._roll_over(datetime.utcnow())
+            average_minutes = (
+                self.service_seconds_total / self.service_time_count / 60
+                if self.service_time_count else 0
+            )
+            peak_hour = (
+                max(self.tickets_by_hour, key=self.tickets_by_hour.get)
+                if self.tickets_by_hour else None
+            )
+            return {
+                "total_tickets_today": len(self._created),
+                "total_served_today": len(self._served),
+                "total_expired": len(self._expired),
+                "active_counters": len(self._active_counters),
+                "average_service_time_minutes": round(average_minutes, 2),
+                "peak_hour": peak_hour
+            }
+
+
+queue_stats = QueueStatistics()
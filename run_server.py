@@ -1,29 +1,51 @@
 """
 Start the Queue Management System server
+
+    python run_server.py                 # one process
+    python run_server.py --reload        # one process, restart on code changes
+    python run_server.py --workers 4     # production: gunicorn with 4 workers
 """
-import uvicorn
-from config import settings
+import argparse
 import os
+import sys
+
 import uvicorn
-port = int(os.environ.get("PORT", 10000))
+from config import settings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.workers,
+                        help="Worker processes; more than one runs gunicorn_conf.py (default: WORKERS setting)")
+    parser.add_argument("--reload", action="store_true", help="Restart on code changes (development only)")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+    port = int(os.environ.get("PORT", 10000))
+
     print("=" * 60)
     print(f"🇪🇹 {settings.app_name}")
     print(f"Version: {settings.version}")
     print("=" * 60)
-    print(f"\n🚀 Starting server on http://{settings.host}:{settings.port}")
-    print(f"📖 API Documentation: http://localhost:{settings.port}/docs")
-    print(f"📊 Alternative Docs: http://localhost:{settings.port}/redoc")
+    print(f"\n🚀 Starting server on http://{settings.host}:{port} ({args.workers} worker(s))")
+    print(f"📖 API Documentation: http://localhost:{port}/docs")
+    print(f"📊 Alternative Docs: http://localhost:{port}/redoc")
     print("\nPress CTRL+C to stop the server\n")
     print("=" * 60)
 
-    port = int(os.environ.get("PORT", 10000))
+    if args.workers > 1:
+        if args.reload:
+            sys.exit("--reload cannot be combined with --workers")
+        # gunicorn_conf.py reads WORKERS and PORT through config.settings
+        os.environ["WORKERS"] = str(args.workers)
+        os.environ["PORT"] = str(port)
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "main:app"])
 
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
-        reload=True
+        reload=args.reload
     )
-
@@ -0,0 +1,129 @@
+"""
+Per-request SQL profiler for Queue Management System (opt-in)
+With SQL_PROFILING=true every response carries X-DB-Queries (statements
+executed) and X-DB-Time (milliseconds spent in them); statements run
+sql_repeat_threshold or more times within one request are logged as N+1
+suspects, and statements slower than sql_slow_query_ms are written with
+their query plan to a rotating slow-query log.
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class RequestProfile:
+    """Statements executed on behalf of one request"""
+
+    __slots__ = ("method", "path", "statements", "seconds", "counts")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.statements = 0
+        self.seconds = 0.0
+        self.counts: Counter = Counter()
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+class SQLProfiler:
+
+    def __init__(self, slow_seconds: float, repeat_threshold: int):
+        self.slow_seconds = slow_seconds
+        self.repeat_threshold = repeat_threshold
+        self.slow_log = logging.getLogger("sql_profiler.slow_queries")
+
+    def install(self, app, engines, log_file: str, max_bytes: int, backups: int):
+        """Hook into the engines' statement events and the app's responses"""
+        handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.slow_log.addHandler(handler)
+        self.slow_log.setLevel(logging.INFO)
+        self.slow_log.propagate = False
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before)
+            event.listen(engine, "after_cursor_execute", self._after)
+        app.add_middleware(SQLProfilerMiddleware, profiler=self)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["profiler_start"].pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.statements += 1
+            profile.seconds += seconds
+            profile.counts[statement] += 1
+        if seconds >= self.slow_seconds:
+            self._log_slow(conn, statement, parameters, seconds, executemany, profile)
+
+    def _log_slow(self, conn, statement, parameters, seconds, executemany, profile):
+        plan = "(not explained)"
+        if not executemany and statement.lstrip()[:6].upper().startswith(EXPLAINABLE):
+            try:
+                plan = self._explain(conn, statement, parameters)
+            except Exception as exc:
+                plan = f"(EXPLAIN failed: {exc})"
+        where = f"{profile.method} {profile.path}" if profile else "(background)"
+        self.slow_log.info(
+            "%.1f ms %s\n  %s\n  parameters: %r\n  plan:\n    %s",
+            seconds * 1000, where, " ".join(statement.split()), parameters, plan.replace("\n", "\n    ")
+        )
+
+    def _explain(self, conn, statement, parameters) -> str:
+        """Query plan of a statement, on the connection that just ran it"""
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def finish(self, profile: RequestProfile) -> list:
+        """Response headers for a request; logs the statements it repeated"""
+        for statement, count in profile.counts.items():
+            if count >= self.repeat_threshold:
+                logger.warning("Possible N+1: %s %s ran this statement %d times: %s",
+                               profile.method, profile.path, count, " ".join(statement.split()))
+        return [
+            (b"x-db-queries", str(profile.statements).encode()),
+            (b"x-db-time", f"{profile.seconds * 1000:.2f}".encode()),
+        ]
+
+
+class SQLProfilerMiddleware:
+    """ASGI middleware: profile each request's SQL and report it in the response headers"""
+
+    def __init__(self, app, profiler: SQLProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + self.profiler.finish(profile)
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
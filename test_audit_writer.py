@@ -0,0 +1,103 @@
+"""
+Audit writer tests
+Buffered records reach the writer's queue only when the caller's
+transaction commits and are dropped when it rolls back; durable records
+are written inside the caller's transaction
+"""
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'audit_writer.db')}"
+
+from sqlalchemy import func, select
+
+from audit_writer import audit_writer
+from database import AsyncWriteSessionLocal, AuditLog, SessionLocal, async_engine, init_db
+
+
+def written(details: str) -> int:
+    """Audit rows with these details visible to another connection"""
+    with SessionLocal() as db:
+        return db.query(AuditLog).filter(AuditLog.details == details).count()
+
+
+class TestAuditWriter(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    async def asyncSetUp(self):
+        # Flush only when a test asks for it
+        for name, value in (("durability", "buffered"), ("flush_interval", 3600), ("batch_size", 1000)):
+            patcher = mock.patch.object(audit_writer, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        audit_writer.start()
+        self.details = f"audit test {uuid.uuid4().hex}"
+
+    async def asyncTearDown(self):
+        await audit_writer.stop()
+        # Each test runs on its own event loop
+        await async_engine.dispose()
+
+    def queued(self) -> int:
+        return sum(1 for row in audit_writer._queue if row["details"] == self.details)
+
+    async def test_buffered_record_written_after_commit(self):
+        async with AsyncWriteSessionLocal() as db:
+            audit_writer.record(db, "TICKET_CREATED", details=self.details)
+            self.assertEqual(self.queued(), 0)
+            await db.commit()
+        self.assertEqual(self.queued(), 1)
+        self.assertEqual(written(self.details), 0)
+
+        await audit_writer.flush()
+        self.assertEqual(self.queued(), 0)
+        self.assertEqual(written(self.details), 1)
+
+    async def test_buffered_record_dropped_on_rollback(self):
+        async with AsyncWriteSessionLocal() as db:
+            audit_writer.record(db, "TICKET_CREATED", details=self.details)
+            await db.rollback()
+            # The session is reused after the rollback
+            await db.commit()
+        async with AsyncWriteSessionLocal() as db:
+            audit_writer.record(db, "TICKET_CREATED", details=self.details)
+            # Closed without committing
+
+        await audit_writer.flush()
+        self.assertEqual(self.queued(), 0)
+        self.assertEqual(written(self.details), 0)
+
+    async def test_sync_action_written_in_transaction(self):
+        async with AsyncWriteSessionLocal() as db:
+            audit_writer.record(db, "VERIFICATION_FAILED", details=self.details)
+            await db.flush()
+            in_transaction = await db.scalar(
+                select(func.count()).select_from(AuditLog).where(AuditLog.details == self.details)
+            )
+            self.assertEqual(in_transaction, 1)
+            self.assertEqual(written(self.details), 0)
+            await db.commit()
+        self.assertEqual(self.queued(), 0)
+        self.assertEqual(written(self.details), 1)
+
+    async def test_sync_durability_writes_every_action_in_transaction(self):
+        with mock.patch.object(audit_writer, "durability", "sync"):
+            async with AsyncWriteSessionLocal() as db:
+                audit_writer.record(db, "TICKET_CREATED", details=self.details)
+                await db.rollback()
+            async with AsyncWriteSessionLocal() as db:
+                audit_writer.record(db, "TICKET_CREATED", details=self.details)
+                await db.commit()
+        self.assertEqual(self.queued(), 0)
+        self.assertEqual(written(self.details), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
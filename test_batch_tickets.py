@@ -0,0 +1,128 @@
+"""
+Batch ticket issuance tests
+Drives POST /api/tickets/batch in-process: every item gets its own result
+(malformed items, duplicates, known, blacklisted and new citizens), while a
+database conflict still rolls the whole batch back
+"""
+import os
+import tempfile
+import unittest
+import uuid
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'batch_tickets.db')}"
+
+from fastapi.testclient import TestClient
+
+from database import SessionLocal, Citizen, Ticket
+from utils import hash_id_number
+import main
+
+SERVICE = "business_license"
+
+
+def new_id() -> str:
+    return f"BATCH{uuid.uuid4().hex[:10]}"
+
+
+def item(id_number: str, full_name: str = "Batch Citizen") -> dict:
+    return {"id_number": id_number, "full_name": full_name, "service_type": SERVICE}
+
+
+class TestBatchTickets(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def batch(self, *items):
+        return self.client.post("/api/tickets/batch", json={"tickets": list(items)})
+
+    def register(self, id_number: str, **fields) -> int:
+        """Register a citizen directly in the database, as an earlier issuance would have"""
+        id_hash = hash_id_number(id_number)
+        with SessionLocal() as db:
+            citizen = Citizen(id_number_hash=id_hash, full_name="Batch Citizen", **fields)
+            db.add(citizen)
+            db.commit()
+            citizen_id = citizen.id
+        main.citizen_cache.known.add(id_hash)
+        return citizen_id
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.text)
+        return [result["status_code"] for result in response.json()["results"]]
+
+    def test_malformed_item_fails_alone(self):
+        response = self.batch(
+            item(new_id()),
+            item(new_id(), full_name="A"),
+            {"id_number": new_id(), "full_name": "Batch Citizen", "service_type": "no_such_service"},
+            item(new_id())
+        )
+        self.assertEqual(self.statuses(response), [201, 422, 422, 201])
+        body = response.json()
+        self.assertEqual((body["issued"], body["failed"]), (2, 2))
+        self.assertIn("full_name", body["results"][1]["detail"])
+
+    def test_duplicate_in_batch(self):
+        id_number = new_id()
+        response = self.batch(item(id_number), item(id_number))
+        self.assertEqual(self.statuses(response), [201, 400])
+        self.assertEqual(response.json()["results"][1]["detail"], "Duplicate ID number in batch")
+
+    def test_new_citizens_are_registered(self):
+        id_numbers = [new_id(), new_id()]
+        response = self.batch(*(item(id_number) for id_number in id_numbers))
+        self.assertEqual(self.statuses(response), [201, 201])
+        with SessionLocal() as db:
+            registered = db.query(Citizen).filter(
+                Citizen.id_number_hash.in_([hash_id_number(n) for n in id_numbers])
+            ).count()
+        self.assertEqual(registered, 2)
+
+    def test_known_citizens(self):
+        returning = new_id()
+        citizen_id = self.register(returning)
+        waiting = new_id()
+        self.assertEqual(self.statuses(self.batch(item(waiting))), [201])
+
+        response = self.batch(item(returning), item(waiting))
+        self.assertEqual(self.statuses(response), [201, 400])
+        self.assertIn("already have an active ticket", response.json()["results"][1]["detail"])
+        ticket_id = response.json()["results"][0]["ticket"]["id"]
+        with SessionLocal() as db:
+            self.assertEqual(db.get(Ticket, ticket_id).citizen_id, citizen_id)
+
+    def test_blacklisted_citizen(self):
+        blacklisted = new_id()
+        self.register(blacklisted, is_blacklisted=True, blacklist_reason="Ticket reselling")
+        response = self.batch(item(new_id()), item(blacklisted))
+        self.assertEqual(self.statuses(response), [201, 403])
+        self.assertIn("Ticket reselling", response.json()["results"][1]["detail"])
+
+    def test_conflict_rolls_back_the_whole_batch(self):
+        # Registered behind the cache's back (e.g. by another worker a moment
+        # ago): the batch takes it for new and its citizen INSERT conflicts
+        unseen = new_id()
+        with SessionLocal() as db:
+            db.add(Citizen(id_number_hash=hash_id_number(unseen), full_name="Batch Citizen"))
+            db.commit()
+        other = new_id()
+
+        response = self.batch(item(other), item(unseen))
+        self.assertEqual(response.status_code, 409, response.text)
+        with SessionLocal() as db:
+            self.assertIsNone(db.query(Citizen).filter_by(id_number_hash=hash_id_number(other)).first())
+
+        # The conflict taught the cache; a retry issues both
+        self.assertEqual(self.statuses(self.batch(item(other), item(unseen))), [201, 201])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Citizen cache tests
+The Bloom filter must never call a known citizen new, and a cached
+citizen's active ticket must follow the ticket through create, cancel,
+complete and expire, whether the change is local or relayed
+"""
+import os
+import tempfile
+import unittest
+import uuid
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'citizen_cache.db')}"
+
+from fastapi.testclient import TestClient
+
+from citizen_cache import BloomFilter, CitizenCache, CitizenEntry
+from events import TICKET_CANCELLED, TICKET_COMPLETED, TICKET_CREATED, TICKET_EXPIRED
+from utils import hash_id_number
+import main
+
+SERVICE = "land_construction_permit"
+
+
+def ticket_event(event_type: str, citizen_id: int, ticket_id: int, id_hash: str = None) -> dict:
+    context = {"citizen_id": citizen_id, "ticket_id": ticket_id}
+    if id_hash:
+        context["id_number_hash"] = id_hash
+    return {"type": event_type, "context": context, "data": {"ticket_number": f"LC-{ticket_id:03d}"}}
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000)
+        keys = [hash_id_number(f"BLOOM{i}") for i in range(3000)]
+        for key in keys:
+            bloom.add(key)
+        # Even at three times its capacity every added key is still found
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(hash_id_number(f"KNOWN{i}"))
+        false_positives = sum(hash_id_number(f"UNKNOWN{i}") in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.03)
+
+    def test_clear(self):
+        bloom = BloomFilter(capacity=100)
+        bloom.add("a")
+        bloom.clear()
+        self.assertNotIn("a", bloom)
+        self.assertEqual(bloom.count, 0)
+
+
+class TestCitizenCacheEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CitizenCache(max_entries=2, ttl_seconds=3600, bloom_capacity=1000)
+        self.cache.store("hash-1", CitizenEntry(1, False, None))
+
+    def test_created_then_finished(self):
+        for finished in (TICKET_CANCELLED, TICKET_COMPLETED, TICKET_EXPIRED):
+            self.cache.apply(ticket_event(TICKET_CREATED, 1, 10))
+            self.assertFalse(self.cache.has_no_active_ticket("hash-1"))
+            self.assertEqual(self.cache.get("hash-1").active_ticket_number, "LC-010")
+            self.cache.apply(ticket_event(finished, 1, 10))
+            self.assertTrue(self.cache.has_no_active_ticket("hash-1"), finished)
+
+    def test_finishing_an_older_ticket_keeps_the_active_one(self):
+        self.cache.apply(ticket_event(TICKET_CREATED, 1, 11))
+        self.cache.apply(ticket_event(TICKET_EXPIRED, 1, 10))
+        self.assertEqual(self.cache.get("hash-1").active_ticket_id, 11)
+
+    def test_citizen_registered_by_another_worker(self):
+        self.assertTrue(self.cache.is_new("hash-2"))
+        self.cache.apply(ticket_event(TICKET_CREATED, 2, 20, id_hash="hash-2"))
+        self.assertFalse(self.cache.is_new("hash-2"))
+        # Not cached here, so the active ticket must come from the database
+        self.assertFalse(self.cache.has_no_active_ticket("hash-2"))
+
+    def test_evicted_citizen_stays_known(self):
+        self.cache.store("hash-2", CitizenEntry(2, False, None))
+        self.cache.store("hash-3", CitizenEntry(3, False, None))
+        self.assertIsNone(self.cache.get("hash-1"))
+        self.assertFalse(self.cache.is_new("hash-1"))
+        # Events for an evicted citizen are ignored rather than misapplied
+        self.cache.apply(ticket_event(TICKET_CREATED, 1, 12))
+        self.assertIsNone(self.cache.get("hash-1"))
+
+
+class TestCitizenCacheInvalidation(unittest.TestCase):
+    """The running app's cache through the ticket endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def issue(self, id_number: str) -> dict:
+        response = self.client.post("/api/tickets", json={
+            "id_number": id_number, "full_name": "Cache Citizen", "service_type": SERVICE
+        })
+        self.assertEqual(response.status_code, 201, response.text)
+        return response.json()
+
+    def assert_active(self, id_number: str, ticket: dict = None):
+        entry = main.citizen_cache.get(hash_id_number(id_number))
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry.active_ticket_id, ticket["id"] if ticket else None)
+
+    def test_active_ticket_follows_the_ticket(self):
+        id_number = f"CACHE{uuid.uuid4().hex[:10]}"
+
+        ticket = self.issue(id_number)
+        self.assert_active(id_number, ticket)
+        again = self.client.post("/api/tickets", json={
+            "id_number": id_number, "full_name": "Cache Citizen", "service_type": SERVICE
+        })
+        self.assertEqual(again.status_code, 400)
+
+        self.client.delete(f"/api/tickets/{ticket['ticket_number']}/cancel", params={"id_number": id_number})
+        self.assert_active(id_number)
+
+        ticket = self.issue(id_number)
+        self.assert_active(id_number, ticket)
+        self.client.post("/api/counters/0/complete", params={"ticket_number": ticket["ticket_number"]})
+        self.assert_active(id_number)
+
+        ticket = self.issue(id_number)
+        self.client.post(f"/api/tickets/{ticket['ticket_number']}/expire")
+        self.assert_active(id_number)
+
+        self.issue(id_number)
+
+
+if __name__ == "__main__":
+    unittest.main()
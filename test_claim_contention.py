@@ -0,0 +1,164 @@
+"""
+Ticket claiming contention tests
+Dozens of simulated counters race for the same waiting tickets, both
+directly through claim_waiting_ticket and through the call-next
+endpoint, and every ticket must end up with exactly one counter.
+A ticket whose claim fails to commit goes back to the dispatch queue.
+Claims per second are logged for comparison between databases.
+Each test uses service types no other test module issues, as all test
+modules share one database when pytest runs them together.
+"""
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'claim_contention.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, Ticket, TicketStatus
+import main
+
+COUNTERS = 40
+TICKETS = 60
+CALL_NEXT_SERVICE = "visa_services"
+FAILED_CLAIM_SERVICE = "yellow_card"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # migrations leave the root logger at WARN
+
+
+class TestClaimContention(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def issue_tickets(self, count, service_type="immigration"):
+        """Issue count tickets; returns {ticket id: ticket number}"""
+        tickets = {}
+        for _ in range(count):
+            response = self.client.post("/api/tickets", json={
+                "id_number": f"RACE{uuid.uuid4().hex[:10]}",
+                "full_name": "Race Citizen",
+                "service_type": service_type
+            })
+            self.assertEqual(response.status_code, 201, response.text)
+            tickets[response.json()["id"]] = response.json()["ticket_number"]
+        return tickets
+
+    async def race(self, ticket_ids):
+        """Every counter tries every ticket, in its own order; returns (ticket id, counter) claims"""
+        claims = []
+
+        async def counter(counter_number):
+            order = list(ticket_ids)
+            random.Random(counter_number).shuffle(order)
+            async with AsyncSessionLocal() as db:
+                for ticket_id in order:
+                    ticket = await main.claim_waiting_ticket(db, counter_number, Ticket.id == ticket_id)
+                    await db.commit()
+                    if ticket is not None:
+                        claims.append((ticket.id, counter_number))
+
+        await asyncio.gather(*(counter(number) for number in range(1, COUNTERS + 1)))
+        return claims
+
+    async def owners(self, ticket_ids):
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(Ticket.id, Ticket.status, Ticket.counter_number).where(Ticket.id.in_(ticket_ids))
+            )
+            return {row.id: (row.status, row.counter_number) for row in rows}
+
+    def test_each_ticket_claimed_once(self):
+        ticket_ids = list(self.issue_tickets(TICKETS))
+
+        start = time.perf_counter()
+        claims = self.client.portal.call(self.race, ticket_ids)
+        elapsed = time.perf_counter() - start
+        logger.info("%d counters x %d tickets: %d claims, %.0f attempts/s, %.0f claims/s",
+                    COUNTERS, TICKETS, len(claims), COUNTERS * TICKETS / elapsed, len(claims) / elapsed)
+
+        claimed_ids = [ticket_id for ticket_id, _ in claims]
+        self.assertEqual(len(claimed_ids), len(set(claimed_ids)), "A ticket was claimed twice")
+        self.assertEqual(set(claimed_ids), set(ticket_ids))
+
+        owners = self.client.portal.call(self.owners, ticket_ids)
+        for ticket_id, counter_number in claims:
+            self.assertEqual(owners[ticket_id], (TicketStatus.CALLED, counter_number))
+
+    def test_call_next_never_repeats_a_ticket(self):
+        counter_ids = []
+        for number in range(COUNTERS):
+            response = self.client.post("/api/counters", json={
+                "counter_number": 500 + number,
+                "counter_name": f"Race {500 + number}",
+                "service_types": [CALL_NEXT_SERVICE]
+            })
+            counter_ids.append(response.json()["id"])
+        tickets = self.issue_tickets(TICKETS, CALL_NEXT_SERVICE)
+        # Stale dispatch queue entries must not be handed out twice either
+        for ticket_id in list(tickets)[::3]:
+            main.dispatch_queue.push(self.client.portal.call(self.get_ticket, ticket_id))
+
+        def call_until_empty(counter_id):
+            called = []
+            while True:
+                body = self.client.post(f"/api/counters/{counter_id}/call-next").json()
+                if "ticket_number" not in body:
+                    return called
+                called.append(body["ticket_number"])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=COUNTERS) as pool:
+            called = [number for batch in pool.map(call_until_empty, counter_ids) for number in batch]
+        elapsed = time.perf_counter() - start
+        logger.info("%d counters calling next: %d calls, %.0f claims/s",
+                    COUNTERS, len(called), len(called) / elapsed)
+
+        self.assertEqual(len(called), len(set(called)), "A ticket was called to two counters")
+        self.assertEqual(set(called), set(tickets.values()))
+
+    def test_failed_claim_is_requeued(self):
+        counter_id = self.client.post("/api/counters", json={
+            "counter_number": 600,
+            "counter_name": "Failed claims",
+            "service_types": [FAILED_CLAIM_SERVICE]
+        }).json()["id"]
+        (ticket_id, ticket_number), = self.issue_tickets(1, FAILED_CLAIM_SERVICE).items()
+
+        locked = OperationalError("COMMIT", {}, Exception("database is locked"))
+        with mock.patch.object(AsyncSession, "commit", side_effect=locked):
+            with self.assertRaises(OperationalError):
+                self.client.post(f"/api/counters/{counter_id}/call-next")
+
+        self.assertIn(ticket_id, main.dispatch_queue)
+        ticket = self.client.portal.call(self.get_ticket, ticket_id)
+        self.assertEqual(ticket.status, TicketStatus.WAITING)
+        body = self.client.post(f"/api/counters/{counter_id}/call-next").json()
+        self.assertEqual(body.get("ticket_number"), ticket_number)
+
+    async def get_ticket(self, ticket_id):
+        async with AsyncSessionLocal() as db:
+            return await db.get(Ticket, ticket_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
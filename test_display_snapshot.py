@@ -0,0 +1,121 @@
+"""
+Display snapshot tests
+Concurrent polls share one build, queue events and valid_until force a
+rebuild, and the display endpoints answer a matching If-None-Match with 304
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'display_snapshot.db')}"
+
+from fastapi.testclient import TestClient
+
+from display_snapshot import VersionedSnapshot
+import main
+
+
+class CountingBuilder:
+    """Builder whose payload names the build; each build yields to the event loop"""
+
+    def __init__(self, valid_for: timedelta = None):
+        self.calls = 0
+        self.valid_for = valid_for
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        valid_until = datetime.utcnow() + self.valid_for if self.valid_for is not None else None
+        return {"build": self.calls}, valid_until
+
+
+class TestVersionedSnapshot(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_requests_share_one_build(self):
+        snapshot = VersionedSnapshot(CountingBuilder())
+        results = await asyncio.gather(*(snapshot.get() for _ in range(20)))
+        self.assertEqual(snapshot.builds, 1)
+        self.assertEqual({id(result) for result in results}, {id(results[0])})
+        self.assertEqual(results[0].body, b'{"build":1}')
+
+    async def test_invalidate_rebuilds(self):
+        snapshot = VersionedSnapshot(CountingBuilder())
+        first = await snapshot.get()
+        self.assertIs(await snapshot.get(), first)
+
+        snapshot.invalidate({"type": "TICKET_CREATED"})
+        second = await snapshot.get()
+        self.assertEqual(snapshot.builds, 2)
+        self.assertNotEqual(second.etag, first.etag)
+
+    async def test_event_during_build_rebuilds_again(self):
+        builder = CountingBuilder()
+        snapshot = VersionedSnapshot(builder)
+
+        async def invalidate_midway():
+            await asyncio.sleep(0.005)
+            snapshot.invalidate()
+
+        await asyncio.gather(snapshot.get(), invalidate_midway())
+        await snapshot.get()
+        self.assertEqual(snapshot.builds, 2)
+
+    async def test_stale_after_valid_until(self):
+        snapshot = VersionedSnapshot(CountingBuilder(valid_for=timedelta(seconds=-1)))
+        await snapshot.get()
+        await snapshot.get()
+        self.assertEqual(snapshot.builds, 2)
+
+    async def test_matches_strong_etag_only(self):
+        current = await VersionedSnapshot(CountingBuilder()).get()
+        self.assertTrue(current.etag.startswith('"'))
+        self.assertTrue(current.matches(current.etag))
+        self.assertTrue(current.matches(f'"other", {current.etag}'))
+        self.assertTrue(current.matches("*"))
+        self.assertFalse(current.matches(f"W/{current.etag}"))
+        self.assertFalse(current.matches(None))
+
+
+class TestDisplayEndpoints(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_if_none_match_returns_304(self):
+        for url in ("/api/display/queue-status", "/api/display/waiting-tickets"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["etag"]
+            self.assertFalse(etag.startswith("W/"))
+
+            unchanged = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(unchanged.status_code, 304)
+            self.assertEqual(unchanged.headers["etag"], etag)
+            self.assertEqual(unchanged.content, b"")
+
+    def test_queue_change_changes_etag(self):
+        etag = self.client.get("/api/display/waiting-tickets").headers["etag"]
+        response = self.client.post("/api/tickets", json={
+            "id_number": f"SNAP{uuid.uuid4().hex[:10]}",
+            "full_name": "Display Citizen",
+            "service_type": "birth_certificate"
+        })
+        self.assertEqual(response.status_code, 201, response.text)
+
+        changed = self.client.get("/api/display/waiting-tickets", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["etag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Expiry sweeper tests
+Due tickets are expired in chunks of CHUNK_SIZE ids; when a chunk fails
+nothing is committed and the next sweep retries every due id, since the
+timing wheel has already handed them out
+"""
+import os
+import tempfile
+import unittest
+import uuid
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'expiry.db')}"
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import expiry
+from database import SessionLocal, ServiceType, Ticket, TicketStatus, async_engine, init_db
+from dispatch import dispatch_queue
+from expiry import ExpirySweeper
+
+
+def add_tickets(count: int, status: TicketStatus = TicketStatus.WAITING) -> list:
+    """Insert tickets that expired a minute ago; returns them detached"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        tickets = [
+            Ticket(
+                ticket_number=f"EX-{uuid.uuid4().hex[:8]}", business_day=date.today(),
+                citizen_id=1, id_number_hash=uuid.uuid4().hex, full_name="Expiry Citizen",
+                service_type=ServiceType.LAND_REGISTRATION, status=status,
+                created_at=now - timedelta(hours=2), expires_at=now - timedelta(minutes=1)
+            )
+            for _ in range(count)
+        ]
+        db.add_all(tickets)
+        db.commit()
+        for ticket in tickets:
+            db.refresh(ticket)
+        db.expunge_all()
+    return tickets
+
+
+def statuses(ticket_ids: list) -> dict:
+    with SessionLocal() as db:
+        return dict(db.query(Ticket.id, Ticket.status).filter(Ticket.id.in_(ticket_ids)).all())
+
+
+class TestExpirySweeper(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def setUp(self):
+        self.expired = []
+        self.sweeper = ExpirySweeper(on_expired=self.expired.append)
+        chunk_size = mock.patch.object(expiry, "CHUNK_SIZE", 2)
+        chunk_size.start()
+        self.addCleanup(chunk_size.stop)
+
+    async def asyncTearDown(self):
+        # Each test runs on its own event loop
+        await async_engine.dispose()
+
+    async def test_expire_in_chunks(self):
+        waiting = [ticket.id for ticket in add_tickets(5)]
+        serving = [ticket.id for ticket in add_tickets(1, TicketStatus.SERVING)]
+
+        expired = await self.sweeper.expire(waiting + serving)
+
+        self.assertEqual(sorted(ticket.id for ticket in expired), waiting)
+        self.assertEqual(sorted(ticket.id for ticket in self.expired), waiting)
+        self.assertEqual(self.sweeper.expired_total, 5)
+        self.assertEqual(statuses(waiting), {ticket_id: TicketStatus.EXPIRED for ticket_id in waiting})
+        self.assertEqual(statuses(serving), {serving[0]: TicketStatus.SERVING})
+
+    async def test_failed_chunk_is_retried(self):
+        tickets = add_tickets(4)
+        ticket_ids = [ticket.id for ticket in tickets]
+        for ticket in tickets:
+            dispatch_queue.push(ticket)
+
+        scalars = AsyncSession.scalars
+        calls = 0
+
+        async def second_chunk_fails(session, *args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise OperationalError("UPDATE", {}, Exception("database is locked"))
+            return await scalars(session, *args, **kwargs)
+
+        with mock.patch.object(AsyncSession, "scalars", second_chunk_fails):
+            with self.assertRaises(OperationalError):
+                await self.sweeper.sweep()
+
+        # The first chunk was rolled back with the second
+        self.assertEqual(set(statuses(ticket_ids).values()), {TicketStatus.WAITING})
+        self.assertEqual(self.expired, [])
+        self.assertEqual(dispatch_queue.pop_expired(), [])
+
+        self.assertEqual(await self.sweeper.sweep(), 4)
+        self.assertEqual(set(statuses(ticket_ids).values()), {TicketStatus.EXPIRED})
+        self.assertEqual(await self.sweeper.sweep(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
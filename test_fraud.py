@@ -0,0 +1,59 @@
+"""
+Fraud detector tests
+Relayed ticket events may arrive more than once and out of order; each
+ticket must count once per rule and old entries must still be pruned
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Importing database binds config.settings; keep the repository database untouched
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'fraud.db')}"
+
+from events import TICKET_CREATED
+from fraud import FraudDetector, FraudRule, _CitizenWindows
+
+CITIZEN_ID = 7
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def created(ticket_id: int, at: datetime) -> dict:
+    return {
+        "type": TICKET_CREATED,
+        "timestamp": at.isoformat(),
+        "context": {"citizen_id": CITIZEN_ID, "ticket_id": ticket_id},
+        "data": {}
+    }
+
+
+class TestFraudDetector(unittest.TestCase):
+
+    def setUp(self):
+        rule = FraudRule("issued", frozenset([TICKET_CREATED]), timedelta(minutes=60), threshold=3)
+        self.detector = FraudDetector([rule], max_citizens=10, ttl_seconds=3600)
+        # Citizen already held in memory, so check() never needs the database
+        self.detector._store(CITIZEN_ID, _CitizenWindows(self.detector.rules))
+
+    def test_repeated_delivery_counts_once(self):
+        for _ in range(3):
+            self.detector.apply(created(1, NOW - timedelta(minutes=5)))
+        self.detector.apply(created(2, NOW - timedelta(minutes=4)))
+        self.assertEqual(self.detector.check(None, CITIZEN_ID, now=NOW), [])
+
+        self.detector.apply(created(3, NOW - timedelta(minutes=3)))
+        self.assertEqual(self.detector.check(None, CITIZEN_ID, now=NOW), ["issued"])
+
+    def test_late_event_is_pruned_in_order(self):
+        self.detector.apply(created(1, NOW - timedelta(minutes=10)))
+        self.detector.apply(created(2, NOW - timedelta(minutes=5)))
+        # Relayed late: older than the window, behind newer entries
+        self.detector.apply(created(3, NOW - timedelta(minutes=90)))
+        self.detector.apply(created(4, NOW - timedelta(minutes=1)))
+        self.assertEqual(self.detector.check(None, CITIZEN_ID, now=NOW), ["issued"])
+        self.assertEqual(self.detector.check(None, CITIZEN_ID, now=NOW + timedelta(minutes=51)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
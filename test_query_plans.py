@@ -0,0 +1,138 @@
+"""
+Query plan regression tests
+Drives the hot endpoints in-process against a seeded SQLite database,
+captures every SELECT they send and fails if EXPLAIN QUERY PLAN shows
+a full scan of the tickets, citizens or audit_logs tables
+"""
+import os
+import re
+import sqlite3
+import tempfile
+import unittest
+import uuid
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'query_plans.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from config import settings
+from database import async_engine
+import main
+
+# Another test module imported first may have settled the database already
+DB_PATH = settings.database_url.split("sqlite:///", 1)[1]
+
+COUNTER_TOKEN = {"Authorization": "Bearer counter-token"}
+WATCHED_TABLES = ("tickets", "citizens", "audit_logs")
+FULL_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+class TestHotQueryPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and cls.capturing:
+                cls.statements.append((statement, tuple(parameters or ())))
+
+        cls.capturing = False
+        event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+        # Enough rows that the planner has something to avoid scanning
+        cls.client.post("/api/counters", json={
+            "counter_number": 1, "counter_name": "Counter 1",
+            "service_types": ["immigration", "tax_service"]
+        })
+        cls.ticket_numbers = []
+        cls.qr_code_urls = []
+        for i in range(60):
+            response = cls.client.post("/api/tickets", json={
+                "id_number": f"PLAN{i:05d}",
+                "full_name": "Plan Citizen",
+                "service_type": ["immigration", "tax_service", "other"][i % 3]
+            })
+            cls.ticket_numbers.append(response.json()["ticket_number"])
+            cls.qr_code_urls.append(response.json()["qr_code_url"])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def capture(self, *requests):
+        """Run requests and return the SELECT statements they issued"""
+        type(self).statements = []
+        type(self).capturing = True
+        try:
+            for method, url, kwargs in requests:
+                self.client.request(method, url, **kwargs)
+        finally:
+            type(self).capturing = False
+        return list(self.statements)
+
+    def assert_no_full_scans(self, statements):
+        self.assertTrue(statements, "No statements captured")
+        with sqlite3.connect(DB_PATH) as conn:
+            for statement, parameters in statements:
+                plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                for row in plan:
+                    match = FULL_SCAN.match(row[-1])
+                    if match and match.group(1) in WATCHED_TABLES:
+                        self.fail(f"Full scan of {match.group(1)}:\n{statement}\nplan: {row[-1]}")
+
+    def test_create_ticket_for_returning_citizen(self):
+        self.client.delete("/api/tickets/cancel-by-id", params={"id_number": "PLAN00000"})
+        statements = self.capture(("POST", "/api/tickets", {"json": {
+            "id_number": "PLAN00000", "full_name": "Plan Citizen", "service_type": "immigration"
+        }}))
+        self.assert_no_full_scans(statements)
+
+    def test_create_ticket_for_new_citizen(self):
+        # The Bloom filter of known ID hashes rules out an existing citizen
+        statements = self.capture(("POST", "/api/tickets", {"json": {
+            "id_number": f"NEW{uuid.uuid4().hex[:8]}", "full_name": "New Citizen", "service_type": "other"
+        }}))
+        self.assertEqual(statements, [])
+
+    def test_ticket_status_and_lookup(self):
+        ticket_number = self.ticket_numbers[-1]
+        statements = self.capture(
+            ("GET", f"/api/tickets/{ticket_number}", {"headers": COUNTER_TOKEN}),
+            ("GET", f"/api/tickets/{ticket_number}/qr.png", {}),
+            ("GET", self.qr_code_urls[-1], {}),
+            ("GET", "/api/tickets/active/PLAN00007", {}),
+        )
+        self.assert_no_full_scans(statements)
+
+    def test_counter_actions(self):
+        statements = self.capture(
+            ("POST", "/api/counters/1/call-next", {}),
+            ("POST", "/api/counters/assign-next", {}),
+        )
+        self.assert_no_full_scans(statements)
+
+    def test_display_and_statistics(self):
+        statements = self.capture(
+            ("GET", "/api/display/queue-status", {}),
+            ("GET", "/api/display/waiting-tickets", {}),
+            ("GET", "/api/statistics", {}),
+        )
+        self.assert_no_full_scans(statements)
+
+    def test_admin_audit_search(self):
+        admin = {"Authorization": "Bearer admin-token"}
+        statements = self.capture(
+            ("GET", "/api/admin/audit", {"headers": admin, "params": {"ticket_id": 1}}),
+            ("GET", "/api/admin/audit", {"headers": admin, "params": {"citizen_id": 1}}),
+            ("GET", "/api/admin/audit", {"headers": admin, "params": {"action": "TICKET_CREATED"}}),
+        )
+        self.assert_no_full_scans(statements)
+
+
+if __name__ == "__main__":
+    unittest.main()
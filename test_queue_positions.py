@@ -0,0 +1,105 @@
+"""
+Queue position index tests
+Random adds and removes, checked against a brute-force count of the
+waiting ids, including ids far beyond the current tree and below its base
+"""
+import os
+import random
+import tempfile
+import unittest
+
+# Importing database binds config.settings; keep the repository database untouched
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'queue_positions.db')}"
+
+from database import ServiceType
+from queue_positions import FenwickTree, QueuePositionIndex
+
+SERVICES = [ServiceType.TAX_SERVICE, ServiceType.IMMIGRATION, ServiceType.OTHER]
+
+
+class TestFenwickTree(unittest.TestCase):
+
+    def test_from_slots_matches_adds(self):
+        rng = random.Random(1)
+        slots = rng.sample(range(100), 40)
+        built = FenwickTree.from_slots(100, slots)
+        added = FenwickTree(100)
+        for slot in slots:
+            added.add(slot, 1)
+        for slot in range(100):
+            expected = sum(1 for s in slots if s <= slot)
+            self.assertEqual(built.prefix_sum(slot), expected)
+            self.assertEqual(added.prefix_sum(slot), expected)
+
+
+class TestQueuePositionIndex(unittest.TestCase):
+
+    def assert_matches(self, index, waiting):
+        for service_type, ids in waiting.items():
+            self.assertEqual(index.waiting_count(service_type), len(ids))
+            for ticket_id in ids:
+                expected = sum(1 for other in ids if other <= ticket_id)
+                self.assertEqual(index.position(ticket_id), expected, (service_type, ticket_id))
+
+    def test_random_operations_match_brute_force(self):
+        rng = random.Random(7)
+        index = QueuePositionIndex()
+        waiting = {service_type: set() for service_type in SERVICES}
+        removed = set()
+        next_id = 1
+
+        for step in range(3000):
+            op = rng.random()
+            if op < 0.5:
+                # Mostly the next id; sometimes a jump well past the tree's
+                # capacity, or an id older than anything still waiting
+                if op < 0.04:
+                    next_id += rng.randint(500, 5000)
+                ticket_id = rng.randint(1, next_id) if op > 0.46 else next_id
+                next_id += 1
+                if any(ticket_id in ids for ids in waiting.values()):
+                    continue
+                service_type = rng.choice(SERVICES)
+                index.add(ticket_id, service_type)
+                waiting[service_type].add(ticket_id)
+                removed.discard(ticket_id)
+            else:
+                candidates = [ticket_id for ids in waiting.values() for ticket_id in ids]
+                if not candidates:
+                    continue
+                ticket_id = rng.choice(candidates)
+                index.remove(ticket_id)
+                for ids in waiting.values():
+                    ids.discard(ticket_id)
+                removed.add(ticket_id)
+
+            if step % 100 == 0:
+                self.assert_matches(index, waiting)
+
+        self.assert_matches(index, waiting)
+        for ticket_id in removed:
+            self.assertIsNone(index.position(ticket_id))
+
+    def test_repeated_add_and_remove(self):
+        index = QueuePositionIndex()
+        index.add(10, ServiceType.TAX_SERVICE)
+        index.add(10, ServiceType.TAX_SERVICE)
+        index.add(12, ServiceType.TAX_SERVICE)
+        self.assertEqual(index.position(12), 2)
+        index.remove(10)
+        index.remove(10)
+        self.assertEqual(index.position(12), 1)
+        self.assertEqual(index.waiting_count(ServiceType.TAX_SERVICE), 1)
+        self.assertIsNone(index.position(999))
+
+    def test_clear(self):
+        index = QueuePositionIndex()
+        index.add(5, ServiceType.OTHER)
+        index.clear()
+        self.assertIsNone(index.position(5))
+        self.assertEqual(index.waiting_count(ServiceType.OTHER), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+SQL profiler tests
+Runs a small app with the profiler installed on a SQLite engine and checks
+the per-request headers, the repeated-statement warning and the query plan
+written to the slow-query log
+"""
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from sql_profiler import SQLProfiler
+
+
+class TestSQLProfiler(unittest.TestCase):
+
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.log_file = os.path.join(workdir, "slow.log")
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'profiler.db')}")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+            conn.execute(text("INSERT INTO items (name) VALUES ('a'), ('b'), ('c'), ('d')"))
+        self.addCleanup(engine.dispose)
+
+        app = FastAPI()
+
+        @app.get("/one-by-one")
+        def one_by_one():
+            with engine.connect() as conn:
+                return [conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": i}).scalar()
+                        for i in range(1, 5)]
+
+        @app.get("/scan")
+        def scan():
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT count(*) FROM items WHERE name LIKE '%b%'")).scalar()
+
+        # Every statement counts as slow, so each one is explained
+        self.profiler = SQLProfiler(slow_seconds=0, repeat_threshold=3)
+        self.profiler.install(app, [engine], self.log_file, max_bytes=1 << 20, backups=1)
+        self.addCleanup(self.close_log)
+        self.client = TestClient(app)
+
+    def close_log(self):
+        for handler in list(self.profiler.slow_log.handlers):
+            self.profiler.slow_log.removeHandler(handler)
+            handler.close()
+
+    def test_headers_count_statements_of_the_request(self):
+        response = self.client.get("/one-by-one")
+        self.assertEqual(response.json(), ["a", "b", "c", "d"])
+        self.assertEqual(response.headers["X-DB-Queries"], "4")
+        self.assertGreater(float(response.headers["X-DB-Time"]), 0)
+
+    def test_repeated_statement_is_flagged(self):
+        with self.assertLogs("sql_profiler", level="WARNING") as logs:
+            self.client.get("/one-by-one")
+        self.assertIn("ran this statement 4 times", logs.output[0])
+
+    def test_slow_statement_is_logged_with_plan(self):
+        self.client.get("/scan")
+        with open(self.log_file) as f:
+            log = f.read()
+        self.assertIn("GET /scan", log)
+        self.assertIn("SCAN items", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Ticket QR code tests
+The QR endpoint is public, so it must only serve active tickets
+"""
+import os
+import tempfile
+import unittest
+import uuid
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'ticket_qr.db')}"
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+class TestTicketQRCode(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def issue(self) -> tuple:
+        id_number = f"QR{uuid.uuid4().hex[:10]}"
+        response = self.client.post("/api/tickets", json={
+            "id_number": id_number, "full_name": "QR Citizen", "service_type": "land_maps"
+        })
+        self.assertEqual(response.status_code, 201, response.text)
+        return id_number, response.json()
+
+    def test_active_ticket(self):
+        _, ticket = self.issue()
+        response = self.client.get(ticket["qr_code_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/png")
+
+    def test_cancelled_ticket_is_not_found(self):
+        id_number, ticket = self.issue()
+        self.client.delete("/api/tickets/cancel-by-id", params={"id_number": id_number})
+        self.assertEqual(self.client.get(ticket["qr_code_url"]).status_code, 404)
+        self.assertEqual(self.client.get(f"/api/tickets/{ticket['ticket_number']}/qr.png").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Timing wheel tests
+Deadlines further out than one revolution, deadlines already passed when
+added, removal and long pauses between advances
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from timing_wheel import TimingWheel
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def at(seconds: float) -> datetime:
+    return NOW + timedelta(seconds=seconds)
+
+
+class TestTimingWheel(unittest.TestCase):
+
+    def setUp(self):
+        # 8 one-second buckets: one revolution is 8 seconds
+        self.wheel = TimingWheel(tick_seconds=1.0, slots=8, now=NOW)
+
+    def test_due_on_its_tick(self):
+        self.wheel.add(1, at(3))
+        self.assertEqual(self.wheel.advance(at(2)), [])
+        self.assertEqual(self.wheel.advance(at(3)), [1])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_deadline_beyond_one_revolution(self):
+        # Shares bucket 4 with tick 4 and 12 but is due only on tick 20
+        self.wheel.add(1, at(20))
+        self.wheel.add(2, at(4))
+        self.assertEqual(self.wheel.advance(at(4)), [2])
+        self.assertEqual(self.wheel.advance(at(12)), [])
+        self.assertEqual(self.wheel.advance(at(19)), [])
+        self.assertEqual(self.wheel.advance(at(20)), [1])
+
+    def test_already_overdue(self):
+        self.wheel.add(1, at(-60))
+        self.wheel.add(2, NOW)
+        self.assertEqual(sorted(self.wheel.advance(NOW)), [1, 2])
+        self.assertEqual(self.wheel.advance(at(1)), [])
+
+    def test_remove(self):
+        self.wheel.add(1, at(3))
+        self.wheel.add(2, at(-1))
+        self.wheel.add(3, at(3))
+        self.wheel.remove(1)
+        self.wheel.remove(2)
+        self.wheel.remove(99)
+        self.assertEqual(self.wheel.advance(at(5)), [3])
+
+    def test_readding_moves_the_deadline(self):
+        self.wheel.add(1, at(3))
+        self.wheel.add(1, at(6))
+        self.assertEqual(self.wheel.advance(at(5)), [])
+        self.assertEqual(self.wheel.advance(at(6)), [1])
+
+    def test_long_pause_sweeps_every_bucket(self):
+        for key in range(1, 9):
+            self.wheel.add(key, at(key))
+        self.wheel.add(100, at(40))
+        self.assertEqual(sorted(self.wheel.advance(at(30))), list(range(1, 9)))
+        self.assertEqual(self.wheel.advance(at(40)), [100])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Wait estimator tests
+Feeds ticket and counter events to a WaitEstimator and checks the moving
+average of handling times and the estimates derived from it
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Importing database binds config.settings; keep the repository database untouched
+DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'wait_estimator.db')}"
+
+from database import ServiceType
+from events import COUNTER_CREATED, TICKET_COMPLETED
+from wait_estimator import WaitEstimator
+
+
+def completed(service_type: ServiceType, minutes: float) -> dict:
+    served_at = datetime(2024, 1, 1, 9, 0)
+    return {
+        "type": TICKET_COMPLETED,
+        "context": {},
+        "data": {
+            "service_type": service_type.value,
+            "served_at": served_at.isoformat(),
+            "completed_at": (served_at + timedelta(minutes=minutes)).isoformat()
+        }
+    }
+
+
+def counter(counter_number: int, service_types: str) -> dict:
+    return {
+        "type": COUNTER_CREATED,
+        "context": {},
+        "data": {"counter_number": counter_number, "is_active": True, "service_types": service_types}
+    }
+
+
+class TestWaitEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.estimator = WaitEstimator(default_minutes=5.0, alpha=0.5, max_minutes=60, history_days=7)
+
+    def test_default_until_first_completion(self):
+        self.assertEqual(self.estimator.service_minutes(ServiceType.TAX_SERVICE), 5.0)
+        self.assertEqual(self.estimator.estimate(ServiceType.TAX_SERVICE, 3), 15)
+
+    def test_moving_average_of_handling_times(self):
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 10))
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 20))
+        self.assertAlmostEqual(self.estimator.service_minutes(ServiceType.TAX_SERVICE), 15.0)
+        self.assertEqual(self.estimator.service_minutes(ServiceType.IMMIGRATION), 5.0)
+
+    def test_forgotten_completion_is_ignored(self):
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 10))
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 600))
+        self.assertAlmostEqual(self.estimator.service_minutes(ServiceType.TAX_SERVICE), 10.0)
+
+    def test_estimate_is_shared_over_counters(self):
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 12))
+        self.estimator.apply(counter(1, "tax_service,immigration"))
+        self.estimator.apply(counter(2, "tax_service"))
+        self.estimator.apply(counter(2, "tax_service"))  # relayed twice
+        self.assertEqual(self.estimator.estimate(ServiceType.TAX_SERVICE, 4), 24)
+        self.assertEqual(self.estimator.estimate(ServiceType.IMMIGRATION, 4), 20)
+
+    def test_average_wait_over_waiting_tickets(self):
+        self.estimator.apply(completed(ServiceType.TAX_SERVICE, 10))
+        # Positions 1..3 wait 10, 20 and 30 minutes
+        self.assertEqual(self.estimator.average_wait({ServiceType.TAX_SERVICE: 3}), 20)
+        self.assertEqual(self.estimator.average_wait({ServiceType.TAX_SERVICE: 0}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
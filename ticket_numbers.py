@@ -0,0 +1,58 @@
+"""
+Ticket number allocation for Queue Management System
+Numbers restart every business day per service prefix (IM-001, IM-002, ...)
+and are allocated with a single atomic upsert on the ticket_sequences table
+"""
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import TicketSequence, ServiceType
+from utils import generate_ticket_number, get_ticket_prefix
+
+_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+
+def current_business_day() -> date:
+    """Business day used for ticket numbering (UTC, like the daily statistics)"""
+    return datetime.utcnow().date()
+
+
+def next_sequence_statement(dialect_name: str, prefix: str, business_day: date, count: int = 1):
+    """
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING that bumps the counter
+    for one prefix and day by count and returns the new last value
+    (SQLite 3.35+ and PostgreSQL)
+    """
+    insert = _INSERTS[dialect_name]
+    return insert(TicketSequence).values(
+        prefix=prefix, business_day=business_day, last_value=count
+    ).on_conflict_do_update(
+        index_elements=[TicketSequence.prefix, TicketSequence.business_day],
+        set_={"last_value": TicketSequence.last_value + count}
+    ).returning(TicketSequence.last_value)
+
+
+async def allocate_ticket_number(db, service_type: ServiceType, business_day: date) -> str:
+    """
+    Allocate the next ticket number for a service on a business day
+    Runs inside the caller's transaction, so a rolled-back issuance
+    gives its number back
+    """
+    prefix = get_ticket_prefix(service_type.value)
+    statement = next_sequence_statement(db.get_bind().dialect.name, prefix, business_day)
+    sequence = await db.scalar(statement)
+    return generate_ticket_number(service_type.value, sequence)
+
+
+async def allocate_ticket_numbers(db, service_type: ServiceType, business_day: date, count: int) -> List[str]:
+    """Allocate count consecutive ticket numbers for a service with one statement"""
+    prefix = get_ticket_prefix(service_type.value)
+    statement = next_sequence_statement(db.get_bind().dialect.name, prefix, business_day, count)
+    last = await db.scalar(statement)
+    return [generate_ticket_number(service_type.value, sequence) for sequence in range(last - count + 1, last + 1)]
@@ -0,0 +1,74 @@
+"""
+Hashed timing wheel for Queue Management System
+Tracks ticket expiry deadlines so the expiry sweeper finds due tickets
+in time proportional to the ticks elapsed, not to the number waiting
+"""
+import math
+from datetime import datetime
+from typing import Dict, List, Set
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class TimingWheel:
+    """
+    Deadlines hashed into `slots` buckets of `tick_seconds` each
+
+    A deadline lands in bucket (tick % slots); deadlines more than one
+    revolution away share a bucket with nearer ones and are skipped until
+    their tick comes round. Not thread-safe on its own; DispatchQueue
+    calls it under its lock.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512, now: datetime = None):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Set[int]] = [set() for _ in range(slots)]
+        self._deadlines: Dict[int, int] = {}  # key -> tick
+        self._overdue: Set[int] = set()
+        self._current = self._tick(now or datetime.utcnow(), math.floor)
+
+    def _tick(self, when: datetime, rounding) -> int:
+        return rounding((when - EPOCH).total_seconds() / self.tick_seconds)
+
+    def add(self, key: int, deadline: datetime):
+        self.remove(key)
+        tick = self._tick(deadline, math.ceil)
+        self._deadlines[key] = tick
+        if tick <= self._current:
+            self._overdue.add(key)
+        else:
+            self._slots[tick % len(self._slots)].add(key)
+
+    def remove(self, key: int):
+        tick = self._deadlines.pop(key, None)
+        if tick is not None:
+            self._slots[tick % len(self._slots)].discard(key)
+            self._overdue.discard(key)
+
+    def advance(self, now: datetime) -> List[int]:
+        """Move the wheel to now and return (and forget) every key now due"""
+        target = self._tick(now, math.floor)
+        due = list(self._overdue)
+        self._overdue.clear()
+
+        # After a long pause one full revolution covers every bucket
+        steps = min(max(target - self._current, 0), len(self._slots))
+        for tick in range(target - steps + 1, target + 1):
+            bucket = self._slots[tick % len(self._slots)]
+            expired = [key for key in bucket if self._deadlines[key] <= target]
+            for key in expired:
+                bucket.discard(key)
+                del self._deadlines[key]
+            due.extend(expired)
+
+        self._current = max(self._current, target)
+        return due
+
+    def clear(self):
+        for bucket in self._slots:
+            bucket.clear()
+        self._deadlines.clear()
+        self._overdue.clear()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
@@ -18,33 +18,78 @@ def hash_id_number(id_number: str) -> str:
     return hashlib.sha256(id_number.encode()).hexdigest()
 
 
+# Ticket number prefix per service type
+TICKET_PREFIXES = {
+    # Civil Registration & Identification
+    "kebele_id": "KB",
+    "birth_certificate": "BC",
+    "fayda_id": "FY",
+    "national_id": "NI",
+
+    # Land & Property
+    "land_construction_permit": "LC",
+    "land_maps": "LM",
+    "land_registration": "LR",
+
+    # Travel & Immigration
+    "passport_renewal": "PR",
+    "visa_services": "VS",
+    "yellow_card": "YC",
+    "travel_documents": "TD",
+
+    # Business & Commercial
+    "business_license": "BL",
+    "business_registration": "BR",
+    "import_export": "IE",
+
+    # Driving Services
+    "driver_license_renewal": "DR",
+    "driver_license_new": "DN",
+    "vehicle_registration": "VR",
+
+    # Telecommunications
+    "ethio_telecom": "ET",
+    "sim_registration": "SR",
+
+    # Banking & Financial
+    "commercial_bank": "CB",
+    "financial_services": "FS",
+
+    # Postal Services
+    "ethio_post": "EP",
+    "mail_services": "MS",
+
+    # Other Services
+    "document_legalization": "DL",
+    "tax_service": "TX",
+    "education_services": "ED",
+    "health_services": "HS",
+    "immigration": "IM",
+    "other": "OT"
+}
+
+
+def get_ticket_prefix(service_type: str) -> str:
+    """Ticket number prefix for a service type (GN for unknown services)"""
+    return TICKET_PREFIXES.get(service_type, "GN")
+
+
 def generate_ticket_number(service_type: str, sequence: int) -> str:
     """
     Generate unique ticket number
     Format: [SERVICE_PREFIX]-[SEQUENCE]
-    Example: IM-045 for Immigration service #45
+    Example: IM-045 for Immigration service #45 of the day
     """
-    prefixes = {
-        "birth_certificate": "BC",
-        "tax_service": "TX",
-        "immigration": "IM",
-        "business_license": "BL",
-        "passport_renewal": "PR",
-        "document_legalization": "DL",
-        "other": "OT"
-    }
-
-    prefix = prefixes.get(service_type, "GN")
-    return f"{prefix}-{sequence:03d}"
+    return f"{get_ticket_prefix(service_type)}-{sequence:03d}"
 
 
-def generate_qr_code(ticket_data: dict) -> str:
+def render_qr_png(ticket_data: dict) -> bytes:
     """
-    Generate QR code for ticket
-    Returns base64 encoded image
+    Render QR code for ticket
+    Returns raw PNG bytes; the code carries no personal data
     """
     # Create QR code data string
-    qr_data = f"TICKET:{ticket_data['ticket_number']}|NAME:{ticket_data['full_name']}|SERVICE:{ticket_data['service_type']}|TIME:{ticket_data['created_at']}"
+    qr_data = f"TICKET:{ticket_data['ticket_number']}|SERVICE:{ticket_data['service_type']}|TIME:{ticket_data['created_at']}"
 
     # Generate QR code
     qr = qrcode.QRCode(
@@ -59,12 +104,17 @@ def generate_qr_code(ticket_data: dict) -> str:
     # Create image
     img = qr.make_image(fill_color="black", back_color="white")
 
-    # Convert to base64
     buffered = BytesIO()
     img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return buffered.getvalue()
 
-    return img_str
+
+def generate_qr_code(ticket_data: dict) -> str:
+    """
+    Generate QR code for ticket
+    Returns base64 encoded image
+    """
+    return base64.b64encode(render_qr_png(ticket_data)).decode()
 
 
 def calculate_expiry_time() -> datetime:
@@ -80,12 +130,12 @@ def is_ticket_expired(expires_at: datetime) -> bool:
     return datetime.utcnow() > expires_at
 
 
-def estimate_wait_time(queue_position: int, avg_service_time_minutes: float = 5.0) -> int:
+def estimate_wait_time(queue_position: int, avg_service_time_minutes: float = 5.0, counters: int = 1) -> int:
     """
-    Estimate wait time based on queue position
+    Estimate wait time based on queue position and the counters serving the queue
     Returns minutes
     """
-    return int(queue_position * avg_service_time_minutes)
+    return int(queue_position * avg_service_time_minutes / max(counters, 1))
 
 
 def format_ticket_for_printing(ticket_data: dict) -> str:
@@ -122,39 +172,6 @@ Thank you for your patience!
     return ticket_text
 
 
-def detect_suspicious_activity(citizen_id: int, db_session) -> bool:
-    """
-    Detect potential fraud or suspicious activity
-    Returns True if suspicious
-    """
-    from database import Ticket, TicketStatus
-    from datetime import datetime, timedelta
-
-    # Check: Multiple ACTIVE tickets in short time (more lenient for testing)
-    recent_time = datetime.utcnow() - timedelta(hours=1)
-    recent_active_tickets = db_session.query(Ticket).filter(
-        Ticket.citizen_id == citizen_id,
-        Ticket.created_at >= recent_time,
-        Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
-    ).count()
-
-    # More lenient threshold: 5+ active tickets in an hour
-    if recent_active_tickets >= 5:
-        return True
-
-    # Check: Excessive failed tickets over longer period
-    failed_tickets = db_session.query(Ticket).filter(
-        Ticket.citizen_id == citizen_id,
-        Ticket.status.in_([TicketStatus.CANCELLED, TicketStatus.EXPIRED])
-    ).count()
-
-    # More lenient threshold: 10+ failed tickets
-    if failed_tickets >= 10:
-        return True
-
-    return False
-
-
 def validate_id_format(id_number: str, id_type: str = "kebele") -> bool:
     """
     Validate ID number format
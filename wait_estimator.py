@@ -0,0 +1,117 @@
+"""
+Online wait-time estimates for Queue Management System
+Keeps an exponentially weighted moving average of each service's handling
+time (verified -> completed) and the number of active counters offering
+it, seeded from recent history at startup and updated from ticket events,
+so issuing a ticket or checking its status never queries history.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Mapping, Optional
+
+from config import settings
+from database import Counter, ServiceType, Ticket, TicketStatus
+from events import COUNTER_CREATED, TICKET_COMPLETED
+from utils import estimate_wait_time
+
+
+def _parse(timestamp: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(timestamp) if timestamp else None
+
+
+class WaitEstimator:
+    """
+    Per-service handling time and capacity
+
+    A ticket at queue position p of a service whose tickets take m minutes
+    on average, offered at c active counters, waits about p * m / c minutes.
+    Services without history use default_minutes. Handling times longer
+    than max_minutes (a counter that forgot to complete) are left out.
+    load() reseeds from the tickets completed in the last history_days.
+    """
+
+    def __init__(self, default_minutes: float, alpha: float, max_minutes: float, history_days: int):
+        self.default_minutes = default_minutes
+        self.alpha = alpha
+        self.max_minutes = max_minutes
+        self.history_days = history_days
+        self._lock = threading.Lock()
+        self._minutes: Dict[ServiceType, float] = {}
+        self._counters: Dict[int, tuple] = {}  # counter number -> service types
+        self._capacity: Dict[ServiceType, int] = {}
+
+    def _observe(self, service_type: ServiceType, served_at: Optional[datetime], completed_at: Optional[datetime]):
+        """Fold one handling time into the service's average (lock must be held)"""
+        if not served_at or not completed_at:
+            return
+        minutes = (completed_at - served_at).total_seconds() / 60
+        if not 0 < minutes <= self.max_minutes:
+            return
+        previous = self._minutes.get(service_type)
+        self._minutes[service_type] = (
+            minutes if previous is None else previous + self.alpha * (minutes - previous)
+        )
+
+    def _add_counter(self, counter_number: int, service_types: str):
+        """Count an active counter towards its services' capacity (lock must be held)"""
+        if counter_number in self._counters:
+            return
+        types = tuple(ServiceType(value) for value in service_types.split(",") if value)
+        self._counters[counter_number] = types
+        for service_type in types:
+            self._capacity[service_type] = self._capacity.get(service_type, 0) + 1
+
+    def load(self, db):
+        """Rebuild the averages and capacities from the last history_days of the database"""
+        since = datetime.utcnow() - timedelta(days=self.history_days)
+        served = db.query(Ticket.service_type, Ticket.served_at, Ticket.completed_at).filter(
+            Ticket.status == TicketStatus.COMPLETED,
+            Ticket.completed_at >= since
+        ).order_by(Ticket.completed_at).all()
+
+        counters = db.query(Counter.counter_number, Counter.service_types).filter(Counter.is_active == True).all()
+
+        with self._lock:
+            self._minutes = {}
+            for service_type, served_at, completed_at in served:
+                self._observe(service_type, served_at, completed_at)
+            self._counters = {}
+            self._capacity = {}
+            for counter_number, service_types in counters:
+                self._add_counter(counter_number, service_types)
+
+    def apply(self, event: dict):
+        """Event bus listener: update on completed tickets and new counters"""
+        data = event["data"]
+        with self._lock:
+            if event["type"] == TICKET_COMPLETED:
+                self._observe(ServiceType(data["service_type"]),
+                              _parse(data.get("served_at")), _parse(data.get("completed_at")))
+            elif event["type"] == COUNTER_CREATED and data.get("is_active"):
+                self._add_counter(data["counter_number"], data.get("service_types", ""))
+
+    def service_minutes(self, service_type: ServiceType) -> float:
+        """Average handling time of one ticket of this service"""
+        return self._minutes.get(service_type, self.default_minutes)
+
+    def estimate(self, service_type: ServiceType, queue_position: int) -> int:
+        """Minutes until the ticket at queue_position is called"""
+        return estimate_wait_time(queue_position, self.service_minutes(service_type),
+                                  self._capacity.get(service_type, 0))
+
+    def average_wait(self, waiting_counts: Mapping[ServiceType, int]) -> int:
+        """Mean estimated wait over all waiting tickets, given the waiting count per service"""
+        total_minutes = 0.0
+        total_waiting = 0
+        for service_type, waiting in waiting_counts.items():
+            if waiting:
+                per_position = self.service_minutes(service_type) / max(self._capacity.get(service_type, 0), 1)
+                total_minutes += per_position * waiting * (waiting + 1) / 2
+                total_waiting += waiting
+        return round(total_minutes / total_waiting) if total_waiting else 0
+
+
+wait_estimator = WaitEstimator(
+    settings.default_service_minutes, settings.service_time_ewma_alpha,
+    settings.service_time_max_minutes, settings.service_time_history_days
+)